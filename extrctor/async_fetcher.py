@@ -0,0 +1,232 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+import aiohttp
+
+from configurations.config import CHANNELS, headers
+
+API_BASE = "https://discord.com/api/v9"
+limit = 100
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5      # seconds; full-jitter exponential backoff
+BACKOFF_CAP = 30.0
+REQUEST_TIMEOUT = 15
+POOL_SIZE = 10
+
+
+class RateLimiter:
+    """
+    Tracks Discord's per-route buckets from X-RateLimit-* headers.
+    Requests on the same bucket wait until it has remaining capacity; a global 429 pauses everything.
+    """
+
+    def __init__(self):
+        self._route_bucket = {}     # route -> bucket id advertised by Discord
+        self._buckets = {}          # bucket id -> {"remaining": int, "reset_at": float}
+        self._locks = {}            # bucket id (or route until known) -> asyncio.Lock
+        self._global_until = 0.0
+
+    def _key(self, route: str) -> str:
+        return self._route_bucket.get(route, route)
+
+    def lock_for(self, route: str) -> asyncio.Lock:
+        return self._locks.setdefault(self._key(route), asyncio.Lock())
+
+    async def wait(self, route: str):
+        now = time.monotonic()
+        if self._global_until > now:
+            await asyncio.sleep(self._global_until - now)
+        bucket = self._buckets.get(self._key(route))
+        if bucket and bucket["remaining"] <= 0:
+            delay = bucket["reset_at"] - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    def update(self, route: str, resp_headers):
+        bucket_id = resp_headers.get("X-RateLimit-Bucket")
+        if bucket_id:
+            if route not in self._route_bucket:
+                # share the route's lock with the bucket from now on
+                self._locks.setdefault(bucket_id, self._locks.get(route, asyncio.Lock()))
+            self._route_bucket[route] = bucket_id
+        remaining = resp_headers.get("X-RateLimit-Remaining")
+        reset_after = resp_headers.get("X-RateLimit-Reset-After")
+        if remaining is not None and reset_after is not None:
+            self._buckets[self._key(route)] = {
+                "remaining": int(remaining),
+                "reset_at": time.monotonic() + float(reset_after),
+            }
+
+    def block_global(self, retry_after: float):
+        self._global_until = max(self._global_until, time.monotonic() + retry_after)
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+async def _json_or_none(resp):
+    # proxies and Cloudflare answer 429 with plain text or HTML
+    try:
+        body = await resp.json(content_type=None)
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def _retry_after(body, resp_headers) -> float:
+    """Seconds to wait after a 429: the JSON body's retry_after, else Retry-After, else 1."""
+    for value in ((body or {}).get("retry_after"), resp_headers.get("Retry-After")):
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            continue
+    return 1.0
+
+
+async def _get_json(session: aiohttp.ClientSession, limiter: RateLimiter, route: str, url: str, params: dict,
+                    request_headers: dict = None):
+    for attempt in range(MAX_RETRIES + 1):
+        async with limiter.lock_for(route):
+            await limiter.wait(route)
+            try:
+                async with session.get(url, params=params, headers=request_headers) as resp:
+                    limiter.update(route, resp.headers)
+                    if resp.status == 200:
+                        return await resp.json()
+                    if resp.status == 429:
+                        body = await _json_or_none(resp)
+                        retry_after = _retry_after(body, resp.headers)
+                        if (body or {}).get("global") or resp.headers.get("X-RateLimit-Global"):
+                            limiter.block_global(retry_after)
+                        delay = retry_after + random.uniform(0, 0.25)
+                    elif resp.status >= 500:
+                        delay = _backoff(attempt)
+                    else:
+                        print(f"Failed: {resp.status} {url}")
+                        print(await resp.text())
+                        return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Request error on {url}: {type(e).__name__}: {e}")
+                delay = _backoff(attempt)
+        # sleep outside the bucket lock so other routes keep moving
+        await asyncio.sleep(delay)
+    print(f"Giving up on {url} after {MAX_RETRIES} retries")
+    return None
+
+
+class _Fetcher:
+    """
+    One event loop thread per process owning the pooled session and the rate limiter, so
+    connections and Discord bucket state (remaining, reset, global 429s) carry over between
+    fetches instead of starting fresh on every call. Pool workers are forked: a child starts
+    its own loop on first use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._session = None
+        self.limiter = None
+
+    def submit(self, coro):
+        """Schedule a coroutine on the fetcher loop; returns a concurrent.futures.Future."""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+                self._session = None
+                self.limiter = RateLimiter()
+                threading.Thread(target=self._loop.run_forever, name="discord-fetcher", daemon=True).start()
+            return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def session(self) -> aiohttp.ClientSession:
+        # only called on the fetcher loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=POOL_SIZE, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                headers=headers,
+            )
+        return self._session
+
+    def run(self, coro):
+        return self.submit(coro).result()
+
+    def close(self):
+        with self._lock:
+            loop, pid = self._loop, self._pid
+            self._loop = None
+        if loop is None or pid != os.getpid():
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+
+_fetcher = _Fetcher()
+
+
+async def fetch_channel_messages(channel_type: str, base_url: str = API_BASE, request_headers: dict = None,
+                                 page_size: int = limit, **cursor):
+    """One page of a channel's messages (newest first) or None on failure; runs on the fetcher loop."""
+    channel_id = CHANNELS.get(channel_type)
+    if not channel_id:
+        print(f"Channel type '{channel_type}' not found in configuration.")
+        return None
+    route = f"/channels/{channel_id}/messages"
+    params = {"limit": page_size, **{k: v for k, v in cursor.items() if v}}
+    return await _get_json(_fetcher.session(), _fetcher.limiter, route, base_url + route, params, request_headers)
+
+
+async def fetch_all_channels(channel_types=None, base_url: str = API_BASE, request_headers: dict = None):
+    """Fetch the latest page of every configured channel concurrently; runs on the fetcher loop."""
+    channel_types = list(channel_types or CHANNELS.keys())
+    results = await asyncio.gather(*(
+        fetch_channel_messages(ct, base_url=base_url, request_headers=request_headers) for ct in channel_types
+    ))
+    return dict(zip(channel_types, results))
+
+
+def run(coro):
+    """Blocking: run a fetch coroutine on the process's fetcher loop."""
+    return _fetcher.run(coro)
+
+
+def fetch_channels(channel_types=None, base_url: str = API_BASE) -> dict:
+    """Blocking entry point: {channel_type: latest page (newest first) or None on failure}."""
+    return _fetcher.run(fetch_all_channels(channel_types, base_url=base_url))
+
+
+def latest_message_id(channel_type: str, base_url: str = API_BASE):
+    """Id of the newest message in a channel (one-message page, same bucket as fetches); None on failure."""
+    page = _fetcher.run(fetch_channel_messages(channel_type, base_url=base_url, page_size=1))
+    return page[0]["id"] if page else None
+
+
+def shutdown_fetcher():
+    _fetcher.close()
+
+
+def fetch_all_discord_messages(output_files: dict, base_url: str = API_BASE) -> dict:
+    """
+    Blocking entry point: fetch every channel in `output_files` ({channel_type: path}) concurrently
+    and write each raw JSON file. Returns {channel_type: message count or None on failure}.
+    """
+    results = fetch_channels(output_files.keys(), base_url=base_url)
+    counts = {}
+    for channel_type, messages in results.items():
+        if messages is None:
+            counts[channel_type] = None
+            continue
+        with open(output_files[channel_type], "w", encoding="utf-8") as f:
+            json.dump(messages, f, indent=2, ensure_ascii=False)
+        counts[channel_type] = len(messages)
+        print(f"{len(messages)} messages saved to '{output_files[channel_type]}'")
+    return counts
@@ -0,0 +1,284 @@
+import asyncio
+import json
+import os
+import random
+import time
+import urllib.parse as up
+
+import aiohttp
+
+from services.persistence import persist_json
+
+base_dir = os.path.dirname(__file__)
+
+NITTER_MIRRORS = [
+    "https://nitter.net",
+    "https://nitter.poast.org",
+    "https://nitter.privacydev.net",
+    "https://nitter.unixfox.eu",
+    "https://nitter.lacontrevoie.fr",
+]
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+
+HEALTH_FILE = os.getenv(
+    "NITTER_HEALTH_FILE",
+    os.path.abspath(os.path.join(base_dir, "..", "test data", "nitter_health.json")),
+)
+
+# Knobs (env-overridable)
+FANOUT = int(os.getenv("NITTER_FANOUT", "3"))                    # mirrors scraped in parallel
+MAX_PAGES = int(os.getenv("NITTER_MAX_PAGES", "6"))              # pages per mirror per search
+PAGE_INTERVAL_S = float(os.getenv("NITTER_PAGE_INTERVAL_S", "0.8"))  # min gap between requests to one host
+REQUEST_TIMEOUT = 15
+BREAKER_FAILURES = 3          # consecutive failures that open a mirror's breaker
+BREAKER_OPEN_S = 120.0        # first open period; doubles on each re-open, capped
+BREAKER_MAX_OPEN_S = 3600.0
+LATENCY_ALPHA = 0.3           # EWMA weight of the newest latency sample
+
+
+# =======================
+# HTML parsing
+# =======================
+
+def _soup(html: str):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, "html.parser")
+
+def extract_texts(soup) -> list:
+    texts = []
+    # common selectors across mirrors
+    for sel in [".timeline .timeline-item .tweet-content",
+                ".timeline-item .tweet-content",
+                ".tweet-content"]:
+        for node in soup.select(sel):
+            s = node.get_text(" ", strip=True)
+            if s:
+                texts.append(s)
+    return texts
+
+def next_cursor(soup) -> str | None:
+    more = soup.select_one("div.show-more a[href*='cursor=']")
+    if not more or "href" not in more.attrs:
+        return None
+    parsed = up.urlparse(more["href"])
+    qd = up.parse_qs(parsed.query)
+    vals = qd.get("cursor", [])
+    return vals[0] if vals else None
+
+
+# =======================
+# Mirror health
+# =======================
+
+class MirrorHealth:
+    """Latency / success / block statistics and circuit-breaker state for one mirror."""
+
+    FIELDS = ("requests", "successes", "failures", "blocks", "latency_s",
+              "consecutive_failures", "open_until", "open_s", "half_open")
+
+    def __init__(self, **state):
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.blocks = 0                 # 429/503 answers
+        self.latency_s = None           # EWMA of successful request latency
+        self.consecutive_failures = 0
+        self.open_until = 0.0           # wall clock; breaker is open until then
+        self.open_s = BREAKER_OPEN_S
+        self.half_open = False          # the breaker opened: once open_until passes, one failure re-opens it
+        for k, v in state.items():
+            if k in self.FIELDS:
+                setattr(self, k, v)
+        self.last_request = 0.0         # monotonic send slot, for per-host pacing (not persisted)
+
+    def score(self) -> float:
+        """Higher is better: smoothed success rate, penalised by blocks and latency."""
+        success_rate = (self.successes + 1) / (self.requests + 2)
+        block_rate = self.blocks / (self.requests + 2)
+        latency = self.latency_s if self.latency_s is not None else 1.0
+        return success_rate * (1 - block_rate) / (1 + latency)
+
+    def available(self, now: float) -> bool:
+        # once open_until has passed a half-open breaker lets trial requests through
+        return now >= self.open_until
+
+    def record(self, ok: bool, latency_s: float = None, blocked: bool = False):
+        self.requests += 1
+        if blocked:
+            self.blocks += 1
+        if ok:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.half_open = False      # a trial succeeded (or the breaker was closed): close it
+            self.open_s = BREAKER_OPEN_S
+            if latency_s is not None:
+                self.latency_s = latency_s if self.latency_s is None else (
+                    LATENCY_ALPHA * latency_s + (1 - LATENCY_ALPHA) * self.latency_s)
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        now = time.time()
+        if now < self.open_until:
+            return  # a late answer to a request sent before the breaker opened
+        # half-open: the first failed trial re-opens at once, with a doubled cooldown
+        if self.half_open or self.consecutive_failures >= BREAKER_FAILURES:
+            self.open_until = now + self.open_s
+            self.open_s = min(self.open_s * 2, BREAKER_MAX_OPEN_S)
+            self.consecutive_failures = 0
+            self.half_open = True
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self.FIELDS}
+
+
+class MirrorRegistry:
+    """Health per mirror, persisted to HEALTH_FILE so breaker state and scores survive restarts."""
+
+    def __init__(self, mirrors=NITTER_MIRRORS, health_file: str = HEALTH_FILE):
+        self.health_file = health_file
+        saved = {}
+        if health_file:
+            try:
+                with open(health_file, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                saved = {}
+        self.mirrors = {m: MirrorHealth(**saved.get(m, {})) for m in mirrors}
+
+    def ranked(self) -> list:
+        """Available mirrors, best score first (small jitter spreads load between equals)."""
+        now = time.time()
+        live = [m for m, h in self.mirrors.items() if h.available(now)]
+        return sorted(live, key=lambda m: self.mirrors[m].score() * random.uniform(0.9, 1.1), reverse=True)
+
+    def save(self):
+        if self.health_file:
+            persist_json({m: h.to_dict() for m, h in self.mirrors.items()}, self.health_file)
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {m: {**h.to_dict(), "score": round(h.score(), 4), "open": not h.available(now)}
+                for m, h in self.mirrors.items()}
+
+
+# =======================
+# Scraping
+# =======================
+
+class _Collector:
+    """Unique texts shared by every mirror task; `done` fires at `limit`."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.texts = []
+        self.seen = set()
+        self.done = asyncio.Event()
+
+    def add(self, texts) -> int:
+        found = 0
+        for s in texts:
+            key = s.lower()
+            if key in self.seen or self.done.is_set():
+                continue
+            self.seen.add(key)
+            self.texts.append(s)
+            found += 1
+            if len(self.texts) >= self.limit:
+                self.done.set()
+        return found
+
+
+async def _fetch_page(session, mirror: str, health: MirrorHealth, params: dict):
+    """One paced request; returns HTML or None, recording the outcome on the mirror's health."""
+    # reserve the next send slot for this host (no await in between, so no lock needed)
+    now = time.monotonic()
+    slot = max(now, health.last_request + PAGE_INTERVAL_S)
+    health.last_request = slot
+    if slot > now:
+        await asyncio.sleep(slot - now)
+    t0 = time.monotonic()
+    try:
+        async with session.get(f"{mirror}/search", params=params) as resp:
+            if resp.status in (429, 503):
+                health.record(False, blocked=True)
+                return None
+            if resp.status != 200:
+                health.record(False)
+                return None
+            html = await resp.text()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        health.record(False)
+        return None
+    health.record(True, latency_s=time.monotonic() - t0)
+    return html
+
+
+async def _scrape_mirror(session, mirror: str, health: MirrorHealth, query: str, out: _Collector):
+    cursor = None
+    consecutive_empty = 0
+    for _page in range(MAX_PAGES):
+        if out.done.is_set() or not health.available(time.time()):
+            return
+        params = {"f": "tweets", "q": query}
+        if cursor:
+            params["cursor"] = cursor
+        html = await _fetch_page(session, mirror, health, params)
+        if html is None:
+            return
+        soup = _soup(html)
+        if out.add(extract_texts(soup)) == 0:
+            consecutive_empty += 1
+            if consecutive_empty >= 2:
+                # likely rate-limited/content blocked on this mirror/page
+                return
+        else:
+            consecutive_empty = 0
+        cursor = next_cursor(soup)
+        if not cursor:
+            return
+
+
+async def scrape_nitter(query: str, limit: int, registry: MirrorRegistry = None, fanout: int = FANOUT) -> list:
+    """
+    Scrape up to `limit` unique tweet texts. The best `fanout` mirrors run in parallel; when one
+    finishes without reaching the limit the next-best mirror takes its slot. Stops as soon as the
+    limit is reached.
+    """
+    registry = registry or get_registry()
+    out = _Collector(limit)
+    queue = registry.ranked()
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout) as session:
+        running = set()
+        try:
+            while (queue or running) and not out.done.is_set():
+                while queue and len(running) < fanout:
+                    m = queue.pop(0)
+                    running.add(asyncio.create_task(
+                        _scrape_mirror(session, m, registry.mirrors[m], query, out)))
+                done_wait = asyncio.create_task(out.done.wait())
+                finished, _ = await asyncio.wait(running | {done_wait}, return_when=asyncio.FIRST_COMPLETED)
+                done_wait.cancel()
+                running -= finished
+        finally:
+            for t in running:
+                t.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            registry.save()
+    return out.texts[:limit]
+
+
+_registry = None
+
+
+def get_registry() -> MirrorRegistry:
+    global _registry
+    if _registry is None:
+        _registry = MirrorRegistry()
+    return _registry
+
+
+def mirror_stats() -> dict:
+    return get_registry().stats()
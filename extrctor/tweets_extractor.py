@@ -1,25 +1,336 @@
-import requests
 import json
-from configurations.config import CHANNELS, headers
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from configurations.config import CHANNELS
+from extrctor import async_fetcher
+from extrctor.async_fetcher import fetch_channels
 
 limit = 100
 
-def fetch_discord_messages(channel_type: str, output_file: str):
+base_dir = os.path.dirname(__file__)
+# channel_type -> {"channel_id", "newest_id", "oldest_id"}
+CURSOR_FILE = os.path.join(base_dir, "..", "test data", "discord_cursors.json")
+# append-only message store, one JSONL file per channel type
+STORE_DIR = os.path.join(base_dir, "..", "test data", "discord_store")
+
+# when set, fetch_discord_messages pulls only new messages into the store
+INCREMENTAL = os.getenv("DISCORD_INCREMENTAL", "0") == "1"
+
+class FetchFailed(RuntimeError):
+    """The Discord fetch for a channel failed."""
+
+def fetch_discord_messages(channel_type: str, output_file: str = None, incremental: bool = None):
+    """
+    Return the latest `limit` messages (newest first); also written to `output_file` when given.
+    Returns None on failure.
+    """
     channel_id = CHANNELS.get(channel_type)
     if not channel_id:
         print(f"Channel type '{channel_type}' not found in configuration.")
-        return
-
-    url = f"https://discord.com/api/v9/channels/{channel_id}/messages?limit={limit}"
-
+        return None
 
-    response = requests.get(url, headers=headers)
+    if INCREMENTAL if incremental is None else incremental:
+        # keep the raw file contract (latest `limit` messages, newest first) on top of the store
+        fetch_new_discord_messages(channel_type)
+        latest = read_latest(channel_type)[::-1]
+        if output_file:
+            with open(output_file, "w", encoding="utf-8") as f:
+                json.dump(latest, f, indent=2, ensure_ascii=False)
+            print(f"{len(latest)} messages saved to '{output_file}'")
+        return latest
 
-    if response.status_code == 200:
-        messages = response.json()
+    # pooled, rate-limit-aware fetch (extrctor/async_fetcher.py)
+    messages = fetch_channels([channel_type])[channel_type]
+    if messages is None:
+        return None
+    if output_file:
         with open(output_file, "w", encoding="utf-8") as f:
             json.dump(messages, f, indent=2, ensure_ascii=False)
         print(f"{len(messages)} messages saved to '{output_file}'")
-    else:
-        print(f"Failed: {response.status_code}")
-        print(response.text)
+    return messages
+
+def fetch_channel_batch(channel_type: str, strict: bool = False) -> list:
+    """
+    Messages for one analysis run. A failed fetch yields [] (an empty analysis), or with `strict`
+    raises FetchFailed so a scheduled refresh is counted as failed and keeps its last result.
+    """
+    messages = fetch_discord_messages(channel_type)
+    if messages is None:
+        if strict:
+            raise FetchFailed(f"Fetching '{channel_type}' messages failed")
+        return []
+    return messages
+
+def fetch_discord_channels(channel_types=None) -> dict:
+    """
+    Latest `limit` messages of several channels, fetched concurrently over the process's pooled session.
+    Returns {channel_type: messages or None on failure}.
+    """
+    return fetch_channels(channel_types or list(CHANNELS))
+
+class ChannelBatches:
+    """
+    Latest batches of several channels for scheduled refreshes. A job whose channel has no
+    unused batch fetches every channel in one fetch_discord_channels call; the other jobs take
+    their channel from that fetch if they come due within `max_age_s`. Each batch is used once,
+    so a job triggered later by new messages fetches again.
+    """
+
+    def __init__(self, channel_types, max_age_s: float):
+        self.channel_types = list(channel_types)
+        self.max_age_s = max_age_s
+        self._lock = threading.Lock()
+        self._fetched_at = 0.0
+        self._batches = {}
+
+    def get(self, channel_type: str) -> list:
+        """Messages for one analysis run; raises FetchFailed when the channel's fetch failed."""
+        with self._lock:   # concurrent jobs wait for the same fetch
+            if channel_type not in self._batches or time.monotonic() - self._fetched_at > self.max_age_s:
+                self._batches = fetch_discord_channels(self.channel_types)
+                self._fetched_at = time.monotonic()
+            messages = self._batches.pop(channel_type, None)
+        if messages is None:
+            raise FetchFailed(f"Fetching '{channel_type}' messages failed")
+        return messages
+
+def latest_message_id(channel_type: str) -> str | None:
+    """Id of the newest message in a channel (one-message request through the rate limiter); None on failure."""
+    return async_fetcher.latest_message_id(channel_type)
+
+# =======================
+# Incremental ingestion
+# =======================
+
+STORE_LOCK_STALE_S = 300.0   # a lock older than this was left by a crashed fetch
+TAIL_BLOCK = 1 << 16
+
+@contextmanager
+def _file_lock(path: str, stale_s: float = STORE_LOCK_STALE_S):
+    """Cross-process lock (O_EXCL lock file): analyses fetch from separate pool workers."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    while True:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > stale_s:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _load_cursors() -> dict:
+    try:
+        with open(CURSOR_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _load_cursor(channel_type: str, channel_id) -> dict:
+    cursor = _load_cursors().get(channel_type, {})
+    if cursor.get("channel_id") != str(channel_id):
+        cursor = {"channel_id": str(channel_id)}
+    return cursor
+
+def _save_cursor(channel_type: str, cursor: dict):
+    # the file holds every channel; re-read under the lock so concurrent channels keep their cursors
+    with _file_lock(CURSOR_FILE + ".lock"):
+        cursors = _load_cursors()
+        cursors[channel_type] = cursor
+        tmp = f"{CURSOR_FILE}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cursors, f, indent=2)
+        os.replace(tmp, CURSOR_FILE)
+
+def store_path_for(channel_type: str) -> str:
+    return os.path.join(STORE_DIR, f"{channel_type}.jsonl")
+
+def _backfill_path(store_path: str) -> str:
+    # backfilled pages are older than everything in the main store, which stays in id order
+    return store_path[:-len(".jsonl")] + ".backfill.jsonl" if store_path.endswith(".jsonl") \
+        else store_path + ".backfill"
+
+def _append_to_store(store_path: str, messages: list):
+    if not messages:
+        return
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    with open(store_path, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(m, ensure_ascii=False) + "\n"
+                        for m in sorted(messages, key=lambda m: int(m["id"]))))
+        f.flush()
+        os.fsync(f.fileno())
+
+def _tail_messages(path: str, n: int) -> list:
+    """Last `n` messages of a JSONL store, reading blocks from the end instead of the whole file."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return []
+    with f:
+        pos = f.seek(0, os.SEEK_END)
+        buf = b""
+        while pos > 0 and buf.count(b"\n") <= n:
+            step = min(TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+    lines = buf.splitlines()
+    if pos > 0:
+        lines = lines[1:]   # starts mid-line
+    messages = []
+    for line in lines[-n:]:
+        try:
+            messages.append(json.loads(line))
+        except ValueError:
+            pass   # torn last line of a crashed append
+    return messages
+
+def _unique_sorted(messages) -> list:
+    # a page replayed after a crash may be stored twice
+    return sorted({m["id"]: m for m in messages}.values(), key=lambda m: int(m["id"]))
+
+def read_store(channel_type: str, store_path: str = None) -> list:
+    """All stored messages for a channel, oldest first, one per message id."""
+    store_path = store_path or store_path_for(channel_type)
+    messages = []
+    for path in (_backfill_path(store_path), store_path):
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        messages.append(json.loads(line))
+                    except ValueError:
+                        pass
+    return _unique_sorted(messages)
+
+def read_latest(channel_type: str, n: int = limit, store_path: str = None) -> list:
+    """The newest `n` stored messages, oldest first, read from the tail of the store."""
+    store_path = store_path or store_path_for(channel_type)
+    # read past a few replayed duplicates
+    latest = _unique_sorted(_tail_messages(store_path, 2 * n))[-n:]
+    if len(latest) < n:
+        latest = read_store(channel_type, store_path)[-n:]
+    return latest
+
+def _get_page(channel_type: str, **cursor) -> list | None:
+    # same pooled session and rate limiter as the latest-page fetches
+    return async_fetcher.run(async_fetcher.fetch_channel_messages(channel_type, **cursor))
+
+def fetch_new_discord_messages(channel_type: str, store_path: str = None) -> list:
+    """
+    Pull only messages newer than the persisted cursor (paging with `after`) and append them
+    to the channel's JSONL store. The first run takes the latest page and sets the cursor.
+    Returns the new messages, oldest first.
+    """
+    channel_id = CHANNELS.get(channel_type)
+    if not channel_id:
+        print(f"Channel type '{channel_type}' not found in configuration.")
+        return []
+    store_path = store_path or store_path_for(channel_type)
+
+    # one fetch per channel at a time, so two workers never start from the same cursor
+    with _file_lock(store_path + ".lock"):
+        cursor = _load_cursor(channel_type, channel_id)
+        newest_id = cursor.get("newest_id")
+        # a crash between the append and the cursor save left the page in the store: resume after it
+        stored = [int(m["id"]) for m in _tail_messages(store_path, limit)]
+        if stored and (newest_id is None or max(stored) > int(newest_id)):
+            newest_id = str(max(stored))
+
+        new_messages = []
+        if newest_id is None:
+            page = _get_page(channel_type)
+            if page is None:
+                return []
+            new_messages.extend(page)
+        else:
+            after = newest_id
+            while True:
+                page = _get_page(channel_type, after=after)
+                if not page:
+                    break
+                new_messages.extend(page)
+                after = max(page, key=lambda m: int(m["id"]))["id"]
+                if len(page) < limit:
+                    break
+
+        # the stored cursor guards against overlap when a page straddles it
+        if newest_id is not None:
+            new_messages = [m for m in new_messages if int(m["id"]) > int(newest_id)]
+        new_messages = _unique_sorted(new_messages)
+        _append_to_store(store_path, new_messages)
+
+        ids = [int(m["id"]) for m in new_messages]
+        if ids or newest_id != cursor.get("newest_id"):
+            cursor["newest_id"] = str(max(ids)) if ids else newest_id
+            if ids and (cursor.get("oldest_id") is None or min(ids) < int(cursor["oldest_id"])):
+                cursor["oldest_id"] = str(min(ids))
+            _save_cursor(channel_type, cursor)
+
+    print(f"{len(new_messages)} new '{channel_type}' messages appended to '{store_path}'")
+    return new_messages
+
+def _parse_ts(ts: str) -> datetime:
+    dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def backfill_discord_messages(channel_type: str, until: str, store_path: str = None) -> int:
+    """
+    Walk history backwards (paging with `before`) from the oldest stored message until
+    `until` (ISO date, e.g. "2025-06-01"). Resumable: progress is kept in the cursor file.
+    Returns the number of messages appended.
+    """
+    channel_id = CHANNELS.get(channel_type)
+    if not channel_id:
+        print(f"Channel type '{channel_type}' not found in configuration.")
+        return 0
+    store_path = store_path or store_path_for(channel_type)
+    until_dt = _parse_ts(until)
+    backfill_path = _backfill_path(store_path)
+
+    appended = 0
+    with _file_lock(store_path + ".lock"):
+        cursor = _load_cursor(channel_type, channel_id)
+        before = cursor.get("oldest_id")
+        # a crash between the append and the cursor save left the page in the store: resume below it
+        stored = [int(m["id"]) for m in _tail_messages(backfill_path, limit)]
+        if stored and (before is None or min(stored) < int(before)):
+            before = str(min(stored))
+        while True:
+            page = _get_page(channel_type, before=before)
+            if not page:
+                break
+            in_range = [m for m in page if _parse_ts(m["timestamp"]) >= until_dt]
+            _append_to_store(backfill_path, in_range)
+            appended += len(in_range)
+
+            ids = [int(m["id"]) for m in page]
+            before = str(min(ids))
+            if in_range:
+                # only advance past what was stored, so a later, deeper backfill resumes correctly
+                cursor["oldest_id"] = str(min(int(m["id"]) for m in in_range))
+                if cursor.get("newest_id") is None:
+                    cursor["newest_id"] = str(max(int(m["id"]) for m in in_range))
+            _save_cursor(channel_type, cursor)
+
+            if len(in_range) < len(page) or len(page) < limit:
+                break
+
+    print(f"Backfilled {appended} '{channel_type}' messages back to {until} into '{backfill_path}'")
+    return appended
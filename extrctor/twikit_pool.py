@@ -0,0 +1,253 @@
+import asyncio
+import inspect
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+from configurations import config
+
+base_dir = os.path.dirname(__file__)
+COOKIES_DIR = os.path.abspath(os.path.join(base_dir, "..", "configurations"))
+
+# Knobs (env-overridable)
+SESSIONS_PER_ACCOUNT = int(os.getenv("TWIKIT_SESSIONS_PER_ACCOUNT", "1"))
+COOKIE_REFRESH_S = float(os.getenv("TWIKIT_COOKIE_REFRESH_S", "1800"))   # persist rotated cookies this often
+RATE_LIMIT_COOLDOWN_S = float(os.getenv("TWIKIT_RATE_LIMIT_COOLDOWN_S", "900"))
+CHECKOUT_TIMEOUT_S = float(os.getenv("TWIKIT_CHECKOUT_TIMEOUT_S", "30"))
+
+# twikit error class names (matched by name so any twikit version works)
+RATE_LIMIT_ERRORS = {"TooManyRequests"}
+AUTH_ERRORS = {"Unauthorized", "Forbidden", "AccountLocked", "AccountSuspended"}
+
+
+class NoSessionAvailable(RuntimeError):
+    """Every session is rate-limited, broken or busy past the checkout timeout."""
+
+
+async def maybe_await(x):
+    # Await only if it's awaitable; otherwise just return the value.
+    if inspect.isawaitable(x):
+        return await x
+    return x
+
+
+def load_accounts() -> list:
+    """
+    Accounts from TWIKIT_ACCOUNTS (JSON list of {email, username, password}) or config.TWITTER_ACCOUNTS,
+    else the single account from TWIKIT_* env / config.TWITTER_*.
+    """
+    raw = os.getenv("TWIKIT_ACCOUNTS")
+    accounts = json.loads(raw) if raw else list(getattr(config, "TWITTER_ACCOUNTS", []) or [])
+    if not accounts:
+        accounts = [{
+            "email": os.getenv("TWIKIT_EMAIL", getattr(config, "TWITTER_EMAIL", None)),
+            "username": os.getenv("TWIKIT_USERNAME", getattr(config, "TWITTER_USERNAME", None)),
+            "password": os.getenv("TWIKIT_PASSWORD", getattr(config, "TWITTER_PASSWORD", None)),
+        }]
+    for i, acc in enumerate(accounts):
+        if acc.get("username") and acc["username"].startswith("@"):
+            acc["username"] = acc["username"][1:]
+        # the first account keeps the original cookies.json
+        name = "cookies.json" if i == 0 else f"cookies_{acc.get('username') or i}.json"
+        acc.setdefault("cookies_path", os.path.join(COOKIES_DIR, name))
+    return accounts
+
+
+def _new_client():
+    from twikit import Client
+    return Client("en-US")
+
+
+class TwikitSession:
+    """One long-lived authenticated client bound to an account."""
+
+    def __init__(self, account: dict):
+        self.account = account
+        self.client = None
+        self.ready = False
+        self.in_use = False
+        self.cooldown_until = 0.0
+        self.logins = 0
+        self.rate_limits = 0
+        self.auth_failures = 0
+        self.needs_login = False        # set by an auth error: saved cookies are no longer valid
+        self.failed_at = 0.0
+        self.logged_in_at = 0.0
+        self.last_saved = 0.0
+
+    @property
+    def username(self):
+        return self.account.get("username")
+
+    def available(self, now):
+        return not self.in_use and now >= self.cooldown_until
+
+    async def _login(self):
+        acc = self.account
+        if not all([acc.get("email"), acc.get("username"), acc.get("password")]):
+            raise RuntimeError("Twikit auth missing: no valid cookies and no credentials in env/config.")
+        os.makedirs(os.path.dirname(acc["cookies_path"]), exist_ok=True)
+        await maybe_await(self.client.login(auth_info_1=acc["email"], auth_info_2=acc["username"],
+                                            password=acc["password"]))
+        self.logins += 1
+        self.logged_in_at = time.monotonic()
+        await self.save_cookies()
+
+    async def connect(self, force_login: bool = False):
+        """Load saved cookies (validated as JSON) or log in; the client is reused afterwards."""
+        self.client = _new_client()
+        path = self.account["cookies_path"]
+        loaded = False
+        if not force_login and os.path.exists(path) and os.path.getsize(path) > 0:
+            try:
+                # validate JSON to avoid JSONDecodeError
+                with open(path, "r", encoding="utf-8") as f:
+                    json.load(f)
+                await maybe_await(self.client.load_cookies(path))
+                loaded = True
+            except Exception:
+                loaded = False
+        if not loaded:
+            await self._login()
+        self.ready = True
+        self.needs_login = False
+
+    async def save_cookies(self):
+        if self.client is not None:
+            await maybe_await(self.client.save_cookies(self.account["cookies_path"]))
+            self.last_saved = time.monotonic()
+
+
+class TwikitSessionPool:
+    """
+    Holds authenticated Twikit clients across requests. Requests check a client out instead of
+    building one; rate-limited sessions cool down while others serve, expired sessions re-login
+    once (serialized per account), and cookies are persisted in the background.
+    """
+
+    def __init__(self, accounts=None, sessions_per_account: int = SESSIONS_PER_ACCOUNT):
+        accounts = accounts if accounts is not None else load_accounts()
+        self.sessions = [TwikitSession(acc) for acc in accounts for _ in range(sessions_per_account)]
+        self._cond = asyncio.Condition()
+        self._login_locks = {}
+        self._refresher = None
+        self._rr = 0
+
+    def _pick(self):
+        now = time.monotonic()
+        n = len(self.sessions)
+        # round-robin so load and rate limits spread across accounts
+        for step in range(n):
+            s = self.sessions[(self._rr + step) % n]
+            if s.available(now):
+                self._rr = (self._rr + step + 1) % n
+                return s
+        return None
+
+    async def _ensure_ready(self, s, force_login=False):
+        lock = self._login_locks.setdefault(s.account["cookies_path"], asyncio.Lock())
+        async with lock:
+            if s.needs_login and not force_login:
+                # a session of the same account may have logged in since: its cookies are fresh
+                force_login = not any(o.account["cookies_path"] == s.account["cookies_path"]
+                                      and o.logged_in_at > s.failed_at for o in self.sessions)
+            if force_login or not s.ready:
+                await s.connect(force_login=force_login)
+
+    @asynccontextmanager
+    async def session(self):
+        """Check out a ready client; failures mark the session (cooldown / re-login) on the way out."""
+        self._start_refresher()
+        deadline = time.monotonic() + CHECKOUT_TIMEOUT_S
+        async with self._cond:
+            while (s := self._pick()) is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise NoSessionAvailable("All Twikit sessions are busy or rate-limited")
+                cooling = [x.cooldown_until for x in self.sessions if not x.in_use]
+                wake = min([remaining] + [max(0.05, c - time.monotonic()) for c in cooling])
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout=wake)
+                except asyncio.TimeoutError:
+                    pass
+            s.in_use = True
+        try:
+            await self._ensure_ready(s)
+            yield s.client
+        except Exception as e:
+            self._mark_failure(s, e)
+            raise
+        finally:
+            async with self._cond:
+                s.in_use = False
+                self._cond.notify_all()
+
+    def _mark_failure(self, s, exc):
+        name = type(exc).__name__
+        if name in RATE_LIMIT_ERRORS:
+            s.rate_limits += 1
+            reset = getattr(exc, "rate_limit_reset", None)
+            wait = (reset - time.time()) if reset else RATE_LIMIT_COOLDOWN_S
+            s.cooldown_until = time.monotonic() + max(1.0, min(wait, RATE_LIMIT_COOLDOWN_S))
+            print(f"Twikit session '{s.username}' rate-limited; cooling down")
+        elif name in AUTH_ERRORS:
+            s.auth_failures += 1
+            # cookies expired: the next checkout logs in again instead of reloading them
+            s.ready = False
+            s.needs_login = True
+            s.failed_at = time.monotonic()
+            print(f"Twikit session '{s.username}' expired ({name}); will re-login")
+
+    async def run(self, fn):
+        """Call `await fn(client)`, moving to another session when one is rate-limited or expired."""
+        last = None
+        for _ in range(max(1, len(self.sessions))):
+            try:
+                async with self.session() as client:
+                    return await fn(client)
+            except Exception as e:
+                if type(e).__name__ not in RATE_LIMIT_ERRORS | AUTH_ERRORS:
+                    raise
+                last = e
+        raise last
+
+    # --- background cookie refresh ---
+    def _start_refresher(self):
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(COOKIE_REFRESH_S)
+            for s in self.sessions:
+                try:
+                    if not s.ready and not s.in_use and time.monotonic() >= s.cooldown_until:
+                        await self._ensure_ready(s, force_login=True)   # re-login off the request path
+                    elif s.ready:
+                        await s.save_cookies()
+                except Exception as e:
+                    print(f"Twikit cookie refresh for '{s.username}' failed: {type(e).__name__}: {e}")
+
+    def stats(self):
+        now = time.monotonic()
+        return [{
+            "account": s.username,
+            "ready": s.ready,
+            "in_use": s.in_use,
+            "cooldown_s": round(max(0.0, s.cooldown_until - now), 1),
+            "logins": s.logins,
+            "rate_limits": s.rate_limits,
+            "auth_failures": s.auth_failures,
+        } for s in self.sessions]
+
+
+_pool = None
+
+
+def get_twikit_pool() -> TwikitSessionPool:
+    """Process-wide pool; created on first use inside the running event loop."""
+    global _pool
+    if _pool is None:
+        _pool = TwikitSessionPool()
+    return _pool
@@ -1,22 +1,31 @@
-from fastapi import FastAPI,Query, HTTPException
+from fastapi import FastAPI,Query, HTTPException, Request, Response
+import threading
 import uvicorn
 
 from models.Available_coin_analysis import available_coin_search
 # --- Analysis Functions ---
-from models.News_handler import analyze_discord_news_sentiment
-
-from models.coin_find_and_sentiment import analyze_verified_coin_sentiment_flow
-from models.coin_finder import extract_coin_keywords_from_ner
-from models.coinflow_Analysis import analyze_coin_flow_analysis
-
-from models.coinflow_With_sentiment import analyze_coin_flow_and_sentiment
-from models.general_handler import analyze_general_tweet_sentiment
+# run in the inference worker pool by "module:function" target (see services/worker_pool.py),
+# so the API process never imports or loads the models itself
 from reponse_handler.focus_sentiment_response import get_focus_sentiment_summary
 
 # --- Response Handlers (Summaries) ---
 from reponse_handler.general_response import get_general_sentiment_summary
 from reponse_handler.news_response import get_news_sentiment_summary
-from weight_handler.rag_system import build_rag_index, rag_top, rag_explain
+from weight_handler.rag_system import (build_rag_index, load_rag_snapshot, parse_weights, rag_index_status,
+                                       rag_top, rag_explain)
+from weight_handler.rag_evidence import get_evidence_index
+from model_loader.model_registry import MODEL_LOADERS
+from services.warmup import WARMUP_ON_STARTUP, warm_up
+from services.refresh_scheduler import REFRESH_ENABLED, REFRESH_PROBE_S, scheduler, serve
+from extrctor.async_fetcher import shutdown_fetcher
+from extrctor.tweets_extractor import ChannelBatches, latest_message_id
+from services.worker_pool import (POOL_ENABLED, POOL_STATS_WAIT_S, PoolFull, get_pool, pool_stats, run_job,
+                                  run_job_async, run_on_workers, shutdown_pool)
+from extrctor.twikit_pool import get_twikit_pool
+from services.search_cache import search_cache_stats
+from services.image_store import image_store
+from services.rolling_windows import METRICS, ingest_window_events, rolling
+from preprocessing.dedup import dedup_stats
 
 app = FastAPI(
     title="Crypto Sentiment Analysis API",
@@ -24,6 +33,70 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Heavy libraries, NLTK data and models load on first use; WARMUP_ON_STARTUP=1 loads them at boot
+# in the background instead (WARMUP_MODELS picks which models). Models live in the pool workers,
+# so each worker warms itself up, restarted ones included.
+@app.on_event("startup")
+def warm_up_on_startup():
+    if not WARMUP_ON_STARTUP:
+        return
+    if POOL_ENABLED:
+        get_pool().add_initializer("services.warmup:warm_up")
+    else:
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+
+# Summary endpoints serve the last materialized result; the scheduler refreshes it on an interval
+# and when the channel's newest message id changes.
+# The three channels are fetched together in one concurrent call (ChannelBatches) and the messages
+# handed to the analyses, which run in the inference worker pool, off the API process. A failed
+# Discord fetch fails the refresh (counted in /summary-status) instead of replacing the last result.
+discord_batches = ChannelBatches(["news", "general", "focus_based"], max_age_s=REFRESH_PROBE_S)
+
+scheduler.register(
+    "news",
+    lambda: get_news_sentiment_summary(run_job("models.News_handler:analyze_discord_news_sentiment",
+                                               messages=discord_batches.get("news"), verbose=False)),
+    probe=lambda: latest_message_id("news"),
+)
+scheduler.register(
+    "general",
+    lambda: get_general_sentiment_summary(run_job("models.general_handler:analyze_general_tweet_sentiment",
+                                                  messages=discord_batches.get("general"), verbose=False)),
+    probe=lambda: latest_message_id("general"),
+)
+scheduler.register(
+    "focus",
+    lambda: get_focus_sentiment_summary(
+        ingest_window_events(
+            run_job("models.coinflow_With_sentiment:analyze_coin_flow_and_sentiment",
+                    messages=discord_batches.get("focus_based")))),
+    probe=lambda: latest_message_id("focus_based"),
+)
+
+# Workers start from the last published RAG snapshot instead of an empty index; sources that
+# changed since it was built are re-ingested incrementally on the next RAG request.
+@app.on_event("startup")
+def load_rag_index_snapshot():
+    load_rag_snapshot()
+
+@app.on_event("startup")
+def start_refresh_scheduler():
+    if REFRESH_ENABLED:
+        scheduler.start()
+
+@app.on_event("shutdown")
+def stop_refresh_scheduler():
+    scheduler.stop()
+    shutdown_pool()
+    shutdown_fetcher()
+
+async def _pooled(target: str, **kwargs):
+    """Run a CPU-bound analysis in the worker pool; 503 when every worker queue is full."""
+    try:
+        return await run_job_async(target, **kwargs)
+    except PoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
 # ============================
 # Sentiment Analysis Endpoints
 # ============================
@@ -47,27 +120,34 @@ app = FastAPI(
 # coin Endpoints
 # =======================
 @app.get("/run-coin-finder", tags=["Coin Analysis"])
-def run_coin_finder():
-    result = extract_coin_keywords_from_ner()  # already returns a dict
+async def run_coin_finder():
+    result = await _pooled("models.coin_finder:extract_coin_keywords_from_ner")
     return {
         "message": result.get("message", "Coin keyword extraction completed."),
         "top_new_coins": result.get("top_new_coins", []),
-        "top_keywords_clean": result.get("top_keywords_clean", [])
+        "top_keywords_clean": result.get("top_keywords_clean", []),
+        "dedup": result.get("dedup", {})
     }
 
 @app.get("/run-coin-finder-and-evaluate", tags=["Coin Analysis"])
-def run_coin_finder_and_evaluate():
-    result = analyze_verified_coin_sentiment_flow()
+async def run_coin_finder_and_evaluate():
+    result = ingest_window_events(
+        await _pooled("models.coin_find_and_sentiment:analyze_verified_coin_sentiment_flow"))
     return {
         "message": "Coin evaluation and sentiment flow analysis completed and results saved.",
-        "top_positive_potential_coins": result
+        "top_positive_potential_coins": result.get("potential_positive_coin_names", {}),
+        "dedup": result.get("dedup", {})
     }
 
 @app.get("/run-coin-flow-and-evaluate", tags=["Coin Flow Analysis"])
-def run_coin_finder_and_flow_evaluate():
-    analyze_coin_flow_analysis()
+async def run_coin_finder_and_flow_evaluate(
+    top_n: int = Query(0, ge=0, description="Render charts only for the top-N coins by |net flow| (0 = all)")
+):
+    kwargs = {"top_n": top_n} if top_n else {}
+    result = ingest_window_events(await _pooled("models.coinflow_Analysis:analyze_coin_flow_analysis", **kwargs))
     return {
-        "message": "Coin flow analysis completed. Charts and results saved."
+        "message": "Coin flow analysis completed. Charts and results saved.",
+        "charts": result.get("charts", {})
     }
 @app.get("/coin-sentiment", tags=["Search Sentiment"])
 async def coin_sentiment(
@@ -80,47 +160,174 @@ async def coin_sentiment(
         return {
             "query": coin, "total_mentions": 0, "positive": 0, "negative": 0,
             "positive_pct": 0.0, "negative_pct": 0.0,
-            "bar_image_base64": "", "sample_texts": [f"error: {type(e).__name__}: {e}"]
+            "bar_image_url": "", "sample_texts": [f"error: {type(e).__name__}: {e}"]
         }
 
+# Rolling per-coin windows, fed by the flow/sentiment analyses above; answered from the ring
+# buffers without rescanning history.
+@app.get("/coin-windows", tags=["Coin Flow Analysis"])
+def coin_windows(
+    coin: str = Query(..., description="Coin or ticker e.g. BTC, $BTC, Bitcoin"),
+    metric: str = Query("flow", description=f"One of {', '.join(METRICS)}"),
+    window: str = Query(None, description="e.g. 5m, 1h, 24h (default: all windows)")
+):
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric '{metric}'. Expected one of {list(METRICS)}")
+    try:
+        windows = rolling.query(coin, metric, window)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+    return {"coin": coin, "metric": metric, "windows": windows}
+
+@app.get("/coin-windows/top", tags=["Coin Flow Analysis"])
+def coin_windows_top(
+    metric: str = Query("flow", description=f"One of {', '.join(METRICS)}"),
+    window: str = Query("1h", description="e.g. 5m, 1h, 24h"),
+    k: int = Query(10, ge=1, le=100)
+):
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric '{metric}'. Expected one of {list(METRICS)}")
+    try:
+        return {"metric": metric, "window": window, "top": rolling.top(metric, window, k)}
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+
+@app.get("/coin-windows/stats", tags=["Coin Flow Analysis"])
+def coin_windows_stats():
+    return rolling.stats()
+
+# Duplicate messages dropped in preprocessing, per channel. The seen-set is shared by every worker
+# (SQLite), so the API process reads the totals directly; each message id is counted once.
+@app.get("/preprocess/dedup-stats", tags=["Preprocessing"])
+def get_dedup_stats():
+    return dedup_stats()
+
+@app.get("/coin-sentiment/sessions", tags=["Search Sentiment"])
+async def coin_sentiment_sessions():
+    return {"sessions": get_twikit_pool().stats(), "cache": search_cache_stats()}
+
+# =======================
+# Images
+# =======================
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match is "*" or a comma-separated list of (possibly weak) entity tags."""
+    tags = [t.strip() for t in if_none_match.split(",") if t.strip()]
+    # weak comparison, as RFC 9110 requires for If-None-Match
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+@app.get("/images/{image_id}", tags=["Images"])
+def get_image(image_id: str, request: Request):
+    """Content-addressed chart images: the id is the content hash, so responses are immutable."""
+    found = image_store.get(image_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Image not found or expired")
+    data, media_type = found
+    etag = f'"{image_id}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=media_type, headers=headers)
+
 # =======================
 # Summary Endpoints
 # =======================
 
 @app.get("/news-sentiment-summary", tags=["Summary"])
 def get_news_summary():
-    analyze_discord_news_sentiment()
-    return get_news_sentiment_summary()
+    return serve("news")
 
 @app.get("/general-sentiment-summary", tags=["Summary"])
 def get_general_summary():
-    analyze_general_tweet_sentiment()
-    return get_general_sentiment_summary()
+    return serve("general")
 @app.get("/focus-sentiment-summary", tags=["Summary"])
 def get_focus_summary():
-    analyze_coin_flow_and_sentiment()
-    return get_focus_sentiment_summary()
+    return serve("focus")
+
+@app.get("/summary-status", tags=["Summary"])
+def get_summary_status():
+    return scheduler.status()
+
+@app.post("/summary-refresh", tags=["Summary"])
+def post_summary_refresh(name: str = Query(..., description="news, general or focus")):
+    if name not in ("news", "general", "focus"):
+        raise HTTPException(status_code=404, detail=f"Unknown summary '{name}'")
+    scheduler.trigger(name)
+    return {"message": f"Refresh of '{name}' scheduled"}
 
 # =======================
 # RAG Endpoints
 # =======================
 
+# build_rag_index is incremental: only changed source files are re-read, and with no changes it
+# is a few stat() calls, so the read endpoints sync the index on every request.
+
 @app.post("/rag/refresh", tags=["RAG"])
 def rag_refresh():
     meta = build_rag_index()
     return {"message": "RAG index refreshed", **meta}
 
+@app.get("/rag/status", tags=["RAG"])
+def rag_status():
+    return rag_index_status()
+
 @app.get("/rag/top", tags=["RAG"])
-def rag_get_top(k: int = Query(10, ge=1, le=50)):
-    if not rag_top(1):  # empty -> build once
-        build_rag_index()
-    return {"top": rag_top(k)}
+def rag_get_top(
+    k: int = Query(10, ge=1, le=50),
+    weights: str = Query(None, description="What-if weights for this request only: six numbers in order "
+                                           "news_sent,general_sent,focus_sent,flow,mentions,twitter_sent "
+                                           "or name=value pairs, e.g. 'flow=0.5,mentions=0'")
+):
+    build_rag_index()
+    if not weights:
+        return {"top": rag_top(k)}
+    try:
+        overrides = parse_weights(weights)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"top": rag_top(k, weights=overrides), "weights": overrides}
 
 @app.get("/rag/explain", tags=["RAG"])
-def rag_get_explain(coin: str = Query(..., description="Coin or ticker e.g. BTC, $BTC, Bitcoin")):
-    if not rag_top(1):
-        build_rag_index()
-    return rag_explain(coin)
+def rag_get_explain(
+    coin: str = Query(..., description="Coin or ticker e.g. BTC, $BTC, Bitcoin"),
+    k: int = Query(3, ge=0, le=20, description="Supporting/contradicting messages to return")
+):
+    build_rag_index()
+    return rag_explain(coin, evidence_k=k)
+
+# Evidence messages are embedded in the inference worker pool; the API only reads the store.
+@app.post("/rag/evidence/index", tags=["RAG"])
+async def rag_index_evidence():
+    return await _pooled("weight_handler.rag_evidence:index_evidence")
+
+@app.get("/rag/evidence/status", tags=["RAG"])
+def rag_evidence_status():
+    return get_evidence_index().stats()
+
+# =======================
+# Model Registry
+# =======================
+
+# models and caches are per process: these report every pool worker (busy workers are marked)
+@app.get("/models/stats", tags=["Models"])
+def get_model_stats():
+    return {"workers": run_on_workers("model_loader.model_registry:registry_stats", wait_s=POOL_STATS_WAIT_S)}
+
+@app.get("/models/pool-stats", tags=["Models"])
+def get_pool_stats():
+    return pool_stats()
+
+@app.get("/models/cache-stats", tags=["Models"])
+def get_cache_stats():
+    return {"workers": run_on_workers("services.inference_cache:cache_stats", wait_s=POOL_STATS_WAIT_S)}
+
+@app.post("/models/warmup", tags=["Models"])
+def post_warmup(models: str = Query("", description="Comma-separated models to preload, e.g. 'finbert,ner'")):
+    names = [m.strip() for m in models.split(",") if m.strip()]
+    unknown = [n for n in names if n not in MODEL_LOADERS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown model(s) {unknown}. Known: {sorted(MODEL_LOADERS)}")
+    return {"message": "Warm-up completed", "workers": run_on_workers("services.warmup:warm_up", models=names or None)}
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,131 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from model_loader.model_registry import use_model, model_revision
+from preprocessing.preprocess import PREPROCESS_VERSION
+from services.inference_cache import cached_map
+
+# Knobs (env-overridable)
+BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", "16"))        # fixed forward-pass size within a bucket
+MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "64"))          # max texts a micro-batch collects
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))    # how long to wait for more requests
+MAX_TOKENS = 512
+
+
+def _token_lengths(pipe, texts):
+    tokenizer = getattr(pipe, "tokenizer", None)
+    if tokenizer is None:
+        return [len(t) for t in texts]
+    enc = tokenizer(list(texts), truncation=True, max_length=MAX_TOKENS)
+    return [len(ids) for ids in enc["input_ids"]]
+
+
+def run_batched(pipe, texts, batch_size: int = BATCH_SIZE, token_level: bool = False):
+    """
+    Run a text-classification pipeline over `texts` in length-bucketed batches.
+    Texts are sorted by token length so each fixed-size batch pads to a similar length;
+    results come back in input order.
+    With `token_level` (NER), each result is the entity list for its text and truncation is left to the pipeline.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    lengths = _token_lengths(pipe, texts)
+    order = sorted(range(len(texts)), key=lambda i: lengths[i])
+
+    results = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        batch = [texts[i] for i in idx]
+        if token_level:
+            for i, r in zip(idx, pipe(batch, batch_size=len(batch))):
+                results[i] = r
+            continue
+        out = pipe(batch, batch_size=len(batch), truncation=True, max_length=MAX_TOKENS)
+        for i, r in zip(idx, out):
+            # pipelines return [dict] for a single text with top_k set, dict otherwise
+            results[i] = r[0] if isinstance(r, list) else r
+    return results
+
+
+class MicroBatcher:
+    """
+    Collects texts from concurrent callers into shared forward passes.
+    A batch closes when it reaches `max_batch` texts or `max_wait_ms` after its first text.
+    """
+
+    def __init__(self, model_name: str, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS,
+                 batch_size: int = BATCH_SIZE):
+        self.model_name = model_name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name=f"batcher-{model_name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts):
+        futures = []
+        for text in texts:
+            fut = Future()
+            self._queue.put((text, fut))
+            futures.append(fut)
+        return futures
+
+    def classify(self, texts):
+        return [f.result() for f in self.submit(texts)]
+
+    def _collect(self):
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _loop(self):
+        while True:
+            items = self._collect()
+            texts = [t for t, _ in items]
+            try:
+                with use_model(self.model_name) as pipe:
+                    outputs = run_batched(pipe, texts, self.batch_size)
+            except Exception as e:
+                for _, fut in items:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), out in zip(items, outputs):
+                fut.set_result(out)
+
+
+_BATCHERS = {}
+_BATCHERS_LOCK = threading.Lock()
+
+
+def get_batcher(model_name: str) -> MicroBatcher:
+    with _BATCHERS_LOCK:
+        batcher = _BATCHERS.get(model_name)
+        if batcher is None:
+            batcher = _BATCHERS[model_name] = MicroBatcher(model_name)
+        return batcher
+
+
+def classify_texts(model_name: str, texts, keys=None, use_cache: bool = True):
+    """
+    Classify texts with a registry model; concurrent callers share micro-batches.
+    With `use_cache`, only texts missing from the inference cache reach the model.
+    """
+    batcher = get_batcher(model_name)
+    if not use_cache:
+        return batcher.classify(texts)
+    # keys are usually message ids, so the revision also pins the text preprocessing
+    revision = model_revision(model_name) + ";" + PREPROCESS_VERSION
+    return cached_map(model_name, revision, texts, batcher.classify, keys=keys)
@@ -1,24 +1,140 @@
-from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification, AutoModelForSequenceClassification
+import os
+import shutil
 
+# transformers/torch/optimum are imported inside the loaders so importing this module stays cheap
 
-def load_deberta_ner_model():
+# Inference backend: "pytorch" (default), "onnx" (fp32) or "onnx-int8" (dynamic-quantized)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "pytorch").lower()
+BACKENDS = ("pytorch", "onnx", "onnx-int8")
+
+# Exported ONNX graphs are cached here: <cache>/<model_name>/{fp32,int8}
+ONNX_CACHE_DIR = os.getenv(
+    "ONNX_CACHE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "onnx_models")),
+)
+ONNX_PROVIDER = "CPUExecutionProvider"
+
+
+def _onnx_dir(model_name: str, variant: str) -> str:
+    return os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "__"), variant)
+
+
+def _load_onnx_model(model_name: str, token_task: bool, quantize: bool, feature_extraction: bool = False):
+    from optimum.onnxruntime import (
+        ORTModelForFeatureExtraction, ORTModelForSequenceClassification, ORTModelForTokenClassification,
+        ORTQuantizer
+    )
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    if feature_extraction:
+        ort_cls = ORTModelForFeatureExtraction
+    else:
+        ort_cls = ORTModelForTokenClassification if token_task else ORTModelForSequenceClassification
+
+    # === fp32 export (once per model) ===
+    fp32_dir = _onnx_dir(model_name, "fp32")
+    if not os.path.exists(os.path.join(fp32_dir, "model.onnx")):
+        print(f"Exporting {model_name} to ONNX at {fp32_dir} ...")
+        ort_model = ort_cls.from_pretrained(model_name, export=True, provider=ONNX_PROVIDER)
+        ort_model.save_pretrained(fp32_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(fp32_dir)
+    if not quantize:
+        return ort_cls.from_pretrained(fp32_dir, provider=ONNX_PROVIDER), fp32_dir
+
+    # === int8 dynamic quantization (once per model) ===
+    int8_dir = _onnx_dir(model_name, "int8")
+    if not os.path.exists(os.path.join(int8_dir, "model_quantized.onnx")):
+        print(f"Quantizing {model_name} to int8 at {int8_dir} ...")
+        quantizer = ORTQuantizer.from_pretrained(fp32_dir)
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=int8_dir, quantization_config=qconfig)
+        for name in os.listdir(fp32_dir):
+            if name != "model.onnx" and not os.path.exists(os.path.join(int8_dir, name)):
+                src = os.path.join(fp32_dir, name)
+                if os.path.isfile(src):
+                    shutil.copy(src, int8_dir)
+    return ort_cls.from_pretrained(int8_dir, file_name="model_quantized.onnx", provider=ONNX_PROVIDER), int8_dir
+
+
+def _build_pipeline(task: str, model_name: str, token_task: bool, backend: str = None, **pipeline_kwargs):
+    backend = (backend or MODEL_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Expected one of {BACKENDS}")
+    from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification, AutoModelForSequenceClassification
+
+    if backend == "pytorch":
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model_cls = AutoModelForTokenClassification if token_task else AutoModelForSequenceClassification
+        model = model_cls.from_pretrained(model_name)
+    else:
+        model, model_dir = _load_onnx_model(model_name, token_task, quantize=(backend == "onnx-int8"))
+        tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+    return pipeline(task, model=model, tokenizer=tokenizer, **pipeline_kwargs)
+
+
+def load_deberta_ner_model(backend: str = None):
     model_name = "Jean-Baptiste/roberta-large-ner-english"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForTokenClassification.from_pretrained(model_name)
-    ner_pipeline = pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
-    return ner_pipeline
+    return _build_pipeline("ner", model_name, token_task=True, backend=backend, aggregation_strategy="simple")
 
-def load_finbert_sentiment_model():
+def load_finbert_sentiment_model(backend: str = None):
     model_name = "yiyanghkust/finbert-tone"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForSequenceClassification.from_pretrained(model_name)
-    sentiment_pipeline = pipeline("text-classification", model=model, tokenizer=tokenizer)
-    return sentiment_pipeline
+    return _build_pipeline("text-classification", model_name, token_task=False, backend=backend)
 
 
-def load_deberta_sentiment_model():
+def load_deberta_sentiment_model(backend: str = None):
     model_name = "cardiffnlp/twitter-roberta-base-sentiment"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForSequenceClassification.from_pretrained(model_name)
-    sentiment_pipeline = pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
-    return sentiment_pipeline
\ No newline at end of file
+    return _build_pipeline("sentiment-analysis", model_name, token_task=False, backend=backend)
+
+
+def load_prosus_finbert_model(backend: str = None):
+    model_name = "ProsusAI/finbert"
+    return _build_pipeline("sentiment-analysis", model_name, token_task=False, backend=backend)
+
+
+class SentenceEmbedder:
+    """Mean-pooled, L2-normalized sentence embeddings; calling it returns a float32 (n, dim) array."""
+
+    def __init__(self, model, tokenizer, max_length: int = 128):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.dim = model.config.hidden_size
+
+    def __call__(self, texts, batch_size: int = 64):
+        import numpy as np
+        import torch
+
+        texts = list(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        # length-sorted batches keep padding small
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            enc = self.tokenizer([texts[i] for i in idx], padding=True, truncation=True,
+                                 max_length=self.max_length, return_tensors="pt")
+            with torch.no_grad():
+                hidden = self.model(**enc).last_hidden_state
+            mask = enc["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            emb = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+            out[idx] = torch.nn.functional.normalize(emb, dim=1).cpu().numpy()
+        return out
+
+
+def load_sentence_embedder(backend: str = None):
+    model_name = "sentence-transformers/all-MiniLM-L6-v2"
+    backend = (backend or MODEL_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Expected one of {BACKENDS}")
+    from transformers import AutoModel, AutoTokenizer
+
+    if backend == "pytorch":
+        model = AutoModel.from_pretrained(model_name)
+        model.eval()
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+    else:
+        model, model_dir = _load_onnx_model(model_name, token_task=False, quantize=(backend == "onnx-int8"),
+                                            feature_extraction=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    return SentenceEmbedder(model, tokenizer)
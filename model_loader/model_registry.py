@@ -0,0 +1,180 @@
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from model_loader import berta_models
+
+# RAM budget for resident models (MB). Idle models are evicted LRU-first when a load would exceed it.
+MODEL_RAM_BUDGET_MB = int(os.getenv("MODEL_RAM_BUDGET_MB", "4096"))
+
+# name -> loader; every loader returns a ready-to-call HF pipeline (minilm: a SentenceEmbedder)
+MODEL_LOADERS = {
+    "finbert": berta_models.load_finbert_sentiment_model,
+    "twitter_roberta": berta_models.load_deberta_sentiment_model,
+    "ner": berta_models.load_deberta_ner_model,
+    "prosus_finbert": berta_models.load_prosus_finbert_model,
+    "minilm": berta_models.load_sentence_embedder,
+}
+
+# name -> hub id; with the backend this forms the revision that cached outputs are keyed by
+MODEL_IDS = {
+    "finbert": "yiyanghkust/finbert-tone",
+    "twitter_roberta": "cardiffnlp/twitter-roberta-base-sentiment",
+    "ner": "Jean-Baptiste/roberta-large-ner-english",
+    "prosus_finbert": "ProsusAI/finbert",
+    "minilm": "sentence-transformers/all-MiniLM-L6-v2",
+}
+
+
+def model_revision(name: str) -> str:
+    return f"{MODEL_IDS.get(name, name)}@{berta_models.MODEL_BACKEND}"
+
+
+def _estimate_bytes(obj) -> int:
+    """Parameter + buffer bytes of the torch module behind a pipeline (0 if unknown)."""
+    model = getattr(obj, "model", obj)
+    # ONNX Runtime models: use the size of the graph file on disk
+    model_path = getattr(model, "model_path", None)
+    if model_path and os.path.isfile(str(model_path)):
+        return os.path.getsize(str(model_path))
+    total = 0
+    try:
+        for p in model.parameters():
+            total += p.numel() * p.element_size()
+        for b in model.buffers():
+            total += b.numel() * b.element_size()
+    except Exception:
+        return 0
+    return total
+
+
+class _Entry:
+    __slots__ = ("model", "size_bytes", "in_use", "last_used")
+
+    def __init__(self, model, size_bytes):
+        self.model = model
+        self.size_bytes = size_bytes
+        self.in_use = 0
+        self.last_used = time.time()
+
+
+class ModelRegistry:
+    """Process-wide, thread-safe cache of loaded models with an LRU RAM budget."""
+
+    def __init__(self, loaders, budget_mb: int = MODEL_RAM_BUDGET_MB):
+        self._loaders = dict(loaders)
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self._entries = OrderedDict()            # name -> _Entry, oldest first
+        self._lock = threading.RLock()
+        self._load_locks = {}                    # name -> Lock (one loader run at a time per model)
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def register(self, name: str, loader):
+        with self._lock:
+            self._loaders[name] = loader
+
+    def _resident_bytes(self) -> int:
+        return sum(e.size_bytes for e in self._entries.values())
+
+    def _evict_for(self, incoming_bytes: int):
+        # caller holds self._lock
+        while self._entries and self._resident_bytes() + incoming_bytes > self.budget_bytes:
+            victim = next((n for n, e in self._entries.items() if e.in_use == 0), None)
+            if victim is None:
+                print("Model budget exceeded but every resident model is in use; loading anyway.")
+                return
+            del self._entries[victim]
+            self.evictions += 1
+            print(f"Evicted model '{victim}' to stay within {self.budget_bytes // (1024 * 1024)} MB.")
+        gc.collect()
+
+    def _checkout(self, name: str):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+                entry.in_use += 1
+                entry.last_used = time.time()
+                self.hits += 1
+                return entry.model
+            if name not in self._loaders:
+                raise KeyError(f"Unknown model '{name}'. Known: {sorted(self._loaders)}")
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            # another thread may have finished loading while we waited
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    self._entries.move_to_end(name)
+                    entry.in_use += 1
+                    entry.last_used = time.time()
+                    self.hits += 1
+                    return entry.model
+
+            model = self._loaders[name]()
+            size = _estimate_bytes(model)
+
+            with self._lock:
+                self._evict_for(size)
+                entry = _Entry(model, size)
+                entry.in_use = 1
+                self._entries[name] = entry
+                self.loads += 1
+                return model
+
+    def _release(self, name: str):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry.in_use > 0:
+                entry.in_use -= 1
+                entry.last_used = time.time()
+
+    @contextmanager
+    def use(self, name: str):
+        """Borrow a model; it cannot be evicted while the block runs."""
+        model = self._checkout(name)
+        try:
+            yield model
+        finally:
+            self._release(name)
+
+    def get(self, name: str):
+        """Return a model without pinning it (it may be evicted once idle)."""
+        model = self._checkout(name)
+        self._release(name)
+        return model
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.loads
+            return {
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "resident_models": list(self._entries.keys()),
+                "resident_mb": round(self._resident_bytes() / (1024 * 1024), 1),
+                "budget_mb": self.budget_bytes // (1024 * 1024),
+                "backend": berta_models.MODEL_BACKEND,
+            }
+
+
+registry = ModelRegistry(MODEL_LOADERS)
+
+
+def use_model(name: str):
+    return registry.use(name)
+
+
+def get_model(name: str):
+    return registry.get(name)
+
+
+def registry_stats():
+    return registry.stats()
@@ -1,63 +1,17 @@
 # models/Availble_coin_analysis.py
-import os, io, base64, json, inspect
+import os
 from typing import Dict, Any
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from twikit import Client
-from configurations import config
+from extrctor.twikit_pool import maybe_await, get_twikit_pool
+from services.chart_render import bar_strip_svg
+from services.image_store import chart_url
+from services.search_cache import cached_search_async
+from services.warmup import get_vader
 
 base_dir = os.path.dirname(__file__)
-cookies_path = os.path.abspath(os.path.join(base_dir, "..", "configurations", "cookies.json"))
-
-def _ensure_vader():
-    try:
-        SentimentIntensityAnalyzer()
-    except Exception:
-        nltk.download("vader_lexicon", quiet=True)
-
-async def _maybe_await(x):
-    # Await only if it's awaitable; otherwise just return the value.
-    if inspect.isawaitable(x):
-        return await x
-    return x
-
-async def _twikit_login_and_save(client: Client) -> None:
-    email = os.getenv("TWIKIT_EMAIL", getattr(config, "TWITTER_EMAIL", None))
-    username = os.getenv("TWIKIT_USERNAME", getattr(config, "TWITTER_USERNAME", None))
-    password = os.getenv("TWIKIT_PASSWORD", getattr(config, "TWITTER_PASSWORD", None))
-    if username and username.startswith("@"):
-        username = username[1:]
-    if not all([email, username, password]):
-        raise RuntimeError("Twikit auth missing: no valid cookies and no credentials in env/config.")
-    os.makedirs(os.path.dirname(cookies_path), exist_ok=True)
-    await _maybe_await(client.login(auth_info_1=email, auth_info_2=username, password=password))
-    await _maybe_await(client.save_cookies(cookies_path))
-
-async def _load_or_login(client: Client) -> None:
-    need_login = True
-    if os.path.exists(cookies_path) and os.path.getsize(cookies_path) > 0:
-        try:
-            # validate JSON to avoid JSONDecodeError
-            with open(cookies_path, "r", encoding="utf-8") as f:
-                json.load(f)
-            await _maybe_await(client.load_cookies(cookies_path))
-            need_login = False
-        except Exception:
-            need_login = True
-    if need_login:
-        await _twikit_login_and_save(client)
-
-async def available_coin_search(query: str, max_results: int = 300) -> Dict[str, Any]:
-    _ensure_vader()
-
-    client = Client("en-US")
-    await _load_or_login(client)
 
+async def _search_texts(client, query: str, max_results: int):
     # --- fetch tweets (async or sync, depending on Twikit version) ---
-    res = await _maybe_await(client.search_tweet(query=query, product="Latest"))
+    res = await maybe_await(client.search_tweet(query=query, product="Latest"))
 
     texts, seen = [], set()
 
@@ -81,9 +35,20 @@ async def available_coin_search(query: str, max_results: int = 300) -> Dict[str,
         await handle_async_iter(res)
     else:
         handle_sync_iter(res)
+    return texts
+
+async def available_coin_search(query: str, max_results: int = 300) -> Dict[str, Any]:
+    async def fetch(n):
+        # check out a long-lived client from the session pool (rotates accounts on rate limits)
+        return await get_twikit_pool().run(lambda client: _search_texts(client, query, n))
+
+    # one scrape per query per TTL; a cached larger max_results serves smaller requests
+    return await cached_search_async("twikit", query, max_results, fetch, _summarize)
+
+def _summarize(query: str, texts) -> Dict[str, Any]:
+    sia = get_vader()
 
     # --- sentiment ---
-    sia = SentimentIntensityAnalyzer()
     pos = neg = 0
     for s in texts:
         c = sia.polarity_scores(s)["compound"]
@@ -93,21 +58,8 @@ async def available_coin_search(query: str, max_results: int = 300) -> Dict[str,
     pos_pct = round(100 * pos / total, 2) if total else 0.0
     neg_pct = round(100 * neg / total, 2) if total else 0.0
 
-    # --- chart ---
-    fig, ax = plt.subplots(figsize=(8, 0.9), dpi=100)
-    ax.axis("off")
-    fig.patch.set_facecolor("#111827"); ax.set_facecolor("#111827")
-    pos_w = (pos / total) if total else 0; neg_w = (neg / total) if total else 0
-    ax.barh([0], [pos_w], left=0, height=0.5)
-    ax.barh([0], [neg_w], left=pos_w, height=0.5)
-    ax.text(0, 0.85, f"{pos_pct:.2f}%", va="center", ha="left", fontsize=14)
-    ax.text(1, 0.85, f"{neg_pct:.2f}%", va="center", ha="right", fontsize=14)
-    ax.text(0, 1.35, "Community Mentions", va="center", ha="left", fontsize=16)
-    ax.set_xlim(0,1); ax.set_ylim(-0.5,1.8)
-    buf = io.BytesIO(); plt.tight_layout(pad=1.0)
-    fig.savefig(buf, format="png", bbox_inches="tight", facecolor=fig.get_facecolor())
-    plt.close(fig)
-    bar_b64 = "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode("utf-8")
+    # --- chart (SVG template, served from /images/<content hash>) ---
+    bar_url = chart_url(bar_strip_svg(pos_pct, neg_pct, pos, neg, total))
 
     return {
         "query": query,
@@ -116,6 +68,6 @@ async def available_coin_search(query: str, max_results: int = 300) -> Dict[str,
         "negative": neg,
         "positive_pct": pos_pct,
         "negative_pct": neg_pct,
-        "bar_image_base64": bar_b64,
+        "bar_image_url": bar_url,
         "sample_texts": texts[:10],
     }
\ No newline at end of file
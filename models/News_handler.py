@@ -1,45 +1,47 @@
-import json
-import pandas as pd
-from extrctor.tweets_extractor import fetch_discord_messages
-from model_loader.berta_models import load_finbert_sentiment_model
-from services.tweet_converter import run_preprocessing_news
+from extrctor.tweets_extractor import fetch_channel_batch
+from model_loader.batch_inference import classify_texts
+from services.inference_cache import record_keys
+from services.persistence import PERSIST, persist_json
+from services.tweet_converter import preprocess_messages
 import os
 base_dir = os.path.dirname(__file__)
 
-def analyze_discord_news_sentiment():
+def analyze_discord_news_sentiment(messages=None, persist: bool = PERSIST, verbose: bool = True, strict: bool = False):
+    """
+    Score news messages with FinBERT and return [{text, dominant_sentiment}].
+    Runs fully in memory; `persist` writes raw input and results in the background.
+    """
     channel_type = "news"
     raw_json_file = os.path.join(base_dir, "..", "test data", "raw_news_messages.json")
     output_json_file= os.path.join(base_dir, "..", "test data","sentiment_output_for_news.json")
-    # Step 1: Fetch Discord messages and save raw JSON
-    fetch_discord_messages(channel_type, raw_json_file)
+    # Step 1: Fetch Discord messages (kept in memory)
+    if messages is None:
+        messages = fetch_channel_batch(channel_type, strict)
 
-    # Step 2: Preprocess the fetched messages (input_path = raw_json_file)
-    preprocessed_path = run_preprocessing_news(input_path=raw_json_file)
+    # Step 2 + 3: Preprocess in memory into normalized records
+    records = preprocess_messages(messages, channel_type)
+    news_texts = [r["text"] for r in records]
 
-    # Step 3: Load cleaned/preprocessed news texts
-    with open(preprocessed_path, "r", encoding='utf-8') as f:
-        news_texts = json.load(f)
-
-    # Step 4: Load FinBERT model
-    sentiment_model = load_finbert_sentiment_model()
-
-    # Step 5: Run sentiment analysis
+    # Step 4 + 5: Run FinBERT sentiment in shared micro-batches (cached per message id)
+    outputs = classify_texts("finbert", [text[:512] for text in news_texts], keys=record_keys(records))
     results = []
-    for text in news_texts:
-        trimmed = text[:512]
-        result = sentiment_model(trimmed)[0]
+    for text, result in zip(news_texts, outputs):
         sentiment_label = result["label"].upper()
         results.append({
             "text": text,
             "dominant_sentiment": sentiment_label
         })
 
-    # Step 6: Display and save to JSON
-    df = pd.DataFrame(results)
-    with pd.option_context('display.max_rows', None, 'display.max_colwidth', 100):
-        print(df)
+    # Step 6: Display and (optionally) persist
+    if verbose:
+        import pandas as pd
+        df = pd.DataFrame(results)
+        with pd.option_context('display.max_rows', None, 'display.max_colwidth', 100):
+            print(df)
 
-    with open(output_json_file, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    if persist:
+        persist_json(messages, raw_json_file)
+        persist_json(results, output_json_file)
+        print(f"Sentiment analysis results queued for '{output_json_file}'")
 
-    print(f"Sentiment analysis results saved to '{output_json_file}'")
+    return results
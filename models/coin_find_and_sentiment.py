@@ -1,35 +1,29 @@
-import re
-import json
 import os
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
 from collections import defaultdict
-from transformers import pipeline
 
-from extrctor.tweets_extractor import fetch_discord_messages
+from extrctor.tweets_extractor import fetch_channel_batch
+from model_loader.batch_inference import classify_texts
 from models.coin_finder import extract_coin_keywords_from_ner
-from services.tweet_converter import run_preprocessing_focus
+from services.coin_matcher import TICKER_ALIASES, get_coin_matcher
+from services.flow_parser import parse_flows
+from services.persistence import PERSIST, persist_json
+from services.rolling_windows import flow_events
+from preprocessing.dedup import merge_counts
+from services.tweet_converter import preprocess_messages
+from services.warmup import get_vader
 
 base_dir = os.path.dirname(__file__)
-nltk.download('vader_lexicon')
 
-# === FinBERT Setup ===
-finbert = pipeline("sentiment-analysis", model="ProsusAI/finbert")
 known_coin_names = {
     "ethereum", "bitcoin", "xrp", "solana", "ondo", "cronos",
     "binance", "picoin", "cardano", "cryptonews", "crypto",
     "litecoin", "whale", "finance", "transfer"
 }
 
-def analyze_verified_coin_sentiment_flow():
-    # === Step 1: Run coin extraction and get the path ===
-    extract_coin_keywords_from_ner()
-
-    coin_list_file = os.path.join(base_dir, "..", "test data", "coin_keywords_extracted.json")
-
-    with open(coin_list_file, 'r', encoding='utf-8') as f:
-        ner_data = json.load(f)
-        raw_data = ner_data.get("coin_keywords_filtered", {})
+def analyze_verified_coin_sentiment_flow(messages=None, persist: bool = PERSIST, strict: bool = False):
+    # === Step 1: Run coin extraction (in memory) ===
+    ner_data = extract_coin_keywords_from_ner(persist=persist, strict=strict)
+    raw_data = ner_data.get("coin_keywords_filtered", {})
 
     # === Extract all coin-like names (excluding numbers and known coins) ===
     potential_names = set()
@@ -44,80 +38,75 @@ def analyze_verified_coin_sentiment_flow():
     raw_json_file = os.path.join(base_dir, "..", "test data", "raw_focus_messages.json")
     output_json_file = os.path.join(base_dir, "..", "test data", "verified_sentiment_output_focus_group.json")
 
-    fetch_discord_messages(channel_type, raw_json_file)
-    preprocessed_path = run_preprocessing_focus(input_path=raw_json_file)
-
-    with open(preprocessed_path, 'r', encoding='utf-8') as f:
-        tweets = json.load(f)
+    if messages is None:
+        messages = fetch_channel_batch(channel_type, strict)
+    dedup_counts = {}  # this batch's duplicate drops per channel, returned under "dedup"
+    records = preprocess_messages(messages, channel_type, dedup_counts)
 
     # === Step 3: Initialize tools ===
-    flow_pattern = r'\$(\w+)\s*([+-])\$(\d+(?:\.\d+)?[KM]?)'
-    analyzer = SentimentIntensityAnalyzer()
+    analyzer = get_vader()
 
-    coin_flows = defaultdict(list)
+    # shared automaton for known names + aliases; this run's NER candidates in a per-run layer
+    matcher = get_coin_matcher(known_coin_names).with_extra(potential_names)
+    active_names = potential_names | known_coin_names | set(TICKER_ALIASES)
+
+    matched_records = []
     coin_sentiments = defaultdict(list)
     coin_sentiment_scores = {}
+    events = []  # timestamped events for the rolling per-coin windows
 
     # === Step 4: Analyze tweets ===
-    for tweet in tweets:
-        tweet_lower = tweet.lower()
-
-        # --- Check if tweet contains any known or potential coin name ---
-        matched_coins = [name for name in potential_names.union(known_coin_names) if name.lower() in tweet_lower]
+    for record in records:
+        tweet = record["text"]
+        # --- Check if tweet contains any known or potential coin name (single pass) ---
+        matched_coins = matcher.find_labels(tweet, allowed=active_names)
         if not matched_coins:
             continue
 
-        # --- Flow Extraction ---
-        for coin, sign, value_str in re.findall(flow_pattern, tweet):
-            if coin.lower() not in known_coin_names:
-                continue
-
-            if value_str.endswith('K'):
-                multiplier, numeric = 1_000, value_str[:-1]
-            elif value_str.endswith('M'):
-                multiplier, numeric = 1_000_000, value_str[:-1]
-            else:
-                multiplier, numeric = 1, value_str
-
-            try:
-                val = float(numeric) * multiplier
-                net = val if sign == '+' else -val
-                coin_flows[coin].append(net)
-            except ValueError:
-                continue
+        matched_records.append(record)
 
         # --- Sentiment Analysis ---
         sentiment_score = analyzer.polarity_scores(tweet)['compound']
-        for coin in matched_coins:
+        for n, coin in enumerate(matched_coins):
             coin_sentiments[coin].append(sentiment_score)
+            events.append((record["id"], record["timestamp"], coin, "sentiment", sentiment_score, n))
 
     # === Step 5: Aggregate Results ===
-    aggregated_flows = {coin: sum(vals) for coin, vals in coin_flows.items()}
+    # flows only for known coins, parsed in one columnar pass over matched tweets
+    flows = parse_flows([r["text"] for r in matched_records]).filter_coins(lambda c: c.lower() in known_coin_names)
+    coin_flows = flows.detailed()
+    events.extend(flow_events(flows, matched_records))
+    aggregated_flows = flows.aggregated()
     averaged_sentiments = {coin: sum(scores) / len(scores) for coin, scores in coin_sentiments.items() if scores}
 
     # === Step 6: Evaluate potential coin names using FinBERT ===
     finbert_potentials = {}
-    for name in potential_names:
-        try:
-            result = finbert(name)[0]
-            if result['label'].lower() == 'positive' and result['score'] > 0.85:
-                finbert_potentials[name] = result['score']
-        except Exception as e:
-            continue
+    names = sorted(potential_names)
+    try:
+        results = classify_texts("prosus_finbert", names)
+    except Exception as e:
+        print(f"FinBERT name scoring failed: {e}")
+        results = []
+    for name, result in zip(names, results):
+        if result['label'].lower() == 'positive' and result['score'] > 0.85:
+            finbert_potentials[name] = result['score']
 
     # === Step 7: Save Output ===
     output = {
-        "detailed_flows": dict(coin_flows),
+        "detailed_flows": coin_flows,
         "aggregated_flows": aggregated_flows,
         "average_sentiment": averaged_sentiments,
         "potential_positive_coin_names": finbert_potentials
     }
 
-    os.makedirs(os.path.dirname(output_json_file), exist_ok=True)
-    with open(output_json_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=4)
-
-    print(f"Verified coin flow and sentiment saved to {output_json_file}")
+    if persist:
+        persist_json(messages, raw_json_file)
+        persist_json(output, output_json_file, indent=4)
+        print(f"Verified coin flow and sentiment queued for {output_json_file}")
     print("\nTop potential coins from FinBERT:")
     for coin, score in sorted(finbert_potentials.items(), key=lambda x: x[1], reverse=True):
         print(f"{coin}: {score:.4f}")
+
+    return {**output, "window_events": (channel_type, events),
+            "dedup": merge_counts(ner_data.get("dedup"), dedup_counts)}
+
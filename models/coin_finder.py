@@ -1,18 +1,17 @@
-import json
 import os
 import re
+import time
 from collections import Counter, defaultdict
-import nltk
-from nltk.corpus import stopwords
-from nltk import word_tokenize, pos_tag
 
-from extrctor.tweets_extractor import fetch_discord_messages
-from model_loader.berta_models import load_deberta_ner_model
-from services.tweet_converter import run_preprocessing_news
-
-nltk.download('punkt')
-nltk.download('averaged_perceptron_tagger')
-nltk.download('stopwords')
+from extrctor.tweets_extractor import fetch_channel_batch
+from model_loader.batch_inference import run_batched
+from model_loader.model_registry import use_model, model_revision
+from services.inference_cache import cached_map
+from services.persistence import PERSIST, persist_json
+from services.pos_keywords import GENERIC_BADWORDS, ner_keywords, pos_keywords, pos_keywords_many
+from preprocessing.dedup import merge_counts
+from services.tweet_converter import preprocess_messages
+from services.warmup import ensure_nltk, get_stop_words
 
 base_dir = os.path.dirname(__file__)
 
@@ -32,92 +31,100 @@ known_coin_names = {
 # Normalize known names once (case-insensitive match)
 KNOWN_COIN_NAMES_LOWER = {n.lower() for n in known_coin_names}
 
-def extract_coin_keywords_from_ner():
+# bump when the keyword rules below change so cached NER/POS results are recomputed
+KEYWORD_RULES_VERSION = "pos-v1"
+
+# corpus mode (batched NER + POS process pool) kicks in at this many uncached tweets
+CORPUS_MODE_MIN = int(os.getenv("KEYWORD_CORPUS_MIN", "200"))
+KEYWORD_WORKERS = int(os.getenv("KEYWORD_WORKERS", "0")) or None   # default: available cores
+
+def _tweet_keywords(tweet, ner_pipeline, stop_words):
+    # NER keywords, then POS keywords (only noun-ish, not stopwords), both cleaned
+    return ner_keywords(ner_pipeline(tweet)) + pos_keywords(tweet, stop_words)
+
+def _extract_keywords(tweets, stop_words, timings=None, workers=KEYWORD_WORKERS):
+    """
+    Per-tweet keywords in input order. Small inputs run the serial per-tweet loop;
+    larger ones batch NER and spread NLTK tagging over a process pool with the same output.
+    """
+    timings = {} if timings is None else timings
+    if len(tweets) < CORPUS_MODE_MIN:
+        t0 = time.perf_counter()
+        with use_model("ner") as ner_pipeline:
+            out = [_tweet_keywords(tweet, ner_pipeline, stop_words) for tweet in tweets]
+        timings["ner_pos_serial"] = timings.get("ner_pos_serial", 0.0) + time.perf_counter() - t0
+        return out
+
+    t0 = time.perf_counter()
+    with use_model("ner") as ner_pipeline:
+        ner_results = run_batched(ner_pipeline, tweets, token_level=True)
+    t1 = time.perf_counter()
+    pos_per_tweet = pos_keywords_many(tweets, stop_words, workers=workers)
+    t2 = time.perf_counter()
+    timings["ner"] = timings.get("ner", 0.0) + t1 - t0
+    timings["pos"] = timings.get("pos", 0.0) + t2 - t1
+    return [ner_keywords(ents) + pos for ents, pos in zip(ner_results, pos_per_tweet)]
+
+def extract_coin_keywords_from_ner(messages=None, persist: bool = PERSIST, strict: bool = False):
     # === Load tools ===
-    ner_pipeline = load_deberta_ner_model()
-    stop_words = set(stopwords.words('english'))
+    ensure_nltk("punkt", "averaged_perceptron_tagger")
+    stop_words = get_stop_words()
 
     # === File paths ===
     channel_type = "finder"
     raw_json_file = os.path.join(base_dir, "..", "test data", "raw_news_messages.json")
     output_json_file = os.path.join(base_dir, "..", "test data", "coin_keywords_extracted.json")
 
-    # === Fetch and preprocess ===
-    fetch_discord_messages(channel_type, raw_json_file)
-    preprocessed_path = run_preprocessing_news(input_path=raw_json_file)
+    timings = {}
 
-    with open(preprocessed_path, 'r', encoding='utf-8') as f:
-        tweets = [line.strip() for line in f if line.strip()]
+    # === Fetch and preprocess (in memory) ===
+    t0 = time.perf_counter()
+    if messages is None:
+        messages = fetch_channel_batch(channel_type, strict)
+    t1 = time.perf_counter()
+    dedup_counts = {}  # this batch's duplicate drops per channel, returned under "dedup"
+    records = preprocess_messages(messages, channel_type, dedup_counts)
+    timings["fetch"] = t1 - t0
+    timings["preprocess"] = time.perf_counter() - t1
 
     # === Analyze per tweet ===
-    coin_keyword_collector = defaultdict(list)  # coin -> [keywords...]
+    coin_keyword_counts = defaultdict(Counter)  # coin -> Counter(keywords)
     coin_counts = Counter()                     # coin -> mention count
 
-    GENERIC_BADWORDS = {
-        "news","twitter","https","http","billion","million","globalgoals",
-        "finance","radar","economist","union_build","us","u","the","new","rt"
-    }
-
-    def clean_kw(w: str) -> str:
-        w = w.strip().replace("##", "")
-        if w.startswith("@") or w.startswith("http"):
-            return ""
-        # keep simple tokens only
-        if not re.fullmatch(r"[A-Za-z][A-Za-z0-9_-]{1,19}", w):
-            return ""
-        return w
-
-    for tweet in tweets:
-        # capture $TICKER-like tokens (alnum/underscore)
+    # capture $TICKER-like tokens (alnum/underscore)
+    t0 = time.perf_counter()
+    coin_tweets = []
+    for tweet in (r["text"] for r in records):
         coins_found = re.findall(r'\$(\w+)', tweet)
-        if not coins_found:
-            continue
-
+        if coins_found:
+            coin_tweets.append((tweet, coins_found))
+    timings["scan"] = time.perf_counter() - t0
+
+    # NER + POS keywords; only tweets missing from the inference cache reach the model
+    t0 = time.perf_counter()
+    keywords_per_tweet = cached_map(
+        "ner_pos", model_revision("ner") + ";" + KEYWORD_RULES_VERSION,
+        [tweet for tweet, _ in coin_tweets],
+        lambda miss: _extract_keywords(miss, stop_words, timings),
+    )
+    timings["keywords_total"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for (tweet, coins_found), filtered_keywords in zip(coin_tweets, keywords_per_tweet):
         # count coins (normalized to UPPER for consistency)
         for c in coins_found:
             coin_counts[c.upper()] += 1
 
-        # NER keywords
-        ner_results = ner_pipeline(tweet)
-        ner_keywords = [
-            ent['word']
-            for ent in ner_results
-            if ent.get('entity_group') in ['ORG', 'PRODUCT', 'PER', 'MISC']
-        ]
-
-        # POS keywords (only noun-ish, not stopwords)
-        words = word_tokenize(tweet)
-        pos_tags = pos_tag(words)
-        pos_keywords = [
-            w for w, tag in pos_tags
-            if tag in ('NN', 'NNS', 'NNP', 'NNPS')
-            and w.lower() not in stop_words
-        ]
-
-        # clean + filter noise
-        raw_keywords = ner_keywords + pos_keywords
-        filtered_keywords = []
-        for w in raw_keywords:
-            w = clean_kw(w)
-            if not w:
-                continue
-            if w.lower() in GENERIC_BADWORDS:
-                continue
-            filtered_keywords.append(w)
-
-        # attach cleaned keywords to each coin in this tweet
+        # count cleaned keywords against each coin in this tweet (same first-seen order as the list version)
         for coin in coins_found:
-            coin_keyword_collector[coin.upper()].extend(filtered_keywords)
+            coin_keyword_counts[coin.upper()].update(filtered_keywords)
 
     # === Aggregate + Filter ===
     coin_keywords_filtered = {
-        coin: {kw: cnt for kw, cnt in Counter(kws).items() if cnt > 5}
-        for coin, kws in coin_keyword_collector.items()
+        coin: {kw: cnt for kw, cnt in kws.items() if cnt > 5}
+        for coin, kws in coin_keyword_counts.items()
     }
 
-    # === Save per-coin keywords ===
-    os.makedirs(os.path.dirname(output_json_file), exist_ok=True)
-
     # === Top coins (exclude known coins) ===
     # Option A: allow any shape (default)
     top_new_coins = [
@@ -142,21 +149,28 @@ def extract_coin_keywords_from_ner():
         if kw.lower() not in KNOWN_COIN_NAMES_LOWER
         and kw.lower() not in GENERIC_BADWORDS
     ]
+    timings["aggregate"] = time.perf_counter() - t0
+    timings = {stage: round(sec, 3) for stage, sec in timings.items()}
 
-    with open(output_json_file, 'w', encoding='utf-8') as f:
-        json.dump({
+    # === Save per-coin keywords ===
+    if persist:
+        persist_json(messages, raw_json_file)
+        persist_json({
             "coin_keywords_filtered": coin_keywords_filtered,
             "top_new_coins": top_new_coins,
             "top_keywords_clean": top_keywords_clean
-        }, f, indent=4, ensure_ascii=False)
-
-    print("Filtered coin keyword subjects saved to:", output_json_file)
+        }, output_json_file, indent=4)
+        print("Filtered coin keyword subjects queued for:", output_json_file)
     print("Potential new coins:", top_new_coins[:15])
     print("Clean keywords (context):", top_keywords_clean[:20])
+    print(f"Keyword extraction over {len(coin_tweets)} tweets, stage timings (s):", timings)
 
     # return a structured object (easier for API)
     return {
         "message": "Coin keyword extraction completed.",
         "top_new_coins": top_new_coins,
-        "top_keywords_clean": top_keywords_clean
+        "top_keywords_clean": top_keywords_clean,
+        "coin_keywords_filtered": coin_keywords_filtered,
+        "timings": timings,
+        "dedup": merge_counts(dedup_counts)
     }
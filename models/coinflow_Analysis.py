@@ -1,15 +1,19 @@
-import re
-import json
 import os
 
 from extrctor.tweets_extractor import fetch_discord_messages
-from services.chart_plotiing import save_coin_chart
+from preprocessing.preprocess import iter_json_items
+from services.chart_plotiing import render_coin_charts
+from services.flow_parser import parse_flows
+from services.persistence import PERSIST, persist_json
+from services.rolling_windows import flow_events
 from services.tweet_converter import run_coinflow_focus
 
 base_dir = os.path.dirname(__file__)
+# render charts only for the N coins with the largest |net flow| (0 = all)
+CHART_TOP_N = int(os.getenv("CHART_TOP_N", "0"))
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
-def analyze_coin_flow_analysis():
+def analyze_coin_flow_analysis(texts=None, persist: bool = PERSIST, top_n: int = CHART_TOP_N):
     # === Step 1: Define file paths and fetch messages ===
     #channel_type = "focus_based"
     #raw_json_file = os.path.join(base_dir, "..", "test data", "preprocessed_data1.json")
@@ -18,41 +22,26 @@ def analyze_coin_flow_analysis():
     #fetch_discord_messages(channel_type, raw_json_file)
     #preprocessed_path = run_coinflow_focus(input_path=raw_json_file)
     preprocessed_path =os.path.join(base_dir, "..", "data", "preprocessed_data1.json")
-    # === Step 2: Load preprocessed tweets ===
-    with open(preprocessed_path, 'r', encoding='utf-8') as f:
-        tweets = json.load(f)
+    # === Step 2: Stream preprocessed tweets (or use the in-memory batch: texts or records) ===
+    # only id + timestamp are kept per message, for the rolling windows (JSONL records carry them)
+    stamps = []
+    def _texts(items):
+        for item in items:
+            if isinstance(item, dict):
+                stamps.append({"id": item.get("id"), "timestamp": item.get("timestamp")})
+                yield item.get("text") or ""
+            elif isinstance(item, str):
+                stamps.append({})
+                yield item
+    tweets = _texts(iter_json_items(preprocessed_path) if texts is None else texts)
     print("Data loaded successfully!")
-    # === Step 3: Define regex pattern and data structure ===
-    flow_pattern = r'\$(\w+)\s*([+-])\$(\d+(?:\.\d+)?[KM]?)'
-    coin_data = {}
+    # === Step 3 + 4: Extract coin flows in one columnar pass ===
+    flows = parse_flows(tweets)
+    coin_data = flows.detailed()
+    events = [e for e in flow_events(flows, stamps) if e[1] is not None]
 
-    # === Step 4: Extract and process coin flows ===
-    for tweet in tweets:
-        matches = re.findall(flow_pattern, tweet)
-        for coin, sign, value_str in matches:
-            multiplier = 1
-            if value_str.endswith('K'):
-                multiplier = 1_000
-                numeric_part = value_str[:-1]
-            elif value_str.endswith('M'):
-                multiplier = 1_000_000
-                numeric_part = value_str[:-1]
-            else:
-                numeric_part = value_str
-
-            try:
-                numeric_value = float(numeric_part) * multiplier
-            except ValueError:
-                continue
-
-            numeric_value = numeric_value if sign == '+' else -numeric_value
-
-            if coin not in coin_data:
-                coin_data[coin] = []
-            coin_data[coin].append(numeric_value)
-
-    # === Step 5: Aggregate net flows ===
-    aggregated_flows = {coin: sum(values) for coin, values in coin_data.items()}
+    # === Step 5: Aggregate net flows (vectorized) ===
+    aggregated_flows = flows.aggregated()
 
     # === Step 6: Save results ===
     output_data = {
@@ -60,14 +49,14 @@ def analyze_coin_flow_analysis():
         "aggregated_flows": aggregated_flows
     }
 
-    with open(output_json_file, "w", encoding="utf-8") as outfile:
-        json.dump(output_data, outfile, indent=4)
-
-    print(f"Coin flow analysis saved to {output_json_file}")
+    if persist:
+        persist_json(output_data, output_json_file, indent=4)
+        print(f"Coin flow analysis queued for {output_json_file}")
 
-    # === Step 6: Generate charts per coin ===
+    # === Step 6: Generate charts per coin (unchanged coins are skipped via the manifest) ===
     chart_dir = os.path.join(base_dir, "..", "test data", "charts1")
-    for coin, flows in coin_data.items():
-        save_coin_chart(coin, flows, chart_dir)
+    chart_stats = render_coin_charts(coin_data, chart_dir, top_n=top_n or None)
+
+    print(f"Charts saved to {chart_dir}: {chart_stats}")
 
-    print(f"Charts saved to {chart_dir}")
\ No newline at end of file
+    return {**output_data, "charts": chart_stats, "window_events": ("focus_based", events)}
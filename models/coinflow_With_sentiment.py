@@ -1,67 +1,54 @@
 import re
-import json
 import os
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
 from collections import Counter
 
-from extrctor.tweets_extractor import fetch_discord_messages
-from services.tweet_converter import run_preprocessing_general, run_preprocessing_focus
+from extrctor.tweets_extractor import fetch_channel_batch
+from services.flow_parser import parse_flows
+from services.persistence import PERSIST, persist_json
+from services.rolling_windows import flow_events
+from preprocessing.dedup import merge_counts
+from services.tweet_converter import preprocess_messages
+from services.warmup import get_vader
 
 base_dir = os.path.dirname(__file__)
 
-def analyze_coin_flow_and_sentiment():
-    # === Step 1: Ensure VADER is available ===
-    nltk.download('vader_lexicon')
-
+def analyze_coin_flow_and_sentiment(messages=None, persist: bool = PERSIST, strict: bool = False):
     # === Step 2: Define file paths and fetch messages ===
     channel_type = "focus_based"
     raw_json_file = os.path.join(base_dir, "..", "test data", "raw_focus_messages.json")
     output_json_file = os.path.join(base_dir, "..", "test data", "sentiment_output_for_coin_finder.json")
 
-    fetch_discord_messages(channel_type, raw_json_file)
-    preprocessed_path = run_preprocessing_focus(input_path=raw_json_file)
+    if messages is None:
+        messages = fetch_channel_batch(channel_type, strict)
 
-    # === Step 3: Load preprocessed tweets ===
-    with open(preprocessed_path, 'r', encoding='utf-8') as f:
-        tweets = json.load(f)
+    # === Step 3: Preprocess in memory ===
+    dedup_counts = {}  # this batch's duplicate drops per channel, returned under "dedup"
+    records = preprocess_messages(messages, channel_type, dedup_counts)
+    tweets = [r["text"] for r in records]
 
     # === Step 4: Initialize tools ===
-    flow_pattern = r'\$(\w+)\s*([+-])\$(\d+(?:\.\d+)?[KM]?)'
     coin_pattern = r'\$(\w+)'
-    analyzer = SentimentIntensityAnalyzer()
+    analyzer = get_vader()  # downloads the lexicon on first use only
 
-    coin_data = {}
     sentiment_data = {}
 
-    # === Step 5: Process each tweet ===
-    for tweet in tweets:
-        # --- Coin Flow Extraction ---
-        for coin, sign, value_str in re.findall(flow_pattern, tweet):
-            if value_str.endswith('K'):
-                multiplier, numeric = 1_000, value_str[:-1]
-            elif value_str.endswith('M'):
-                multiplier, numeric = 1_000_000, value_str[:-1]
-            else:
-                multiplier, numeric = 1, value_str
-
-            try:
-                val = float(numeric) * multiplier
-            except ValueError:
-                continue
-
-            net = val if sign == '+' else -val
-            coin_data.setdefault(coin, []).append(net)
+    # === Step 5: Coin flows (columnar) + per-tweet sentiment ===
+    flows = parse_flows(tweets)
+    coin_data = flows.detailed()
+    # timestamped events for the rolling per-coin windows (services/rolling_windows.py)
+    events = flow_events(flows, records)
 
+    for record, tweet in zip(records, tweets):
         # --- Sentiment Analysis ---
         coins = re.findall(coin_pattern, tweet)
         if coins:
             score = analyzer.polarity_scores(tweet)['compound']
-            for coin in coins:
+            for n, coin in enumerate(coins):
                 sentiment_data.setdefault(coin, []).append(score)
+                events.append((record["id"], record["timestamp"], coin, "sentiment", score, n))
 
     # === Step 6: Aggregate results ===
-    aggregated_flows = {coin: sum(vals) for coin, vals in coin_data.items()}
+    aggregated_flows = flows.aggregated()
     averaged_sentiment = {
         coin: sum(scores) / len(scores)
         for coin, scores in sentiment_data.items()
@@ -74,8 +61,9 @@ def analyze_coin_flow_and_sentiment():
         "average_sentiment": averaged_sentiment
     }
 
-    os.makedirs(os.path.dirname(output_json_file), exist_ok=True)
-    with open(output_json_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=4)
+    if persist:
+        persist_json(messages, raw_json_file)
+        persist_json(output, output_json_file, indent=4)
+        print(f"Flow and sentiment data queued for {output_json_file}")
 
-    print(f"Flow and sentiment data saved to {output_json_file}")
+    return {**output, "window_events": (channel_type, events), "dedup": merge_counts(dedup_counts)}
@@ -0,0 +1,295 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# Drops repeated messages before they reach the models: bots re-post the same text in a channel
+# with a new link, tag or emoji. Two checks, within one channel, over a time-expiring seen-set:
+#   exact  sha1 of the normalized text (texts shorter than DEDUP_MIN_EXACT_CHARS are never dropped:
+#          short templated posts such as "$arc +$6.1K" repeat legitimately)
+#   near   MinHash of the token set, estimated Jaccard >= DEDUP_SIMILARITY; candidates come from
+#          LSH over LSH_BANDS bands of LSH_ROWS signature values (J=0.8 -> ~99.98% recall)
+# Near matches must carry the same numbers and $tickers: templated flow posts differ only there.
+# The seen-set lives in SQLite (WAL), shared by every worker process and kept across restarts, so a
+# message's verdict does not depend on which worker saw the earlier batches. Each message id is
+# decided once: re-reading it returns the stored verdict and is not counted again, so the per-channel
+# counts grow with new messages, not with how often a channel is polled.
+DEDUP_ENABLED = os.getenv("PREPROCESS_DEDUP", "1") == "1"
+DEDUP_PATH = os.getenv(
+    "DEDUP_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "test data", "dedup.sqlite"))
+)
+DEDUP_TTL_S = float(os.getenv("DEDUP_TTL_S", str(24 * 3600)))
+DEDUP_MAX_ITEMS = int(os.getenv("DEDUP_MAX_ITEMS", "100000"))   # per store, oldest evicted first
+DEDUP_SIMILARITY = float(os.getenv("DEDUP_SIMILARITY", "0.8"))
+DEDUP_MIN_TOKENS = int(os.getenv("DEDUP_MIN_TOKENS", "8"))  # shorter texts are only checked exactly
+DEDUP_MIN_EXACT_CHARS = int(os.getenv("DEDUP_MIN_EXACT_CHARS", "40"))  # normalized; shorter ones are kept
+DEDUP_CHUNK = 500  # records decided per transaction
+LSH_BANDS = 16
+LSH_ROWS = 4
+NUM_PERM = LSH_BANDS * LSH_ROWS
+
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(1, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, int(_PRIME), NUM_PERM, dtype=np.uint64)
+
+_TOKEN_RE = re.compile(r"\$?\w+")
+_FACT_RE = re.compile(r"\$[a-z]\w*|\d+(?:[.,]\d+)*[kmb%]?")
+_LINK_RE = re.compile(r"https?://\S+")
+_TIMESTAMP_RE = re.compile(r"\b\d{4}-\d\d-\d\dt[\d:.]+(?:[+-]\d\d:\d\d|z)?")  # embed timestamps
+
+
+def normalize(text: str) -> str:
+    """Lowercase, links and timestamps removed, whitespace collapsed: what two copies of a post share."""
+    return " ".join(_TIMESTAMP_RE.sub(" ", _LINK_RE.sub(" ", text.lower())).split())
+
+
+def minhash(tokens) -> np.ndarray:
+    """NUM_PERM uint32 MinHash signature of a token set (universal hashing of 32-bit token hashes)."""
+    x = np.frombuffer(
+        b"".join(hashlib.blake2b(t.encode("utf-8"), digest_size=4).digest() for t in set(tokens)), dtype=np.uint32
+    ).astype(np.uint64)
+    # uint64 products wrap; the result is still a fine hash family
+    return (((x[:, None] * _PERM_A + _PERM_B) % _PRIME) & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY, channel TEXT NOT NULL, msg_id TEXT, digest BLOB NOT NULL,
+    sig BLOB, facts TEXT, added_at REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries(channel, digest);
+CREATE INDEX IF NOT EXISTS entries_added ON entries(added_at);
+CREATE TABLE IF NOT EXISTS bands (channel TEXT NOT NULL, bucket BLOB NOT NULL, entry INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS bands_bucket ON bands(channel, bucket);
+CREATE INDEX IF NOT EXISTS bands_entry ON bands(entry);
+CREATE TABLE IF NOT EXISTS messages (
+    channel TEXT NOT NULL, msg_id TEXT NOT NULL, verdict TEXT NOT NULL, seen_at REAL NOT NULL,
+    PRIMARY KEY (channel, msg_id));
+CREATE INDEX IF NOT EXISTS messages_seen ON messages(seen_at);
+CREATE TABLE IF NOT EXISTS counts (
+    channel TEXT PRIMARY KEY, seen INTEGER NOT NULL, kept INTEGER NOT NULL,
+    exact INTEGER NOT NULL, near INTEGER NOT NULL);
+"""
+
+
+def _new_counts() -> dict:
+    return {"seen": 0, "kept": 0, "exact": 0, "near": 0}
+
+
+def _band_keys(sig: np.ndarray) -> list:
+    """One LSH bucket per band: the band number followed by its signature values."""
+    return [bytes([b]) + sig[b * LSH_ROWS:(b + 1) * LSH_ROWS].tobytes() for b in range(LSH_BANDS)]
+
+
+def _chunks(items, size: int):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Deduplicator:
+    """
+    Per-channel seen-set of recent messages in SQLite. `check` returns None for a new message,
+    else "exact"/"near"; a message id already decided (within DEDUP_TTL_S) gets its stored
+    verdict back and is not counted again.
+    """
+
+    def __init__(self, path: str = DEDUP_PATH, ttl_s: float = DEDUP_TTL_S, max_items: int = DEDUP_MAX_ITEMS,
+                 similarity: float = DEDUP_SIMILARITY, min_tokens: int = DEDUP_MIN_TOKENS,
+                 min_exact_chars: int = DEDUP_MIN_EXACT_CHARS):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_items = max_items
+        self.similarity = similarity
+        self.min_tokens = min_tokens
+        self.min_exact_chars = min_exact_chars
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # autocommit; _decide_many holds one write transaction per chunk
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _evict(self, db, now: float):
+        cutoff = now - self.ttl_s
+        (max_id,) = db.execute("SELECT MAX(id) FROM entries").fetchone()
+        if max_id is not None:
+            (first_live,) = db.execute("SELECT MIN(id) FROM entries WHERE added_at >= ?", (cutoff,)).fetchone()
+            keep_from = max(max_id + 1 if first_live is None else first_live, max_id - self.max_items + 1)
+            db.execute("DELETE FROM bands WHERE entry < ?", (keep_from,))
+            db.execute("DELETE FROM entries WHERE id < ?", (keep_from,))
+        db.execute("DELETE FROM messages WHERE seen_at < ?", (cutoff,))
+
+    def _near(self, db, channel: str, sig: np.ndarray, keys: list, facts: str, msg_id) -> bool:
+        rows = db.execute(
+            "SELECT DISTINCT e.msg_id, e.sig, e.facts FROM bands b JOIN entries e ON e.id = b.entry"
+            f" WHERE b.channel = ? AND b.bucket IN ({','.join('?' * LSH_BANDS)})",
+            (channel, *keys),
+        )
+        for other_id, other_sig, other_facts in rows:
+            if other_facts == facts and (other_id != msg_id or msg_id is None) and \
+                    np.count_nonzero(sig == np.frombuffer(other_sig, dtype=np.uint32)) >= self.similarity * NUM_PERM:
+                return True
+        return False
+
+    def _decide(self, db, text: str, msg_id, channel: str, now: float):
+        """(verdict, first time) for one message; the caller holds the write transaction."""
+        if msg_id is not None:
+            row = db.execute("SELECT verdict FROM messages WHERE channel = ? AND msg_id = ?",
+                             (channel, msg_id)).fetchone()
+            if row is not None:
+                return row[0] or None, False
+        norm = normalize(text or "")
+        verdict = None
+        if len(norm) >= self.min_exact_chars:
+            digest = hashlib.sha1(norm.encode("utf-8")).digest()
+            hit = db.execute("SELECT msg_id FROM entries WHERE channel = ? AND digest = ?",
+                             (channel, digest)).fetchone()
+            if hit is not None:
+                if hit[0] != msg_id or msg_id is None:
+                    verdict = "exact"
+            else:
+                tokens = _TOKEN_RE.findall(norm)
+                sig = facts = None
+                if len(tokens) >= self.min_tokens:
+                    sig = minhash(tokens)
+                    keys = _band_keys(sig)
+                    facts = "\n".join(sorted(set(_FACT_RE.findall(norm))))
+                    if self._near(db, channel, sig, keys, facts, msg_id):
+                        verdict = "near"
+                if verdict is None:
+                    entry = db.execute(
+                        "INSERT INTO entries (channel, msg_id, digest, sig, facts, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (channel, msg_id, digest, None if sig is None else sig.tobytes(), facts, now),
+                    ).lastrowid
+                    if sig is not None:
+                        db.executemany("INSERT INTO bands (channel, bucket, entry) VALUES (?, ?, ?)",
+                                       [(channel, key, entry) for key in keys])
+        if msg_id is not None:
+            db.execute("INSERT INTO messages (channel, msg_id, verdict, seen_at) VALUES (?, ?, ?, ?)",
+                       (channel, msg_id, verdict or "", now))
+        return verdict, True
+
+    def _decide_many(self, items, now: float = None) -> list:
+        """[(text, message id or None, channel)] -> [(verdict, first time)], in one transaction."""
+        now = time.time() if now is None else now
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                self._evict(db, now)
+                out = [self._decide(db, text, msg_id, channel, now) for text, msg_id, channel in items]
+                totals = {}
+                for (_, _, channel), (verdict, new) in zip(items, out):
+                    if new:
+                        c = totals.setdefault(channel, _new_counts())
+                        c["seen"] += 1
+                        c[verdict or "kept"] += 1
+                db.executemany(
+                    "INSERT INTO counts (channel, seen, kept, exact, near) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT(channel) DO UPDATE SET seen = seen + excluded.seen, kept = kept + excluded.kept,"
+                    " exact = exact + excluded.exact, near = near + excluded.near",
+                    [(ch, c["seen"], c["kept"], c["exact"], c["near"]) for ch, c in totals.items()],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return out
+
+    def check(self, text: str, msg_id=None, channel=None, now: float = None) -> str:
+        msg_id = None if msg_id is None else str(msg_id)
+        return self._decide_many([(text, msg_id, str(channel))], now)[0][0]
+
+    def filter(self, records, channel=None, counts: dict = None):
+        """
+        Stream of normalized records -> the records that are not duplicates, decided DEDUP_CHUNK at
+        a time. `channel` scopes the seen-set and labels the counts; without it each record's
+        channel_id is used. Records without a message id are only compared with each other within
+        this call (in memory), so re-reading a file keeps them. `counts`, when given, receives this
+        call's tallies of messages decided for the first time.
+        """
+        local = None
+        for chunk in _chunks(records, DEDUP_CHUNK):
+            labels = [str(channel or r.get("channel_id")) for r in chunk]
+            with_id = [i for i, r in enumerate(chunk) if r.get("id") is not None]
+            decided = dict(zip(with_id, self._decide_many(
+                [(chunk[i].get("text", ""), str(chunk[i]["id"]), labels[i]) for i in with_id])))
+            for i, record in enumerate(chunk):
+                if i in decided:
+                    dup, new = decided[i]
+                else:
+                    local = local or Deduplicator(":memory:", self.ttl_s, self.max_items, self.similarity,
+                                                  self.min_tokens, self.min_exact_chars)
+                    dup, new = local.check(record.get("text", ""), channel=labels[i]), True
+                if new and counts is not None:
+                    batch = counts.setdefault(labels[i], _new_counts())
+                    batch["seen"] += 1
+                    batch[dup or "kept"] += 1
+                if not dup:
+                    yield record
+
+    def stats(self) -> dict:
+        with self._lock:
+            db = self._db()
+            counts = {ch: {"seen": seen, "kept": kept, "exact": exact, "near": near}
+                      for ch, seen, kept, exact, near in db.execute("SELECT channel, seen, kept, exact, near FROM counts")}
+            (tracked,) = db.execute("SELECT COUNT(*) FROM entries").fetchone()
+            (messages,) = db.execute("SELECT COUNT(*) FROM messages").fetchone()
+        return {
+            "enabled": DEDUP_ENABLED,
+            "path": self.path,
+            "tracked": tracked,
+            "messages": messages,
+            "ttl_s": self.ttl_s,
+            "max_items": self.max_items,
+            "similarity": self.similarity,
+            "min_exact_chars": self.min_exact_chars,
+            "channels": merge_counts(counts),
+        }
+
+
+dedup = Deduplicator()
+
+
+def merge_counts(*per_channel) -> dict:
+    """Sum {channel: {seen, kept, exact, near}} tallies (e.g. of several batches), with "dropped"."""
+    out = {}
+    for counts in per_channel:
+        for ch, c in (counts or {}).items():
+            total = out.setdefault(ch, _new_counts())
+            for k in total:
+                total[k] += c.get(k, 0)
+    for c in out.values():
+        c["dropped"] = c["exact"] + c["near"]
+    return out
+
+
+def drop_duplicates(records, channel=None, counts: dict = None):
+    """Preprocessing stage: pass records through the shared seen-set (PREPROCESS_DEDUP=0 disables)."""
+    if not DEDUP_ENABLED:
+        return records
+    return dedup.filter(records, channel, counts)
+
+
+def dedup_stats() -> dict:
+    return dedup.stats()
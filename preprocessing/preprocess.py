@@ -1,20 +1,161 @@
 import json
+import re
+
+from preprocessing.dedup import drop_duplicates
+
+CHUNK_SIZE = 1 << 16
+# Bump when extract_text/to_record produce different text for the same message: cached model
+# outputs keyed by message id are only valid for the text they were computed on
+PREPROCESS_VERSION = "pre-v2"
+
+# links are shortened differently in embed titles and descriptions, and replies lead with @handles
+_LINK_RE = re.compile(r"https?://\S+|\b[\w-]+(?:\.[\w-]+)+/\S*")
+_LEADING_MENTIONS_RE = re.compile(r"^(?:@\w+\s+)+")
+
+def _fold_key(text):
+    text = _LINK_RE.sub(" ", text).replace("\u2026", " ").replace("...", " ")
+    return " ".join(_LEADING_MENTIONS_RE.sub("", text.strip()).split())
+
+def _fold_part(parts, field):
+    """
+    Append an embed field unless the text already holds it. Bot embeds repeat the message:
+    the description is usually the title plus a byline, or the title cut off mid-word, so a
+    part contained in the new field is replaced by it instead of being kept twice.
+    """
+    field = field.strip()
+    key = _fold_key(field)
+    if not key:
+        return
+    keys = [_fold_key(p) for p in parts]
+    if any(key in k for k in keys):
+        return
+    contained = [i for i, k in enumerate(keys) if k and k in key]
+    if contained:
+        parts[contained[0]] = field
+        for i in reversed(contained[1:]):
+            del parts[i]
+    else:
+        parts.append(field)
 
 def extract_text(tweet):
     text = tweet.get("content", "")
     for embed in tweet.get("embeds", []):
-        text += " " + embed.get("title", "")
-        text += " " + embed.get("description", "")
+        parts = [text.strip()] if text.strip() else []
+        _fold_part(parts, embed.get("title", ""))
+        _fold_part(parts, embed.get("description", ""))
+        text = " ".join(parts)
         text += " " + embed.get("timestamp", "")
+        # Safely extract author name if available
         author = embed.get("author", {}).get("name", "")
         text += " " + author
     return text.strip()
 
-def preprocess_data(input_path, output_path):
-    with open(input_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def to_record(message):
+    """Normalize a raw Discord message into {id, timestamp, author, channel_id, text}."""
+    author = message.get("author") or {}
+    return {
+        "id": message.get("id"),
+        "timestamp": message.get("timestamp"),
+        "author": author.get("username") or author.get("global_name"),
+        "channel_id": message.get("channel_id"),
+        "text": extract_text(message),
+    }
+
+_SCALAR_END_RE = re.compile(r"[,\]\s]")
+
+def _iter_json_array(f):
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
 
-    texts = [extract_text(tweet) for tweet in data]
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
 
+    skip(" \t\r\n")
+    if pos < len(buf) and buf[pos] == "[":
+        pos += 1
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buf) or buf[pos] == "]":
+            return
+        if buf[pos] not in "{[\"":
+            # numbers and literals have no closing token: read on until a delimiter follows
+            while not eof and not _SCALAR_END_RE.search(buf, pos):
+                fill()
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        yield obj
+        pos = end
+
+def iter_json_items(path):
+    """Yield items from a JSON array file or a JSONL file, whichever `path` holds."""
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == "[":
+            yield from _iter_json_array(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+def iter_records(input_path):
+    """Stream raw Discord messages from `input_path` as normalized records."""
+    for message in iter_json_items(input_path):
+        if isinstance(message, dict):
+            yield to_record(message)
+
+def iter_texts(path):
+    """Lazily yield texts from a preprocessed file (JSON array of strings/records or JSONL records)."""
+    for item in iter_json_items(path):
+        if isinstance(item, str):
+            yield item
+        elif isinstance(item, dict) and "text" in item:
+            yield item["text"]
+
+def write_jsonl(records, output_path):
+    count = 0
     with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(texts, f, indent=2)
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+def write_json_texts(texts, output_path):
+    """Stream texts out as a JSON array (same layout as json.dump(..., indent=2))."""
+    count = 0
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for t in texts:
+            f.write(("," if count else "") + "\n  " + json.dumps(t))
+            count += 1
+        f.write("\n]" if count else "]")
+    return count
+
+def preprocess_data(input_path, output_path, jsonl: bool = False):
+    records = drop_duplicates(iter_records(input_path))
+    if jsonl:
+        return write_jsonl(records, output_path)
+    return write_json_texts((r["text"] for r in records), output_path)
@@ -4,10 +4,12 @@ import json
 base_dir = os.path.dirname(__file__)
 focus_sentiment_file = os.path.join(base_dir, "..", "test data", "sentiment_output_for_coin_finder.json")
 
-def get_focus_sentiment_summary():
+def get_focus_sentiment_summary(data=None):
+    """Summarize handler results; reads the persisted output only when `data` is not passed."""
     try:
-        with open(focus_sentiment_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        if data is None:
+            with open(focus_sentiment_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
 
         avg_sentiment_dict = data.get("average_sentiment", {})
         if not avg_sentiment_dict:
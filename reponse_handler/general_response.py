@@ -4,10 +4,12 @@ import json
 base_dir = os.path.dirname(__file__)
 general_sentiment_file = os.path.join(base_dir, "..", "test data", "sentiment_output_general.json")
 
-def get_general_sentiment_summary():
+def get_general_sentiment_summary(data=None):
+    """Summarize handler results; reads the persisted output only when `data` is not passed."""
     try:
-        with open(general_sentiment_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        if data is None:
+            with open(general_sentiment_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
 
         # Take last 8 messages
         last_msgs = data[:20] if len(data) >= 8 else data
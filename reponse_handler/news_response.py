@@ -4,10 +4,12 @@ import json
 base_dir = os.path.dirname(__file__)
 news_sentiment_file = os.path.join(base_dir, "..", "test data", "sentiment_output_for_news.json")
 
-def get_news_sentiment_summary():
+def get_news_sentiment_summary(data=None):
+    """Summarize handler results; reads the persisted output only when `data` is not passed."""
     try:
-        with open(news_sentiment_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        if data is None:
+            with open(news_sentiment_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
 
         # Extract last 8 messages
         last_msgs = data[:20] if len(data) >= 8 else data
@@ -0,0 +1,61 @@
+import base64
+import io
+import os
+import tempfile
+import timeit
+
+from services.chart_plotiing import save_coin_chart, save_coin_chart_matplotlib
+from services.chart_render import bar_strip_svg
+
+# Per-chart render cost: matplotlib PNG (previous path) vs the SVG template renderer.
+# Run from the repo root: python -m scripts.chart_render_benchmark
+NUMBER = 20
+FLOWS = [12_500.0, -3_400.0, 88_000.0, -1_200.0, 5_000.0, 430.0, -9_900.0]
+
+
+def matplotlib_bar_strip(pos_pct, neg_pct, pos, neg, total):
+    # the inline-base64 strip previously rendered per /coin-sentiment response
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(8, 0.9), dpi=100)
+    ax.axis("off")
+    fig.patch.set_facecolor("#111827"); ax.set_facecolor("#111827")
+    pos_w = (pos / total) if total else 0; neg_w = (neg / total) if total else 0
+    ax.barh([0], [pos_w], left=0, height=0.5)
+    ax.barh([0], [neg_w], left=pos_w, height=0.5)
+    ax.text(0, 0.85, f"{pos_pct:.2f}%", va="center", ha="left", fontsize=14)
+    ax.text(1, 0.85, f"{neg_pct:.2f}%", va="center", ha="right", fontsize=14)
+    ax.text(0, 1.35, "Community Mentions", va="center", ha="left", fontsize=16)
+    ax.set_xlim(0, 1); ax.set_ylim(-0.5, 1.8)
+    buf = io.BytesIO(); plt.tight_layout(pad=1.0)
+    fig.savefig(buf, format="png", bbox_inches="tight", facecolor=fig.get_facecolor())
+    plt.close(fig)
+    return "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode("utf-8")
+
+
+def per_call_ms(fn, number=NUMBER):
+    fn()  # warm imports / font cache
+    return timeit.timeit(fn, number=number) / number * 1000
+
+
+def main():
+    args = (60.5, 20.1, 121, 40, 200)
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = [
+            ("bar strip  matplotlib+base64", per_call_ms(lambda: matplotlib_bar_strip(*args)),
+             len(matplotlib_bar_strip(*args))),
+            ("bar strip  svg template", per_call_ms(lambda: bar_strip_svg(*args)),
+             len(bar_strip_svg(*args))),
+            ("coin chart matplotlib png", per_call_ms(lambda: save_coin_chart_matplotlib("BTC", FLOWS, tmp)),
+             os.path.getsize(save_coin_chart_matplotlib("BTC", FLOWS, tmp))),
+            ("coin chart svg file", per_call_ms(lambda: save_coin_chart("BTC", FLOWS, tmp, fmt="svg")),
+             os.path.getsize(save_coin_chart("BTC", FLOWS, tmp, fmt="svg"))),
+        ]
+    for name, ms, size in rows:
+        print(f"{name:<32} {ms:8.3f} ms/chart  {size:>7} bytes")
+    print("JSON payload now carries '/images/<id>.svg' (~40 bytes) instead of the base64 PNG.")
+
+
+if __name__ == "__main__":
+    main()
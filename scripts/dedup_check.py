@@ -0,0 +1,72 @@
+import json
+import os
+import random
+import tempfile
+import time
+
+from preprocessing.dedup import Deduplicator, merge_counts
+from preprocessing.preprocess import to_record
+from services.flow_parser import parse_flows
+
+# Preprocessing dedup on the saved raw batches, plus seen-set throughput on synthetic messages.
+# Run from the repo root: python -m scripts.dedup_check
+BASE_DIR = os.path.join(os.path.dirname(__file__), "..", "test data")
+CHANNELS = {"focus_based": "raw_focus_messages.json", "news": "raw_news_messages.json"}
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "dedup.sqlite")
+    dedup = Deduplicator(path)
+    for channel, name in CHANNELS.items():
+        with open(os.path.join(BASE_DIR, name), "r", encoding="utf-8") as f:
+            records = [to_record(m) for m in json.load(f)]
+        batch, again_batch = {}, {}
+        kept = list(dedup.filter(records, channel, batch))
+        # a re-read batch, from another worker's connection: same verdicts, nothing counted twice
+        again = list(Deduplicator(path).filter(records, channel, again_batch))
+        assert [r["id"] for r in kept] == [r["id"] for r in again], "re-reading a batch changed the result"
+        assert batch[channel]["kept"] == len(kept) and batch[channel]["seen"] == len(records), batch
+        assert not again_batch, again_batch
+        print(f"{channel:<12} {len(records)} messages, {len(kept)} kept")
+    channels = dedup.stats()["channels"]
+    print(json.dumps(channels, indent=2))
+    assert all(channels[ch]["seen"] == channels[ch]["kept"] + channels[ch]["dropped"] for ch in CHANNELS), channels
+
+    # the seen-set is per channel, and short templated posts are never exact duplicates
+    probe = Deduplicator(os.path.join(tmp, "probe.sqlite"))
+    text = "Breaking: exchange lists new token pairs for spot trading today"
+    assert probe.check(text, 1, "news") is None and probe.check(text, 2, "general") is None
+    assert probe.check(text, 3, "news") == "exact"
+    assert probe.check(text, 1, "news") is None, "a message id keeps its first verdict"
+    assert probe.check("$arc +$6.1K (3 whales)", 4, "focus_based") is None
+    assert probe.check("$arc +$6.1K (3 whales)", 5, "focus_based") is None
+    assert merge_counts(probe.stats()["channels"])["news"]["seen"] == 2
+
+    # an embed repeating the message must not count its flows twice
+    message = {
+        "content": "**Moby AI (@mobyagent) / Twitter**",
+        "embeds": [{
+            "title": "Small cap whale flows: $Baby +$6.14K (3 whales) $MATT +$",
+            "description": "Small cap whale flows: $Baby +$6.14K (3 whales) $MATT +$2.75K (3 whales) — Moby AI",
+            "timestamp": "2025-02-27T07:02:00+00:00",
+            "author": {"name": "@mobyagent"},
+        }],
+    }
+    flows = parse_flows([to_record(message)["text"]]).aggregated()
+    assert flows == {"Baby": 6140.0, "MATT": 2750.0}, flows
+    print(f"embed flows: {flows}")
+
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(5000)]
+    bench = Deduplicator(os.path.join(tmp, "bench.sqlite"))
+    n = 20_000
+    records = [{"id": i, "text": " ".join(rng.choices(words, k=25))} for i in range(n)]
+    t0 = time.perf_counter()
+    kept = sum(1 for _ in bench.filter(records, "synthetic"))
+    elapsed = time.perf_counter() - t0
+    print(f"{n:,} messages: {elapsed * 1e6 / n:.0f} us/message, {kept:,} kept, {bench.stats()['tracked']:,} tracked")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from extrctor import async_fetcher
+from extrctor.async_fetcher import fetch_channels, latest_message_id, shutdown_fetcher
+
+# Exercise the async Discord fetcher against a local stub API. Each channel misbehaves differently:
+#   news        - 200 whose X-RateLimit-* headers say the bucket is empty for RESET_S
+#   general     - one 429 with an HTML body and a Retry-After header, then 200
+#   focus_based - one global 429 (JSON body), then 200
+#   finder      - one 500, then 200
+# A second fetch and a latest-id probe must reuse the process's connections and wait out the
+# news bucket learned by the first fetch.
+# Run from the repo root: python -m scripts.discord_stub_check
+CHANNELS = {"news": "101", "general": "102", "focus_based": "103", "finder": "104"}
+PAGE = 5
+LATENCY_S = 0.3
+RESET_S = 2.0
+
+
+def _handler(state: dict):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, so pooled connections are reused
+
+        def _send(self, status, body: bytes, content_type="application/json", extra=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (extra or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            m = re.match(r"/channels/(\d+)/messages", self.path)
+            if not m:
+                self._send(404, b"{}")
+                return
+            channel_id = m.group(1)
+            with state["lock"]:
+                state["hits"][channel_id] = hits = state["hits"].get(channel_id, 0) + 1
+                state["connections"].add(self.client_address)
+            time.sleep(LATENCY_S)
+            if channel_id == CHANNELS["general"] and hits == 1:
+                self._send(429, b"<html><body>Too Many Requests</body></html>", "text/html",
+                           {"Retry-After": "0.2"})
+                return
+            if channel_id == CHANNELS["focus_based"] and hits == 1:
+                self._send(429, json.dumps({"retry_after": 0.2, "global": True}).encode("utf-8"))
+                return
+            if channel_id == CHANNELS["finder"] and hits == 1:
+                self._send(500, b"{}")
+                return
+            size = min(PAGE, int(re.search(r"limit=(\d+)", self.path).group(1)))
+            page = [{"id": f"{channel_id}{i:03d}", "content": f"message {i}"} for i in range(size)]
+            empty = channel_id == CHANNELS["news"]
+            self._send(200, json.dumps(page).encode("utf-8"), extra={
+                "X-RateLimit-Bucket": f"bucket-{channel_id}",
+                "X-RateLimit-Remaining": "0" if empty else "4",
+                "X-RateLimit-Reset-After": str(RESET_S),
+            })
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+def main():
+    state = {"hits": {}, "connections": set(), "lock": threading.Lock()}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    async_fetcher.CHANNELS = CHANNELS
+    async_fetcher.BACKOFF_BASE = 0.05
+
+    t0 = time.perf_counter()
+    results = fetch_channels(list(CHANNELS), base_url=base_url)
+    elapsed = time.perf_counter() - t0
+
+    failures = []
+    for channel_type, messages in results.items():
+        print(f"{channel_type:<12} {'failed' if messages is None else f'{len(messages)} messages'}, "
+              f"{state['hits'].get(CHANNELS[channel_type], 0)} requests")
+        if messages is None or len(messages) != PAGE:
+            failures.append(f"{channel_type} not fetched")
+    # serial would be >= 7 round trips; concurrent is two rounds plus the retry delays
+    print(f"elapsed {elapsed:.2f}s ({LATENCY_S}s per request)")
+    if elapsed > 4 * LATENCY_S + 1.0:
+        failures.append("channels were not fetched concurrently")
+
+    # the next fetch and the probe share the first fetch's session and bucket state
+    t0 = time.perf_counter()
+    again = fetch_channels(["news", "general"], base_url=base_url)
+    elapsed = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    newest = latest_message_id("news", base_url=base_url)
+    probe_s = time.perf_counter() - t0
+    print(f"second fetch {elapsed:.2f}s, probe {probe_s:.2f}s (newest news id {newest}), "
+          f"{len(state['connections'])} connections in total")
+    if None in again.values() or newest != f"{CHANNELS['news']}000":
+        failures.append("second fetch failed")
+    # a fresh limiter would send both requests at once (one LATENCY_S each)
+    if elapsed < RESET_S / 2 or probe_s < RESET_S / 2:
+        failures.append("empty news bucket was not respected across calls")
+    if len(state["connections"]) > len(CHANNELS):
+        failures.append("connections were not reused across calls")
+    shutdown_fetcher()
+    server.shutdown()
+
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
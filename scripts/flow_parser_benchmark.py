@@ -0,0 +1,56 @@
+import json
+import os
+import re
+import timeit
+
+from services.flow_parser import parse_flows
+
+# Micro-benchmark: legacy per-match regex loop vs the shared columnar flow parser.
+# Run from the repo root: python -m scripts.flow_parser_benchmark
+script_dir = os.path.dirname(os.path.abspath(__file__))
+file_path = os.path.join(script_dir, '..', 'data', 'preprocessed_data1.json')
+
+REPEAT = 5
+NUMBER = 20
+
+
+def legacy_flows(tweets):
+    flow_pattern = r'\$(\w+)\s*([+-])\$(\d+(?:\.\d+)?[KM]?)'
+    coin_data = {}
+    for tweet in tweets:
+        for coin, sign, value_str in re.findall(flow_pattern, tweet):
+            if value_str.endswith('K'):
+                multiplier, numeric = 1_000, value_str[:-1]
+            elif value_str.endswith('M'):
+                multiplier, numeric = 1_000_000, value_str[:-1]
+            else:
+                multiplier, numeric = 1, value_str
+            try:
+                val = float(numeric) * multiplier
+            except ValueError:
+                continue
+            coin_data.setdefault(coin, []).append(val if sign == '+' else -val)
+    aggregated = {coin: sum(vals) for coin, vals in coin_data.items()}
+    return coin_data, aggregated
+
+
+def columnar_flows(tweets):
+    flows = parse_flows(tweets)
+    return flows.detailed(), flows.aggregated()
+
+
+def run_benchmark():
+    with open(file_path, 'r', encoding='utf-8') as f:
+        tweets = json.load(f)
+
+    # scale the sample up so timings are not dominated by call overhead
+    batch = tweets * 50
+    assert legacy_flows(tweets) == columnar_flows(tweets), "parsers disagree on the sample"
+
+    for name, fn in [("legacy loop", legacy_flows), ("columnar", columnar_flows)]:
+        best = min(timeit.repeat(lambda: fn(batch), repeat=REPEAT, number=NUMBER)) / NUMBER
+        print(f"{name:12s}: {best * 1000:8.2f} ms per {len(batch)} texts")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+
+# Startup budget check: cold `import main` in a fresh interpreter, measuring wall time and peak RSS,
+# and failing if any heavy library is pulled in at import time.
+# Run from the repo root: python -m scripts.import_time_benchmark
+# Exits non-zero when a budget is exceeded, so it can gate CI.
+repo_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+IMPORT_BUDGET_S = float(os.getenv("IMPORT_BUDGET_S", "3.0"))
+IMPORT_BUDGET_RSS_MB = float(os.getenv("IMPORT_BUDGET_RSS_MB", "250"))
+RUNS = int(os.getenv("IMPORT_BENCH_RUNS", "3"))
+
+# must stay deferred until first use / warm_up()
+HEAVY_MODULES = ["torch", "transformers", "optimum", "matplotlib", "pandas", "nltk", "twikit", "bs4"]
+
+PROBE = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+import main
+elapsed = time.perf_counter() - t0
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "rss_mb": rss_kb / 1024,
+                  "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_once():
+    proc = subprocess.run([sys.executable, "-c", PROBE], cwd=repo_root, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    runs = [measure_once() for _ in range(RUNS)]
+    best_s = min(r["seconds"] for r in runs)
+    peak_rss = max(r["rss_mb"] for r in runs)
+    heavy = sorted({m for r in runs for m in r["heavy"]})
+
+    print(f"import main: best {best_s:.3f}s over {RUNS} runs (budget {IMPORT_BUDGET_S:.2f}s)")
+    print(f"peak RSS: {peak_rss:.1f} MB (budget {IMPORT_BUDGET_RSS_MB:.0f} MB)")
+    print(f"heavy modules loaded at import: {heavy or 'none'}")
+
+    failures = []
+    if best_s > IMPORT_BUDGET_S:
+        failures.append("import time over budget")
+    if peak_rss > IMPORT_BUDGET_RSS_MB:
+        failures.append("RSS over budget")
+    if heavy:
+        failures.append("heavy modules imported eagerly: " + ", ".join(heavy))
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,7 +8,7 @@ onnx_model_path = "../models/finetuned_sentiment_model_onnx"
 tokenizer = AutoTokenizer.from_pretrained(onnx_model_path)
 model = ORTModelForSequenceClassification.from_pretrained(
     onnx_model_path,
-    provider="CUDAExecutionProvider"  # Use "CPUExecutionProvider" if no GPU is available.
+    provider="CPUExecutionProvider"  # Use "CUDAExecutionProvider" on a GPU box.
 )
 
 
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse as up
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from extrctor import nitter_scraper
+from extrctor.nitter_scraper import MirrorRegistry, scrape_nitter
+from services.persistence import flush
+
+# Exercise the async Nitter scraper against local stub mirrors serving canned Nitter HTML:
+#   good    - 5 pages of 20 tweets each, linked by show-more cursors
+#   blocked - always 429
+#   dead    - nothing listening
+# Run from the repo root: python -m scripts.nitter_stub_check
+PAGES, PER_PAGE = 5, 20
+
+
+def _page_html(prefix: str, page: int) -> str:
+    items = "".join(
+        f'<div class="timeline-item"><div class="tweet-content">{prefix} tweet {page}-{i} $BTC</div></div>'
+        for i in range(PER_PAGE)
+    )
+    more = f'<div class="show-more"><a href="?f=tweets&amp;cursor=p{page + 1}">Load more</a></div>' \
+        if page + 1 < PAGES else ""
+    return f'<html><body><div class="timeline">{items}</div>{more}</body></html>'
+
+
+def _handler(kind: str):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if kind == "blocked":
+                self.send_response(429)
+                self.end_headers()
+                return
+            qs = up.parse_qs(up.urlparse(self.path).query)
+            page = int(qs.get("cursor", ["p0"])[0][1:])
+            body = _page_html(f"{kind}:{self.server.server_port}", page).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+def _serve(kind: str):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(kind))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    nitter_scraper.PAGE_INTERVAL_S = 0.05
+    good, good_url = _serve("good")
+    blocked, blocked_url = _serve("blocked")
+    dead_url = "http://127.0.0.1:9"   # discard port: connection refused
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        health_file = os.path.join(tmp, "health.json")
+        registry = MirrorRegistry([good_url, blocked_url, dead_url], health_file=health_file)
+
+        t0 = time.perf_counter()
+        texts = asyncio.run(scrape_nitter("btc", 60, registry=registry))
+        elapsed = time.perf_counter() - t0
+        print(f"limit 60: {len(texts)} texts in {elapsed:.2f}s")
+        if len(texts) != 60 or len(set(texts)) != 60:
+            failures.append("did not stop at exactly 60 unique texts")
+
+        # repeated failures open the breakers of the blocked and dead mirrors
+        for _ in range(3):
+            asyncio.run(scrape_nitter("eth", 10, registry=registry))
+        stats = registry.stats()
+        for url in (blocked_url, dead_url):
+            print(f"{url}: open={stats[url]['open']} failures={stats[url]['failures']} blocks={stats[url]['blocks']}")
+            if not stats[url]["open"]:
+                failures.append(f"breaker not open for {url}")
+        print(f"{good_url}: score={stats[good_url]['score']} latency={stats[good_url]['latency_s']}")
+        if registry.ranked() != [good_url]:
+            failures.append("open mirrors still ranked")
+
+        # half-open: after the cooldown a single failed trial re-opens the breaker
+        trial = MirrorRegistry([dead_url], health_file=None)
+        for _ in range(nitter_scraper.BREAKER_FAILURES):
+            asyncio.run(scrape_nitter("sol", 10, registry=trial))
+        health = trial.mirrors[dead_url]
+        health.open_until = 0.0
+        asyncio.run(scrape_nitter("sol", 10, registry=trial))
+        print(f"{dead_url}: half-open trial failed -> open={not health.available(time.time())} "
+              f"open_s={health.open_s}")
+        if health.available(time.time()):
+            failures.append("failed half-open trial did not re-open the breaker")
+
+        # health survives a restart (persist_json writes in the background)
+        flush()
+        reloaded = MirrorRegistry([good_url, blocked_url, dead_url], health_file=health_file)
+        if reloaded.ranked() != [good_url]:
+            failures.append("breaker state not persisted")
+
+    good.shutdown()
+    blocked.shutdown()
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
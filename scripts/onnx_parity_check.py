@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+import time
+
+from model_loader.berta_models import (
+    load_finbert_sentiment_model, load_deberta_sentiment_model, load_deberta_ner_model
+)
+from preprocessing.preprocess import extract_text
+
+# Compare each ONNX backend's labels against PyTorch on the bundled sample.
+# Run from the repo root: python -m scripts.onnx_parity_check
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sample_file = os.path.join(script_dir, "..", "test data", "0628data.json")
+
+MODELS = {
+    "finbert": load_finbert_sentiment_model,
+    "twitter_roberta": load_deberta_sentiment_model,
+    "ner": load_deberta_ner_model,
+}
+ONNX_BACKENDS = ["onnx", "onnx-int8"]
+MIN_AGREEMENT = 0.95
+
+
+def _labels(pipe, texts, is_ner):
+    labels = []
+    for text in texts:
+        out = pipe(text[:512])
+        if is_ner:
+            labels.append(sorted((e["entity_group"], e["word"].strip()) for e in out))
+        else:
+            labels.append(out[0]["label"].upper())
+    return labels
+
+
+def run_parity_check():
+    with open(sample_file, "r", encoding="utf-8") as f:
+        texts = [t for t in (extract_text(m) for m in json.load(f)) if t]
+    print(f"Loaded {len(texts)} sample texts from {sample_file}")
+
+    failed = False
+    for name, loader in MODELS.items():
+        is_ner = name == "ner"
+        t0 = time.perf_counter()
+        reference = _labels(loader(backend="pytorch"), texts, is_ner)
+        print(f"[{name}] pytorch: {time.perf_counter() - t0:.2f}s")
+
+        for backend in ONNX_BACKENDS:
+            t0 = time.perf_counter()
+            labels = _labels(loader(backend=backend), texts, is_ner)
+            elapsed = time.perf_counter() - t0
+            agree = sum(1 for a, b in zip(reference, labels) if a == b) / len(texts)
+            status = "OK" if agree >= MIN_AGREEMENT else "MISMATCH"
+            print(f"[{name}] {backend}: {elapsed:.2f}s, label agreement {agree:.2%} -> {status}")
+            if agree < MIN_AGREEMENT:
+                failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_parity_check())
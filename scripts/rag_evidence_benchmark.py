@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import weight_handler.rag_evidence as rag_evidence
+from weight_handler.rag_evidence import EvidenceIndex, _Writer
+
+# /rag/explain evidence latency on a synthetic store (clustered unit vectors, skewed coin tags),
+# and recall of the IVF-probed ranking against scoring every tagged row.
+# No model needed. Run from the repo root: python -m scripts.rag_evidence_benchmark [messages]
+DIM = 384
+CHUNK = 50_000
+TOPICS = 200
+TAGS = ["bitcoin", "ethereum", "solana", "xrp", "cardano"] + [f"coin{i}" for i in range(45)]
+
+
+def unit(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=-1, keepdims=True)).astype(np.float32)
+
+
+def build(directory: str, n: int, topics: np.ndarray, rng) -> float:
+    writer = _Writer(directory, "synthetic", DIM, "synthetic")
+    # ~1/rank tag frequencies: bitcoin is on roughly a fifth of all messages
+    p = 1.0 / np.arange(1, len(TAGS) + 1)
+    p /= p.sum()
+    t0 = time.perf_counter()
+    for start in range(0, n, CHUNK):
+        m = min(CHUNK, n - start)
+        vectors = unit(topics[rng.integers(0, TOPICS, size=m)] + 0.08 * rng.standard_normal((m, DIM), dtype=np.float32))
+        stance = vectors[:, 0] - vectors[:, 1]
+        first = rng.choice(len(TAGS), size=m, p=p)
+        second = rng.choice(len(TAGS), size=m, p=p)
+        tags = [[TAGS[a]] if a == b or i % 3 else [TAGS[a], TAGS[b]] for i, (a, b) in enumerate(zip(first, second))]
+        keys = [f"m:{start + i}" for i in range(m)]
+        texts = [f"synthetic message {start + i} about {' and '.join(t)}" for i, t in enumerate(tags)]
+        writer.append(keys, ["synthetic"] * m, texts, tags, vectors, stance)
+    writer.train_ivf(rng)
+    return time.perf_counter() - t0
+
+
+def texts(res) -> set:
+    return {m["text"] for side in ("supporting", "contradicting") for m in res[side]}
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    k = 10
+    rng = np.random.default_rng(0)
+    topics = unit(rng.standard_normal((TOPICS, DIM), dtype=np.float32))
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"building {n:,} messages ... {build(tmp, n, topics, rng):.1f}s")
+        index = EvidenceIndex(tmp)
+        t0 = time.perf_counter()
+        index.refresh()
+        print(f"reader load: {(time.perf_counter() - t0) * 1000:.0f} ms, "
+              f"vectors memmap {os.path.getsize(os.path.join(tmp, 'vectors.i8')) / 2**20:.0f} MB, "
+              f"ivf {index.meta['ivf']}")
+        queries = unit(topics[rng.integers(0, TOPICS, size=50)] + 0.08 * rng.standard_normal((50, DIM), dtype=np.float32))
+        for coin in ("BTC", "$ETH", "coin40"):
+            times, results = [], []
+            for q in queries:
+                t0 = time.perf_counter()
+                results.append(index.evidence(coin, direction=1.0, k=k, query=q))
+                times.append((time.perf_counter() - t0) * 1000)
+            limit, rag_evidence.IVF_CANDIDATES = rag_evidence.IVF_CANDIDATES, n
+            exact = [index.evidence(coin, direction=1.0, k=k, query=q) for q in queries]
+            rag_evidence.IVF_CANDIDATES = limit
+            recall = np.mean([len(texts(a) & texts(b)) / max(len(texts(b)), 1) for a, b in zip(results, exact)])
+            times.sort()
+            print(f"{coin:<7} {results[0]['messages']:>9,} tagged {results[0]['scored']:>7,} scored  "
+                  f"p50 {times[len(times) // 2]:6.2f} ms  p99 {times[int(len(times) * 0.99)]:6.2f} ms  "
+                  f"recall@{k} {recall:.3f}")
+            assert results[0]["ranking"] == "similarity", results[0]
+            if coin == "BTC":
+                assert results[0]["scored"] < results[0]["messages"], "IVF did not bound the scored rows"
+
+
+if __name__ == "__main__":
+    main()
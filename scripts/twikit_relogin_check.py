@@ -0,0 +1,81 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+from extrctor import twikit_pool
+from extrctor.twikit_pool import TwikitSessionPool
+
+# An auth error on a session with expired saved cookies must lead to a fresh login on the next
+# checkout, not to reloading the same cookies. Uses a fake client; no network or twikit needed.
+# Run from the repo root: python -m scripts.twikit_relogin_check
+
+
+class Unauthorized(Exception):
+    pass
+
+
+class FakeClient:
+    logins = 0
+
+    def __init__(self):
+        self.fresh = False
+
+    def load_cookies(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            self.fresh = json.load(f).get("fresh", False)
+
+    async def login(self, **auth):
+        FakeClient.logins += 1
+        self.fresh = True
+
+    def save_cookies(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"fresh": self.fresh}, f)
+
+
+async def search(client):
+    if not client.fresh:
+        raise Unauthorized("expired cookies")
+    return "ok"
+
+
+async def check(tmp: str) -> list:
+    cookies = os.path.join(tmp, "cookies.json")
+    with open(cookies, "w", encoding="utf-8") as f:
+        json.dump({"fresh": False}, f)   # saved cookies that the server no longer accepts
+    account = {"email": "e@x", "username": "user", "password": "pw", "cookies_path": cookies}
+    pool = TwikitSessionPool(accounts=[account])
+
+    failures = []
+    try:
+        await pool.run(search)
+        failures.append("expired cookies were accepted")
+    except Unauthorized:
+        pass
+    session = pool.sessions[0]
+    if not session.needs_login:
+        failures.append("auth error did not mark the session for re-login")
+
+    result = await pool.run(search)
+    print(f"after auth failure: result={result!r} logins={FakeClient.logins} stats={pool.stats()}")
+    if result != "ok" or FakeClient.logins != 1:
+        failures.append("next checkout did not log in again")
+    pool._refresher.cancel()
+    return failures
+
+
+def main():
+    twikit_pool._new_client = FakeClient
+    with tempfile.TemporaryDirectory() as tmp:
+        failures = asyncio.run(check(tmp))
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,10 @@
-import os
-import json
-import re
+from preprocessing.dedup import drop_duplicates
+from preprocessing.preprocess import extract_text, iter_records, write_json_texts, write_jsonl
 
-def extract_text(tweet):
-    text = tweet.get("content", "")
-    for embed in tweet.get("embeds", []):
-        text += " " + embed.get("title", "")
-        text += " " + embed.get("description", "")
-        text += " " + embed.get("timestamp", "")
-        # Safely extract author name if available
-        author = embed.get("author", {}).get("name", "")
-        text += " " + author
-    return text.strip()
-
-def preprocess_flow(input_path, output_path):
-    with open(input_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    texts = [extract_text(tweet) for tweet in data]
-    with open(output_path, "w") as f:
-        json.dump(texts, f, indent=2)
-    print(f"Preprocessed data saved to {output_path}")
\ No newline at end of file
+def preprocess_flow(input_path, output_path, jsonl: bool = False):
+    records = drop_duplicates(iter_records(input_path))
+    if jsonl:
+        write_jsonl(records, output_path)
+    else:
+        write_json_texts((r["text"] for r in records), output_path)
+    print(f"Preprocessed data saved to {output_path}")
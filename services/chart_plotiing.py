@@ -1,8 +1,43 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
+import hashlib
+import json
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+from services.chart_render import CHART_FORMAT, coin_chart_svg, svg_to_png
+from services.persistence import persist_json
+from services.pos_keywords import available_cores
+
+MANIFEST_NAME = "manifest.json"
+# bump when chart layout changes so every chart is re-rendered once
+CHART_RENDER_VERSION = "svg-v1"
+# PNG rendering (cairosvg/matplotlib) goes to a process pool at this many charts; SVG is cheap enough inline
+CHART_POOL_MIN = int(os.getenv("CHART_POOL_MIN", "16"))
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "0")) or None   # default: available cores
+
+def save_coin_chart(coin, flows, save_dir, fmt: str = None):
+    """Write <save_dir>/<coin>.svg, or .png (cairosvg when installed, else matplotlib); returns the file path."""
+    fmt = (fmt or CHART_FORMAT).lower()
+    os.makedirs(save_dir, exist_ok=True)
+    if fmt == "png":
+        try:
+            png = svg_to_png(coin_chart_svg(coin, flows))
+        except RuntimeError:
+            return save_coin_chart_matplotlib(coin, flows, save_dir)
+        path = os.path.join(save_dir, f"{coin}.png")
+        with open(path, "wb") as f:
+            f.write(png)
+        return path
+    path = os.path.join(save_dir, f"{coin}.svg")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(coin_chart_svg(coin, flows))
+    return path
+
+def save_coin_chart_matplotlib(coin, flows, save_dir):
+    # matplotlib is only needed when charts are drawn; keep it off the import path
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as mpatches
 
-def save_coin_chart(coin, flows, save_dir):
     total_mentions = len(flows)
     pos_mentions = sum(1 for v in flows if v > 0)
     neg_mentions = sum(1 for v in flows if v < 0)
@@ -35,5 +70,60 @@ def save_coin_chart(coin, flows, save_dir):
 
     # Save
     os.makedirs(save_dir, exist_ok=True)
-    plt.savefig(os.path.join(save_dir, f"{coin}.png"), facecolor=fig.get_facecolor())
+    path = os.path.join(save_dir, f"{coin}.png")
+    plt.savefig(path, facecolor=fig.get_facecolor())
     plt.close()
+    return path
+
+def chart_input_hash(coin, flows, fmt: str) -> str:
+    payload = json.dumps([CHART_RENDER_VERSION, fmt, coin, list(flows)], separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def _load_manifest(path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _render_one(args):
+    coin, flows, save_dir, fmt = args
+    return coin, save_coin_chart(coin, flows, save_dir, fmt=fmt)
+
+def render_coin_charts(coin_data: dict, save_dir, fmt: str = None, top_n: int = None, workers: int = CHART_WORKERS) -> dict:
+    """
+    Render per-coin charts, skipping coins whose flows hash matches the manifest entry of the last
+    render (and whose file still exists). `top_n` keeps only the coins with the largest |net flow|.
+    Returns {"rendered", "skipped", "selected"} counts.
+    """
+    fmt = (fmt or CHART_FORMAT).lower()
+    coins = list(coin_data)
+    if top_n:
+        coins = sorted(coins, key=lambda c: abs(sum(coin_data[c])), reverse=True)[:top_n]
+
+    os.makedirs(save_dir, exist_ok=True)
+    manifest_path = os.path.join(save_dir, MANIFEST_NAME)
+    manifest = _load_manifest(manifest_path)
+
+    todo, hashes = [], {}
+    for coin in coins:
+        h = chart_input_hash(coin, coin_data[coin], fmt)
+        entry = manifest.get(coin)
+        if entry and entry.get("hash") == h and os.path.exists(entry.get("file", "")):
+            continue
+        hashes[coin] = h
+        todo.append((coin, coin_data[coin], save_dir, fmt))
+
+    if fmt == "png" and len(todo) >= CHART_POOL_MIN:
+        ctx = multiprocessing.get_context("spawn")
+        n = min(workers or available_cores(), len(todo))
+        with ProcessPoolExecutor(max_workers=n, mp_context=ctx) as pool:
+            results = list(pool.map(_render_one, todo, chunksize=max(1, len(todo) // (n * 4))))
+    else:
+        results = [_render_one(args) for args in todo]
+
+    for coin, path in results:
+        manifest[coin] = {"hash": hashes[coin], "file": path}
+    if results:
+        persist_json(manifest, manifest_path, background=False)
+    return {"rendered": len(results), "skipped": len(coins) - len(results), "selected": len(coins)}
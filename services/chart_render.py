@@ -0,0 +1,99 @@
+import os
+from xml.sax.saxutils import escape
+
+# Fixed-layout charts rendered from SVG templates: no figure/canvas setup, a few string formats per chart.
+# PNG is optional and needs cairosvg (pip install cairosvg).
+
+# "svg" (default) or "png"
+CHART_FORMAT = os.getenv("CHART_FORMAT", "svg").lower()
+
+_BAR_STRIP = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" viewBox="0 0 {w} {h}">'
+    '<rect width="100%" height="100%" fill="#111827"/>'
+    '<text x="12" y="24" font-family="sans-serif" font-size="16" fill="#e5e7eb">Community Mentions</text>'
+    '<text x="12" y="48" font-family="sans-serif" font-size="14" fill="#e5e7eb">{pos_pct:.2f}%</text>'
+    '<text x="{right}" y="48" font-family="sans-serif" font-size="14" fill="#e5e7eb" text-anchor="end">{neg_pct:.2f}%</text>'
+    '<rect x="12" y="58" width="{pos_w:.1f}" height="22" fill="#1f77b4"/>'
+    '<rect x="{neg_x:.1f}" y="58" width="{neg_w:.1f}" height="22" fill="#ff7f0e"/>'
+    '</svg>'
+)
+
+_COIN_CHART = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="600" height="400" viewBox="0 0 600 400">'
+    '<rect width="100%" height="100%" fill="#111111"/>'
+    '<text x="215" y="30" font-family="sans-serif" font-size="16" fill="white" text-anchor="middle">{title}</text>'
+    '<line x1="60" y1="50" x2="60" y2="350" stroke="white"/>'
+    '<line x1="60" y1="350" x2="370" y2="350" stroke="white"/>'
+    '{ticks}'
+    '<rect x="90" y="{pos_y:.1f}" width="100" height="{pos_h:.1f}" fill="limegreen"/>'
+    '<rect x="240" y="{neg_y:.1f}" width="100" height="{neg_h:.1f}" fill="red"/>'
+    '<text x="140" y="{pos_label_y:.1f}" font-family="sans-serif" font-size="12" fill="white" text-anchor="middle">{pos_pct:.2f}%</text>'
+    '<text x="290" y="{neg_label_y:.1f}" font-family="sans-serif" font-size="12" fill="white" text-anchor="middle">{neg_pct:.2f}%</text>'
+    '<text x="140" y="368" font-family="sans-serif" font-size="12" fill="white" text-anchor="middle">Positive</text>'
+    '<text x="290" y="368" font-family="sans-serif" font-size="12" fill="white" text-anchor="middle">Negative</text>'
+    '<rect x="390" y="160" width="200" height="70" fill="#222222" stroke="white"/>'
+    '<text x="398" y="182" font-family="sans-serif" font-size="12" fill="white">{line1}</text>'
+    '<text x="398" y="202" font-family="sans-serif" font-size="12" fill="white">{line2}</text>'
+    '<text x="398" y="222" font-family="sans-serif" font-size="12" fill="white">{line3}</text>'
+    '</svg>'
+)
+
+# y axis 0..120 over 300px, ticks every 20
+_Y0, _PLOT_H, _Y_MAX = 350, 300, 120
+_TICKS = "".join(
+    f'<text x="54" y="{_Y0 - v / _Y_MAX * _PLOT_H + 4:.1f}" font-family="sans-serif" font-size="11" '
+    f'fill="white" text-anchor="end">{v}</text>'
+    for v in range(0, _Y_MAX + 1, 20)
+)
+
+
+def bar_strip_svg(pos_pct: float, neg_pct: float, pos: int, neg: int, total: int, width: int = 800) -> str:
+    """Positive/negative share strip used by the coin search endpoints."""
+    inner = width - 24
+    pos_w = inner * (pos / total) if total else 0.0
+    neg_w = inner * (neg / total) if total else 0.0
+    return _BAR_STRIP.format(w=width, h=90, right=width - 12, pos_pct=pos_pct, neg_pct=neg_pct,
+                             pos_w=pos_w, neg_x=12 + pos_w, neg_w=neg_w)
+
+
+def coin_flow_stats(flows) -> dict:
+    total_mentions = len(flows)
+    pos_mentions = sum(1 for v in flows if v > 0)
+    neg_mentions = sum(1 for v in flows if v < 0)
+    pos_pct = round(pos_mentions / total_mentions * 100, 2) if total_mentions else 0
+    return {
+        "total_mentions": total_mentions,
+        "pos_mentions": pos_mentions,
+        "neg_mentions": neg_mentions,
+        "pos_pct": pos_pct,
+        "neg_pct": round(100 - pos_pct, 2),
+        "total_flow": sum(flows),
+        "pos_flow": sum(v for v in flows if v > 0),
+        "neg_flow": sum(v for v in flows if v < 0),
+    }
+
+
+def coin_chart_svg(coin: str, flows) -> str:
+    """Per-coin mentions bar chart with the trader insight box (same content as the matplotlib chart)."""
+    st = coin_flow_stats(flows)
+    pos_h = min(st["pos_pct"], _Y_MAX) / _Y_MAX * _PLOT_H
+    neg_h = min(st["neg_pct"], _Y_MAX) / _Y_MAX * _PLOT_H
+    return _COIN_CHART.format(
+        title=escape(f"{coin} Community Mentions"),
+        ticks=_TICKS,
+        pos_y=_Y0 - pos_h, pos_h=pos_h, neg_y=_Y0 - neg_h, neg_h=neg_h,
+        pos_label_y=_Y0 - pos_h - 6, neg_label_y=_Y0 - neg_h - 6,
+        pos_pct=st["pos_pct"], neg_pct=st["neg_pct"],
+        line1=escape(f"Winning: {st['pos_mentions']} (+${int(st['pos_flow']):,})"),
+        line2=escape(f"Losing: {st['neg_mentions']} (-${int(abs(st['neg_flow'])):,})"),
+        line3=escape(f"Offloading: {st['total_mentions']} (${int(abs(st['total_flow'])):,})"),
+    )
+
+
+def svg_to_png(svg: str) -> bytes:
+    """Optional PNG output; needs cairosvg."""
+    try:
+        import cairosvg
+    except ImportError as e:
+        raise RuntimeError("PNG charts need cairosvg: pip install cairosvg") from e
+    return cairosvg.svg2png(bytestring=svg.encode("utf-8"))
@@ -0,0 +1,186 @@
+import threading
+from collections import deque
+
+# canonical coin -> ticker aliases (matched case-insensitively)
+TICKER_ALIASES = {
+    "bitcoin": ["btc", "$btc"],
+    "ethereum": ["eth", "$eth"],
+    "solana": ["sol", "$sol"],
+    "xrp": ["$xrp"],
+    "cardano": ["ada", "$ada"],
+    "litecoin": ["ltc", "$ltc"],
+    "cronos": ["cro", "$cro"],
+    "binance": ["bnb", "$bnb"],
+}
+
+# folded name or alias ("btc", "$btc", "bitcoin") -> canonical coin
+ALIAS_TO_COIN = {coin: coin for coin in TICKER_ALIASES}
+ALIAS_TO_COIN.update({a.lstrip("$"): coin for coin, aliases in TICKER_ALIASES.items() for a in aliases})
+
+
+def canonical_coin(name: str) -> str:
+    """"BTC", "$btc" and "Bitcoin" all become "bitcoin"; unknown names are just case-folded."""
+    folded = (name or "").strip().casefold().lstrip("$")
+    return ALIAS_TO_COIN.get(folded, folded)
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class CoinMatcher:
+    """
+    Aho-Corasick automaton over coin names/aliases: finds every mention in one pass over the text.
+    Matching is case-folded; with `word_boundary`, a match must not sit inside a longer word.
+    New patterns can be added at any time; failure links are rebuilt lazily on the next search.
+    """
+
+    def __init__(self, patterns=None, word_boundary: bool = True):
+        self.word_boundary = word_boundary
+        self._goto = [{}]          # node -> {char: node}
+        self._fail = [0]
+        self._out = [[]]           # node -> pattern ids ending here
+        self._dict_link = [0]      # node -> nearest fail-ancestor with output (0 = none)
+        self._patterns = []        # pattern id -> (folded pattern, label)
+        self._seen = set()         # (folded pattern, label) already inserted
+        self._dirty = False
+        self._lock = threading.Lock()
+        if patterns:
+            self.add(patterns)
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def add(self, patterns) -> int:
+        """
+        Insert patterns: an iterable of names (label = the name itself) or a {pattern: label} mapping.
+        Returns how many new patterns were inserted.
+        """
+        items = patterns.items() if isinstance(patterns, dict) else ((p, p) for p in patterns)
+        added = 0
+        with self._lock:
+            for pattern, label in items:
+                folded = (pattern or "").strip().casefold()
+                if not folded or (folded, label) in self._seen:
+                    continue
+                self._seen.add((folded, label))
+                node = 0
+                for ch in folded:
+                    nxt = self._goto[node].get(ch)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto[node][ch] = nxt
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._out.append([])
+                        self._dict_link.append(0)
+                    node = nxt
+                self._out[node].append(len(self._patterns))
+                self._patterns.append((folded, label))
+                added += 1
+            if added:
+                self._dirty = True
+        return added
+
+    def _build_links(self):
+        # BFS over the trie: O(total pattern length)
+        fail, goto, out, dict_link = self._fail, self._goto, self._out, self._dict_link
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            dict_link[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                dict_link[child] = fail[child] if out[fail[child]] else dict_link[fail[child]]
+                queue.append(child)
+        self._dirty = False
+
+    def find_all(self, text: str) -> list:
+        """Return (start, end, label) for every mention in `text`."""
+        # searches hold the lock so a concurrent add() never exposes a half-inserted pattern
+        with self._lock:
+            if self._dirty:
+                self._build_links()
+            return self._search(text.casefold())
+
+    def _search(self, folded: str) -> list:
+        goto, fail, out, dict_link, patterns = self._goto, self._fail, self._out, self._dict_link, self._patterns
+        check = self.word_boundary
+        n = len(folded)
+        node = 0
+        found = []
+        for i, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = node if out[node] else dict_link[node]
+            while hit:
+                for pid in out[hit]:
+                    pat, label = patterns[pid]
+                    start, end = i - len(pat) + 1, i + 1
+                    if check and (
+                        (start > 0 and _is_word(pat[0]) and _is_word(folded[start - 1]))
+                        or (end < n and _is_word(pat[-1]) and _is_word(folded[end]))
+                    ):
+                        continue
+                    found.append((start, end, label))
+                hit = dict_link[hit]
+        return found
+
+    def with_extra(self, patterns) -> "LayeredMatcher":
+        """
+        This matcher plus `patterns` in a small automaton of their own, for names that only
+        matter to one run (this matcher is left unchanged).
+        """
+        return LayeredMatcher(self, CoinMatcher(patterns, word_boundary=self.word_boundary))
+
+    def find_labels(self, text: str, allowed=None) -> list:
+        """Distinct labels mentioned in `text` (first-seen order), optionally limited to `allowed`."""
+        labels = {}
+        for _, _, label in self.find_all(text):
+            if allowed is None or label in allowed:
+                labels[label] = None
+        return list(labels)
+
+
+class LayeredMatcher:
+    """Several matchers searched as one; mentions come back in text order."""
+
+    def __init__(self, *matchers):
+        self.matchers = matchers
+
+    def __len__(self):
+        return sum(len(m) for m in self.matchers)
+
+    def find_all(self, text: str) -> list:
+        found = [hit for m in self.matchers for hit in m.find_all(text)]
+        found.sort(key=lambda hit: (hit[1], -hit[0]))
+        return found
+
+    find_labels = CoinMatcher.find_labels
+
+
+_COIN_MATCHER = None
+_COIN_MATCHER_LOCK = threading.Lock()
+
+
+def get_coin_matcher(known_names=()) -> CoinMatcher:
+    """
+    Process-wide matcher seeded with `known_names` and the ticker aliases. Per-run names
+    (NER candidates) go in `.with_extra(...)` so this automaton does not grow with every run.
+    """
+    global _COIN_MATCHER
+    with _COIN_MATCHER_LOCK:
+        if _COIN_MATCHER is None:
+            _COIN_MATCHER = CoinMatcher()
+            for coin, aliases in TICKER_ALIASES.items():
+                _COIN_MATCHER.add({alias: coin for alias in aliases})
+        matcher = _COIN_MATCHER
+    matcher.add(known_names)
+    return matcher
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from services.chart_render import CHART_FORMAT, svg_to_png
+
+base_dir = os.path.dirname(__file__)
+
+IMAGE_STORE_ITEMS = int(os.getenv("IMAGE_STORE_ITEMS", "4096"))          # in-memory hot set
+IMAGE_STORE_DIR = os.getenv(
+    "IMAGE_STORE_DIR",
+    os.path.abspath(os.path.join(base_dir, "..", "test data", "images")),
+)
+IMAGE_STORE_MAX_FILES = int(os.getenv("IMAGE_STORE_MAX_FILES", "50000"))  # on-disk size bound
+PRUNE_EVERY = 500  # check the on-disk bound after this many new files
+
+MEDIA_TYPES = {"svg": "image/svg+xml", "png": "image/png"}
+
+
+def _valid_id(image_id: str) -> bool:
+    digest, _, fmt = image_id.partition(".")
+    return fmt in MEDIA_TYPES and len(digest) == 24 and all(c in "0123456789abcdef" for c in digest)
+
+
+class ImageStore:
+    """
+    Content-addressed images: the id is a hash of the bytes, so an id never changes meaning and
+    doubles as a strong ETag. Files on disk are shared by every API worker and survive restarts
+    (oldest pruned past `max_files`); a bounded in-memory LRU keeps recent images hot.
+    """
+
+    def __init__(self, directory: str = IMAGE_STORE_DIR, max_items: int = IMAGE_STORE_ITEMS,
+                 max_files: int = IMAGE_STORE_MAX_FILES):
+        self.directory = directory
+        self.max_items = max_items
+        self.max_files = max_files
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._written = 0
+
+    def _path(self, image_id: str) -> str:
+        return os.path.join(self.directory, image_id)
+
+    def _remember(self, image_id: str, data: bytes):
+        # caller holds self._lock
+        self._items[image_id] = data
+        self._items.move_to_end(image_id)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def put(self, content, fmt: str = "svg") -> str:
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        image_id = f"{hashlib.sha256(data).hexdigest()[:24]}.{fmt}"
+        path = self._path(image_id)
+        if not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            # pid in the temp name: several API workers may store the same chart at once
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            with self._lock:
+                self._written += 1
+                prune = self._written % PRUNE_EVERY == 0
+            if prune:
+                self._prune()
+        with self._lock:
+            self._remember(image_id, data)
+        return image_id
+
+    def get(self, image_id: str):
+        """(bytes, media type) or None."""
+        if not _valid_id(image_id):
+            return None
+        with self._lock:
+            data = self._items.get(image_id)
+            if data is not None:
+                self._items.move_to_end(image_id)
+        if data is None:
+            try:
+                with open(self._path(image_id), "rb") as f:
+                    data = f.read()
+            except OSError:
+                return None
+            with self._lock:
+                self._remember(image_id, data)
+        return data, MEDIA_TYPES[image_id.rsplit(".", 1)[-1]]
+
+    def _prune(self):
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.is_file() and _valid_id(e.name)]
+        except OSError:
+            return
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for e in entries[:len(entries) - self.max_files]:
+            try:
+                os.remove(e.path)
+            except OSError:
+                pass
+
+
+image_store = ImageStore()
+
+
+def image_url(content, fmt: str = "svg") -> str:
+    """Store an image and return the API path that serves it."""
+    return f"/images/{image_store.put(content, fmt)}"
+
+
+def chart_url(svg: str, fmt: str = None) -> str:
+    """Store a rendered chart as SVG, or as PNG when requested and cairosvg is available."""
+    if (fmt or CHART_FORMAT) == "png":
+        try:
+            return image_url(svg_to_png(svg), "png")
+        except RuntimeError:
+            pass
+    return image_url(svg, "svg")
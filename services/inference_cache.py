@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+base_dir = os.path.dirname(__file__)
+
+CACHE_PATH = os.getenv(
+    "INFERENCE_CACHE_PATH",
+    os.path.abspath(os.path.join(base_dir, "..", "test data", "inference_cache.sqlite")),
+)
+MEMORY_ITEMS = int(os.getenv("INFERENCE_CACHE_MEMORY_ITEMS", "20000"))   # in-process LRU size
+MAX_ROWS = int(os.getenv("INFERENCE_CACHE_MAX_ROWS", "500000"))         # on-disk size bound
+MAX_AGE_S = float(os.getenv("INFERENCE_CACHE_MAX_AGE_S", str(30 * 24 * 3600)))  # on-disk age bound
+EVICT_EVERY = 1000  # run disk eviction after this many writes
+
+
+def content_key(text: str) -> str:
+    """Stable key for messages without an id."""
+    return "h:" + hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def record_keys(records) -> list:
+    """
+    Cache keys for normalized records: the Discord message id when present, else a content hash.
+    An id does not change with the text, so callers put PREPROCESS_VERSION in the revision.
+    """
+    return [f"m:{r['id']}" if r.get("id") else content_key(r["text"]) for r in records]
+
+
+class InferenceCache:
+    """
+    Model outputs keyed by (message key, model name, model revision).
+    SQLite on disk with an in-memory LRU in front.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, memory_items: int = MEMORY_ITEMS,
+                 max_rows: int = MAX_ROWS, max_age_s: float = MAX_AGE_S):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_rows = max_rows
+        self.max_age_s = max_age_s
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT NOT NULL, model TEXT NOT NULL, revision TEXT NOT NULL,"
+                " value TEXT NOT NULL, created_at REAL NOT NULL,"
+                " PRIMARY KEY (key, model, revision))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_created ON results(created_at)")
+        return self._conn
+
+    def _remember(self, ck, value):
+        self._lru[ck] = value
+        self._lru.move_to_end(ck)
+        while len(self._lru) > self.memory_items:
+            self._lru.popitem(last=False)
+
+    def get_many(self, model: str, revision: str, keys):
+        """Return {key: value} for the keys that are cached."""
+        found = {}
+        with self._lock:
+            missing = []
+            for k in keys:
+                ck = (k, model, revision)
+                if ck in self._lru:
+                    self._lru.move_to_end(ck)
+                    found[k] = self._lru[ck]
+                    self.memory_hits += 1
+                else:
+                    missing.append(k)
+
+            db = self._db()
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = db.execute(
+                    f"SELECT key, value, created_at FROM results WHERE model=? AND revision=? AND key IN ({marks})",
+                    [model, revision, *chunk],
+                ).fetchall()
+                now = time.time()
+                for k, value, created_at in rows:
+                    if now - created_at > self.max_age_s:
+                        continue
+                    val = json.loads(value)
+                    found[k] = val
+                    self._remember((k, model, revision), val)
+                    self.disk_hits += 1
+            self.misses += len(missing) - sum(1 for k in missing if k in found)
+        return found
+
+    def put_many(self, model: str, revision: str, items):
+        """Store {key: value} pairs."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            for k, v in items.items():
+                self._remember((k, model, revision), v)
+            db = self._db()
+            db.executemany(
+                "INSERT OR REPLACE INTO results (key, model, revision, value, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(k, model, revision, json.dumps(v, ensure_ascii=False), now) for k, v in items.items()],
+            )
+            db.commit()
+            self._writes += len(items)
+            if self._writes >= EVICT_EVERY:
+                self._writes = 0
+                self._evict_locked()
+
+    def _evict_locked(self):
+        db = self._db()
+        db.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.max_age_s,))
+        (rows,) = db.execute("SELECT COUNT(*) FROM results").fetchone()
+        if rows > self.max_rows:
+            db.execute(
+                "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY created_at LIMIT ?)",
+                (rows - self.max_rows,),
+            )
+        db.commit()
+
+    def evict(self):
+        with self._lock:
+            self._evict_locked()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            (rows,) = self._db().execute("SELECT COUNT(*) FROM results").fetchone()
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_items": len(self._lru),
+                "disk_rows": rows,
+            }
+
+
+cache = InferenceCache()
+
+
+def cached_map(model: str, revision: str, texts, compute, keys=None):
+    """
+    Return compute(texts) in input order, running `compute` only on cache misses.
+    `keys` are message ids when known; content hashes are used otherwise.
+    """
+    texts = list(texts)
+    keys = list(keys) if keys is not None else [content_key(t) for t in texts]
+    found = cache.get_many(model, revision, keys)
+
+    miss_idx = [i for i, k in enumerate(keys) if k not in found]
+    if miss_idx:
+        # the same text may appear more than once in a batch; compute it once
+        unique = {}
+        for i in miss_idx:
+            unique.setdefault(keys[i], texts[i])
+        computed = compute(list(unique.values()))
+        fresh = dict(zip(unique.keys(), computed))
+        cache.put_many(model, revision, fresh)
+        found.update(fresh)
+
+    return [found[k] for k in keys]
+
+
+def cache_stats():
+    return cache.stats()
@@ -0,0 +1,30 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Persistence is an optional sink: the hot path computes in memory and hands results here.
+PERSIST = os.getenv("PIPELINE_PERSIST", "1") == "1"
+PERSIST_ASYNC = os.getenv("PIPELINE_PERSIST_ASYNC", "1") == "1"
+
+# one writer thread keeps writes to the same file in submission order
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist")
+
+def _write_json(data, path, indent):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    # readers (response handlers, RAG) never see a half-written file
+    os.replace(tmp, path)
+
+def persist_json(data, path, indent=2, background: bool = None):
+    """Write `data` to `path`; in the background unless PIPELINE_PERSIST_ASYNC=0."""
+    background = PERSIST_ASYNC if background is None else background
+    if background:
+        return _writer.submit(_write_json, data, path, indent)
+    _write_json(data, path, indent)
+    return None
+
+def flush(timeout: float = None):
+    """Block until every queued write has finished."""
+    _writer.submit(lambda: None).result(timeout=timeout)
@@ -0,0 +1,103 @@
+import atexit
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+# Kept free of model/torch imports: spawned POS workers import only this module.
+# nltk itself is imported on first tagging call.
+
+GENERIC_BADWORDS = {
+    "news","twitter","https","http","billion","million","globalgoals",
+    "finance","radar","economist","union_build","us","u","the","new","rt"
+}
+
+NOUN_TAGS = ('NN', 'NNS', 'NNP', 'NNPS')
+NER_GROUPS = ('ORG', 'PRODUCT', 'PER', 'MISC')
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def clean_keyword(w: str) -> str:
+    w = w.strip().replace("##", "")
+    if w.startswith("@") or w.startswith("http"):
+        return ""
+    # keep simple tokens only
+    if not re.fullmatch(r"[A-Za-z][A-Za-z0-9_-]{1,19}", w):
+        return ""
+    return w
+
+def filter_keywords(raw_keywords):
+    """Clean + drop noise, keeping order."""
+    filtered_keywords = []
+    for w in raw_keywords:
+        w = clean_keyword(w)
+        if not w:
+            continue
+        if w.lower() in GENERIC_BADWORDS:
+            continue
+        filtered_keywords.append(w)
+    return filtered_keywords
+
+def ner_keywords(ner_results):
+    return filter_keywords(ent['word'] for ent in ner_results if ent.get('entity_group') in NER_GROUPS)
+
+def pos_keywords(tweet, stop_words):
+    """Noun-ish tokens that are not stopwords, cleaned."""
+    from nltk import word_tokenize, pos_tag
+    pos_tags = pos_tag(word_tokenize(tweet))
+    return filter_keywords(
+        w for w, tag in pos_tags
+        if tag in NOUN_TAGS and w.lower() not in stop_words
+    )
+
+def _pos_chunk(tweets, stop_words):
+    return [pos_keywords(t, stop_words) for t in tweets]
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Process-wide POS pool, started on first use (spawning re-imports nltk, so it is reused)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: the parent may already hold torch/OpenMP threads, which fork does not survive
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+def shutdown_pos_pool():
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool, _pool_workers = None, 0
+
+atexit.register(shutdown_pos_pool)
+
+def pos_keywords_many(tweets, stop_words, workers: int = None, chunks_per_worker: int = 4):
+    """
+    POS keywords for every tweet, in input order.
+    Contiguous chunks go to a shared spawned process pool; results are reassembled in chunk order,
+    so the output is identical to the serial loop.
+    """
+    tweets = list(tweets)
+    workers = min(workers or available_cores(), len(tweets))
+    if workers <= 1:
+        return [pos_keywords(t, stop_words) for t in tweets]
+
+    size = -(-len(tweets) // (workers * chunks_per_worker))
+    chunks = [tweets[i:i + size] for i in range(0, len(tweets), size)]
+    stop_words = frozenset(stop_words)
+    out = []
+    for part in _get_pool(workers).map(_pos_chunk, chunks, [stop_words] * len(chunks)):
+        out.extend(part)
+    return out
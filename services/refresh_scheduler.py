@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Knobs (env-overridable)
+REFRESH_ENABLED = os.getenv("REFRESH_ENABLED", "1") == "1"
+REFRESH_INTERVAL_S = float(os.getenv("REFRESH_INTERVAL_S", "300"))    # background refresh period
+REFRESH_MAX_STALE_S = float(os.getenv("REFRESH_MAX_STALE_S", "1800"))  # older than this -> refresh inline
+REFRESH_PROBE_S = float(os.getenv("REFRESH_PROBE_S", "30"))           # new-message probe period
+REFRESH_WORKERS = int(os.getenv("REFRESH_WORKERS", "2"))
+TICK_S = 1.0
+
+
+class RefreshJob:
+    """One materialized analysis result plus its refresh bookkeeping."""
+
+    def __init__(self, name, fn, interval_s, max_stale_s, probe=None):
+        self.name = name
+        self.fn = fn
+        self.interval_s = interval_s
+        self.max_stale_s = max_stale_s
+        self.probe = probe              # returns a marker that changes when new messages arrive
+        self.result = None
+        self.updated_at = None          # wall clock of the last successful refresh
+        self.last_attempt = 0.0         # monotonic
+        self.last_probe = 0.0
+        self.marker = None
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.last_duration_s = None
+        self.triggered = False
+        self.running = None             # Future of the in-flight refresh, if any
+        self.lock = threading.Lock()
+
+    def age(self):
+        return None if self.updated_at is None else time.time() - self.updated_at
+
+
+class RefreshScheduler:
+    """
+    Refreshes registered analyses in the background (on an interval, or when their probe sees new
+    messages) and serves the last materialized result immediately: stale-while-revalidate.
+    A request only waits for a refresh when there is no result yet or it is older than `max_stale_s`.
+    """
+
+    def __init__(self, workers: int = REFRESH_WORKERS):
+        self._jobs = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="refresh")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name, fn, interval_s: float = REFRESH_INTERVAL_S,
+                 max_stale_s: float = REFRESH_MAX_STALE_S, probe=None):
+        self._jobs[name] = RefreshJob(name, fn, interval_s, max_stale_s, probe)
+
+    # --- refresh ---
+    def _run(self, job):
+        t0 = time.perf_counter()
+        try:
+            result = job.fn()
+        except Exception as e:
+            with job.lock:
+                job.failures += 1
+                job.consecutive_failures += 1
+                job.last_error = f"{type(e).__name__}: {e}"
+            print(f"Refresh of '{job.name}' failed: {job.last_error}")
+            raise
+        else:
+            with job.lock:
+                job.result = result
+                job.updated_at = time.time()
+                job.consecutive_failures = 0
+                job.last_error = None
+            return result
+        finally:
+            with job.lock:
+                job.runs += 1
+                job.last_duration_s = round(time.perf_counter() - t0, 3)
+                job.running = None
+
+    def _submit(self, job):
+        """Start a refresh unless one is already in flight (single-flight); returns its Future."""
+        with job.lock:
+            if job.running is None:
+                job.last_attempt = time.monotonic()
+                job.triggered = False
+                job.running = self._pool.submit(self._run, job)
+            return job.running
+
+    def job(self, name) -> RefreshJob:
+        return self._jobs[name]
+
+    def trigger(self, name):
+        """Request a background refresh of `name` as soon as possible."""
+        job = self._jobs[name]
+        job.triggered = True
+        return self._submit(job)
+
+    # --- serving ---
+    def get(self, name):
+        """
+        Return (result, age_s). Serves the cached result unless it is missing or past max staleness,
+        in which case the caller waits for a refresh (falling back to the stale result on failure).
+        """
+        job = self._jobs[name]
+        age = job.age()
+        if age is None or age > job.max_stale_s:
+            fut = self._submit(job)
+            try:
+                fut.result()
+            except Exception:
+                if job.result is None:
+                    raise
+        elif age > job.interval_s:
+            self._submit(job)
+        return job.result, job.age()
+
+    # --- background loop ---
+    def _due(self, job, now):
+        if job.triggered or now - job.last_attempt >= job.interval_s:
+            return True
+        if job.probe is not None and now - job.last_probe >= REFRESH_PROBE_S:
+            job.last_probe = now
+            try:
+                marker = job.probe()
+            except Exception as e:
+                print(f"Probe for '{job.name}' failed: {type(e).__name__}: {e}")
+                return False
+            # the first observation only records the marker
+            changed = None not in (marker, job.marker) and marker != job.marker
+            job.marker = marker
+            return changed and job.updated_at is not None
+        return False
+
+    def _loop(self):
+        while not self._stop.wait(TICK_S):
+            now = time.monotonic()
+            for job in list(self._jobs.values()):
+                if job.running is None and self._due(job, now):
+                    self._submit(job)
+
+    def start(self):
+        if self._thread is None:
+            now = time.monotonic()
+            for job in self._jobs.values():
+                job.last_probe = now
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="refresh-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def status(self):
+        out = {"running": self._thread is not None, "jobs": {}}
+        for name, job in self._jobs.items():
+            with job.lock:
+                age = job.age()
+                out["jobs"][name] = {
+                    "has_result": job.result is not None,
+                    "last_success_at": job.updated_at,
+                    "age_s": round(age, 1) if age is not None else None,
+                    "refreshing": job.running is not None,
+                    "runs": job.runs,
+                    "failures": job.failures,
+                    "consecutive_failures": job.consecutive_failures,
+                    "last_error": job.last_error,
+                    "last_duration_s": job.last_duration_s,
+                    "interval_s": job.interval_s,
+                    "max_stale_s": job.max_stale_s,
+                }
+        return out
+
+
+scheduler = RefreshScheduler()
+
+
+def serve(name):
+    """Cached result for an endpoint, annotated with its age."""
+    try:
+        result, age = scheduler.get(name)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}", "result_age_s": None}
+    return {**result, "result_age_s": round(age, 1), "updated_at": scheduler.job(name).updated_at}
@@ -0,0 +1,238 @@
+import heapq
+import os
+import threading
+import time
+from array import array
+from datetime import datetime
+
+from services.coin_matcher import canonical_coin
+
+# Rolling per-coin aggregates ("net flow for $X over the last hour") kept in fixed-size time-bucket
+# rings: each window is split into ROLLING_BUCKETS buckets, so memory per coin depends only on the
+# number of windows and metrics, never on how many messages were seen. Adding an event is O(1)
+# (amortized: expired buckets are subtracted from the running totals as the head moves forward).
+# A window covers its last ROLLING_BUCKETS - 1 full buckets plus the current partial one.
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_window(spec: str) -> int:
+    """"5m" -> 300, "1h" -> 3600, "24h" -> 86400, "90" -> 90 (seconds)."""
+    spec = spec.strip().lower()
+    if spec[-1:] in _UNITS:
+        return int(float(spec[:-1]) * _UNITS[spec[-1]])
+    return int(float(spec))
+
+
+WINDOWS = {w.strip(): parse_window(w) for w in os.getenv("ROLLING_WINDOWS", "5m,1h,24h").split(",") if w.strip()}
+BUCKETS = int(os.getenv("ROLLING_BUCKETS", "60"))
+METRICS = ("flow", "sentiment")
+
+
+def to_unix(ts):
+    """Discord ISO timestamp (or unix seconds) -> unix seconds; None if missing/unparseable."""
+    if ts is None:
+        return None
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    try:
+        return datetime.fromisoformat(str(ts).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class WindowRing:
+    """Rolling sum/count over the last `span_s` seconds in `n_buckets` time buckets."""
+
+    __slots__ = ("width", "n", "sums", "counts", "head", "total", "count")
+
+    def __init__(self, span_s: float, n_buckets: int = BUCKETS):
+        self.width = span_s / n_buckets
+        self.n = n_buckets
+        self.sums = array("d", bytes(8 * n_buckets))
+        self.counts = array("q", bytes(8 * n_buckets))
+        self.head = None   # absolute bucket number (ts // width) of the newest bucket
+        self.total = 0.0
+        self.count = 0
+
+    def _advance(self, bucket: int):
+        if self.head is None or bucket <= self.head:
+            if self.head is None:
+                self.head = bucket
+            return
+        if bucket - self.head >= self.n:
+            # everything expired
+            for i in range(self.n):
+                self.sums[i] = 0.0
+                self.counts[i] = 0
+            self.total, self.count = 0.0, 0
+        else:
+            for b in range(self.head + 1, bucket + 1):
+                i = b % self.n
+                self.total -= self.sums[i]
+                self.count -= self.counts[i]
+                self.sums[i] = 0.0
+                self.counts[i] = 0
+        self.head = bucket
+
+    def add(self, ts: float, value: float) -> bool:
+        bucket = int(ts // self.width)
+        self._advance(bucket)
+        if bucket <= self.head - self.n:
+            return False  # older than the window
+        i = bucket % self.n
+        self.sums[i] += value
+        self.counts[i] += 1
+        self.total += value
+        self.count += 1
+        return True
+
+    def totals(self, now: float):
+        self._advance(int(now // self.width))
+        if not self.count:
+            self.total = 0.0  # drop float residue once the window is empty
+        return self.total, self.count
+
+
+class RollingAggregates:
+    """coin -> metric -> window -> WindowRing, plus the message events already counted."""
+
+    def __init__(self, windows: dict = None, n_buckets: int = BUCKETS):
+        self.windows = dict(windows or WINDOWS)
+        self.n_buckets = n_buckets
+        self.horizon_s = max(self.windows.values())
+        self._coins = {}
+        # (channel, metric, message id, index, coin) -> ts, for events inside the longest window only
+        self._seen = {}
+        self._seen_order = []       # min-heap of (ts, key): batches arrive newest-first and overlap
+        self._latest = None
+        self._lock = threading.Lock()
+        self.events = 0
+        self.skipped = 0
+
+    def _rings(self, coin: str, metric: str) -> dict:
+        per_coin = self._coins.setdefault(coin, {})
+        rings = per_coin.get(metric)
+        if rings is None:
+            rings = per_coin[metric] = {w: WindowRing(s, self.n_buckets) for w, s in self.windows.items()}
+        return rings
+
+    def add(self, coin: str, metric: str, ts: float, value: float):
+        with self._lock:
+            for ring in self._rings(canonical_coin(coin), metric).values():
+                ring.add(ts, value)
+            self.events += 1
+
+    def ingest(self, channel: str, events) -> int:
+        """
+        Add (message id, ts, coin, metric, value, index) events; `index` numbers a message's
+        events of one metric in the order the analysis emitted them, so several flows of the same
+        coin in one message are all counted. Analyses re-read overlapping message batches (and
+        several analyses read the same channel), so an event whose
+        (channel, metric, message id, index, coin) was already counted is skipped.
+        """
+        added = 0
+        with self._lock:
+            for msg_id, ts, coin, metric, value, index in events:
+                ts = to_unix(ts)
+                if ts is None or (self._latest is not None and ts < self._latest - self.horizon_s):
+                    self.skipped += 1
+                    continue
+                coin = canonical_coin(coin)
+                if msg_id is not None:
+                    key = (channel, metric, str(msg_id), index, coin)
+                    if key in self._seen:
+                        self.skipped += 1
+                        continue
+                    self._seen[key] = ts
+                    heapq.heappush(self._seen_order, (ts, key))
+                for ring in self._rings(coin, metric).values():
+                    ring.add(ts, float(value))
+                if self._latest is None or ts > self._latest:
+                    self._latest = ts
+                added += 1
+            self._prune_seen()
+            self.events += added
+        return added
+
+    def _prune_seen(self):
+        # caller holds self._lock; entries older than the longest window can never be re-added
+        if self._latest is None:
+            return
+        cutoff = self._latest - self.horizon_s
+        while self._seen_order and self._seen_order[0][0] < cutoff:
+            _, key = heapq.heappop(self._seen_order)
+            self._seen.pop(key, None)
+
+    def query(self, coin: str, metric: str = "flow", window: str = None, now: float = None) -> dict:
+        """{window: {sum, count, mean}} for one coin (all windows unless `window` is given)."""
+        now = time.time() if now is None else now
+        names = [window] if window else list(self.windows)
+        unknown = [w for w in names if w not in self.windows]
+        if unknown:
+            raise KeyError(f"Unknown window '{unknown[0]}'. Known: {list(self.windows)}")
+        out = {}
+        with self._lock:
+            rings = self._coins.get(canonical_coin(coin), {}).get(metric)
+            for w in names:
+                total, count = rings[w].totals(now) if rings else (0.0, 0)
+                out[w] = {"sum": total, "count": count, "mean": total / count if count else None}
+        return out
+
+    def top(self, metric: str = "flow", window: str = "1h", k: int = 10, now: float = None) -> list:
+        """Coins ranked by windowed sum; coins with nothing left in any window are dropped."""
+        if window not in self.windows:
+            raise KeyError(f"Unknown window '{window}'. Known: {list(self.windows)}")
+        now = time.time() if now is None else now
+        rows = []
+        with self._lock:
+            for coin in list(self._coins):
+                per_coin = self._coins[coin]
+                alive = False
+                for m, rings in per_coin.items():
+                    for w, ring in rings.items():
+                        total, count = ring.totals(now)
+                        alive |= count > 0
+                        if m == metric and w == window and count:
+                            rows.append({"coin": coin, "sum": total, "count": count, "mean": total / count})
+                if not alive:
+                    del self._coins[coin]
+        rows.sort(key=lambda r: r["sum"], reverse=True)
+        return rows[:max(1, k)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "coins": len(self._coins),
+                "windows": self.windows,
+                "buckets": self.n_buckets,
+                "events": self.events,
+                "skipped": self.skipped,
+                "tracked_events": len(self._seen),
+            }
+
+
+def flow_events(flows, records) -> list:
+    """
+    (message id, ts, coin, "flow", value, index) per parsed flow; `records` align with the parsed
+    texts and `index` is the flow's position among its message's flows.
+    """
+    events, per_message = [], {}
+    for c, v, i in zip(flows.coin_ids.tolist(), flows.values.tolist(), flows.message_index.tolist()):
+        n = per_message[i] = per_message.get(i, -1) + 1
+        events.append((records[i].get("id"), records[i].get("timestamp"), flows.coin_names[c], "flow", v, n))
+    return events
+
+
+rolling = RollingAggregates()
+
+
+def ingest_window_events(result):
+    """
+    Analyses run in worker processes; they return their events under "window_events" as
+    (channel, events) and the API process feeds them into its aggregates here.
+    """
+    if isinstance(result, dict) and result.get("window_events"):
+        channel, events = result.pop("window_events")
+        rolling.ingest(channel, events)
+    return result
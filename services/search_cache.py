@@ -0,0 +1,166 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Knobs (env-overridable)
+SEARCH_CACHE_TTL_S = float(os.getenv("SEARCH_CACHE_TTL_S", "120"))
+SEARCH_CACHE_MAX_QUERIES = int(os.getenv("SEARCH_CACHE_MAX_QUERIES", "512"))
+
+
+def normalize_query(query: str) -> str:
+    """'  BTC ' and 'btc' share an entry; '$BTC' (cashtag search) stays distinct."""
+    return " ".join(query.split()).lower()
+
+
+class _Entry:
+    __slots__ = ("texts", "requested", "fetched_at", "summaries")
+
+    def __init__(self, texts, requested):
+        self.texts = texts
+        self.requested = requested
+        self.fetched_at = time.time()
+        self.summaries = {}          # number of texts summarized -> result
+
+    def serves(self, max_results, ttl_s):
+        if time.time() - self.fetched_at > ttl_s:
+            return False
+        # a fetch that came back short has everything there is, so it serves any size
+        return self.requested >= max_results or len(self.texts) < self.requested
+
+
+class SearchCache:
+    """
+    Scraped texts per (source, normalized query), kept for `ttl_s`. A fetch for N results serves any
+    request for <= N (prefix of the same ordered list). Concurrent identical misses coalesce into one
+    in-flight fetch (singleflight), so outbound scraping is bounded to one fetch per query per TTL.
+    """
+
+    def __init__(self, ttl_s: float = SEARCH_CACHE_TTL_S, max_queries: int = SEARCH_CACHE_MAX_QUERIES):
+        self.ttl_s = ttl_s
+        self.max_queries = max_queries
+        self._entries = OrderedDict()
+        self._inflight = {}          # key -> (requested, Future) for sync callers
+        self._inflight_async = {}    # key -> (requested, asyncio.Task) for event-loop callers
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.coalesced = 0
+        self.fetches = 0
+
+    def _lookup(self, key, max_results):
+        entry = self._entries.get(key)
+        if entry is not None and entry.serves(max_results, self.ttl_s):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        return None
+
+    def _store(self, key, texts, requested):
+        entry = _Entry(list(texts), requested)
+        with self._lock:
+            current = self._entries.get(key)
+            # never replace a fresh, larger fetch with a smaller one
+            if current is None or not current.serves(requested, self.ttl_s) or current.requested < requested:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+            else:
+                entry = current
+            while len(self._entries) > self.max_queries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_texts(self, source: str, query: str, max_results: int, fetch) -> _Entry:
+        """Blocking callers: `fetch(max_results) -> texts`."""
+        key = (source, normalize_query(query))
+        with self._lock:
+            entry = self._lookup(key, max_results)
+            if entry is not None:
+                return entry
+            flight = self._inflight.get(key)
+            if flight is not None and flight[0] >= max_results:
+                self.coalesced += 1
+                fut, owner = flight[1], False
+            else:
+                fut, owner = Future(), True
+                self._inflight[key] = (max_results, fut)
+                self.fetches += 1
+        if not owner:
+            return fut.result()
+        try:
+            entry = self._store(key, fetch(max_results), max_results)
+            fut.set_result(entry)
+            return entry
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key, (None, None))[1] is fut:
+                    del self._inflight[key]
+
+    async def get_texts_async(self, source: str, query: str, max_results: int, fetch) -> _Entry:
+        """Event-loop callers: `await fetch(max_results) -> texts`."""
+        key = (source, normalize_query(query))
+        with self._lock:
+            entry = self._lookup(key, max_results)
+            if entry is not None:
+                return entry
+            flight = self._inflight_async.get(key)
+            if flight is not None and flight[0] >= max_results:
+                self.coalesced += 1
+                task = flight[1]
+            else:
+                # the fetch runs as its own task, so the request that started it can disconnect
+                # (be cancelled) without failing the others waiting on it
+                task = asyncio.get_running_loop().create_task(self._fetch_async(key, max_results, fetch))
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())  # retrieved if nobody waits
+                self._inflight_async[key] = (max_results, task)
+                self.fetches += 1
+        # shield: a waiter being cancelled must not cancel the shared fetch
+        return await asyncio.shield(task)
+
+    async def _fetch_async(self, key, max_results: int, fetch) -> _Entry:
+        try:
+            return self._store(key, await fetch(max_results), max_results)
+        finally:
+            with self._lock:
+                if self._inflight_async.get(key, (None, None))[1] is asyncio.current_task():
+                    del self._inflight_async[key]
+
+    def summarize(self, entry: _Entry, query: str, max_results: int, summarize) -> dict:
+        """`summarize(query, texts)` over the first `max_results` texts, memoized on the entry."""
+        texts = entry.texts[:max_results]
+        result = entry.summaries.get(len(texts))
+        if result is None:
+            result = summarize(query, texts)
+            entry.summaries[len(texts)] = result
+        return {**result, "query": query, "cache_age_s": round(time.time() - entry.fetched_at, 1)}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "fetches": self.fetches,
+                "ttl_s": self.ttl_s,
+            }
+
+
+search_cache = SearchCache()
+
+
+async def cached_search_async(source: str, query: str, max_results: int, fetch, summarize) -> dict:
+    entry = await search_cache.get_texts_async(source, query, max_results, fetch)
+    return search_cache.summarize(entry, query, max_results, summarize)
+
+
+def cached_search(source: str, query: str, max_results: int, fetch, summarize) -> dict:
+    entry = search_cache.get_texts(source, query, max_results, fetch)
+    return search_cache.summarize(entry, query, max_results, summarize)
+
+
+def search_cache_stats():
+    return search_cache.stats()
@@ -1,40 +1,52 @@
 import os
-from preprocessing.preprocess import preprocess_data
+from preprocessing.dedup import drop_duplicates
+from preprocessing.preprocess import preprocess_data, to_record
 from services.analysis_cleaning import  preprocess_flow
 
+# "jsonl" writes normalized records (id, timestamp, author, channel_id, text) one per line
+PREPROCESS_JSONL = os.getenv("PREPROCESS_FORMAT", "json").lower() == "jsonl"
 
-def run_preprocessing_news(input_path: str) -> str:
+
+def _output_path(name: str) -> str:
     base_dir = os.path.dirname(__file__)
-    output_path = os.path.join(base_dir, "..", "test data", "preprocessed_data_news.json")
-    output_path = os.path.abspath(output_path)
-    preprocess_data(input_path, output_path)
+    ext = ".jsonl" if PREPROCESS_JSONL else ".json"
+    output_path = os.path.join(base_dir, "..", "test data", name + ext)
+    return os.path.abspath(output_path)
+
+def preprocess_messages(messages, channel: str = None, dedup_counts: dict = None) -> list:
+    """
+    In-memory preprocessing: raw Discord messages -> normalized records, no disk I/O.
+    Exact and near-duplicate messages are dropped (preprocessing/dedup.py); `channel` scopes the
+    seen-set and `dedup_counts`, when given, receives the tallies of this batch's first-seen messages.
+    """
+    records = [to_record(m) for m in (messages or []) if isinstance(m, dict)]
+    kept = list(drop_duplicates(records, channel, dedup_counts))
+    if len(kept) < len(records):
+        print(f"Dropped {len(records) - len(kept)} duplicate messages from {channel or 'batch'} ({len(kept)} kept)")
+    return kept
+
+def run_preprocessing_news(input_path: str) -> str:
+    output_path = _output_path("preprocessed_data_news")
+    preprocess_data(input_path, output_path, jsonl=PREPROCESS_JSONL)
     return output_path
 
 def run_preprocessing_general(input_path: str) -> str:
-    base_dir = os.path.dirname(__file__)
-    output_path = os.path.join(base_dir, "..", "test data", "preprocessed_data_general.json")
-    output_path = os.path.abspath(output_path)
-    preprocess_data(input_path, output_path)
+    output_path = _output_path("preprocessed_data_general")
+    preprocess_data(input_path, output_path, jsonl=PREPROCESS_JSONL)
     return output_path
 
 def run_preprocessing_focus(input_path: str) -> str:
-    base_dir = os.path.dirname(__file__)
-    output_path = os.path.join(base_dir, "..", "test data", "preprocessed_data_focus.json")
-    output_path = os.path.abspath(output_path)
-    preprocess_data(input_path, output_path)
+    output_path = _output_path("preprocessed_data_focus")
+    preprocess_data(input_path, output_path, jsonl=PREPROCESS_JSONL)
     return output_path
 
 def run_coinfinder_focus(input_path: str) -> str:
-    base_dir = os.path.dirname(__file__)
-    output_path = os.path.join(base_dir, "..", "test data", "preprocessed_data_run_coinfinder_focus.json")
-    output_path = os.path.abspath(output_path)
-    preprocess_data(input_path, output_path)
+    output_path = _output_path("preprocessed_data_run_coinfinder_focus")
+    preprocess_data(input_path, output_path, jsonl=PREPROCESS_JSONL)
     return output_path
 
 def run_coinflow_focus(input_path: str) -> str:
-    base_dir = os.path.dirname(__file__)
-    output_path = os.path.join(base_dir, "..", "test data", "preprocessed_data_run_coinflow_focus.json")
-    output_path = os.path.abspath(output_path)
-    preprocess_flow(input_path, output_path)
+    output_path = _output_path("preprocessed_data_run_coinflow_focus")
+    preprocess_flow(input_path, output_path, jsonl=PREPROCESS_JSONL)
     return output_path
 
@@ -0,0 +1,82 @@
+import os
+import threading
+import time
+
+# Nothing heavy is imported or downloaded at module import: NLTK data, VADER and models are
+# fetched on first use, or up front through warm_up().
+
+# nltk.download name -> nltk.data path used to check it is already installed
+NLTK_RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "averaged_perceptron_tagger": "taggers/averaged_perceptron_tagger",
+    "stopwords": "corpora/stopwords",
+    "vader_lexicon": "sentiment/vader_lexicon.zip",
+}
+
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+# comma-separated registry names to preload, e.g. "finbert,ner"
+WARMUP_MODELS = [m.strip() for m in os.getenv("WARMUP_MODELS", "").split(",") if m.strip()]
+
+_lock = threading.Lock()
+_nltk_ready = set()
+_vader = None
+_stop_words = None
+
+
+def ensure_nltk(*names):
+    """Download NLTK resources only if they are missing; each one is checked once per process."""
+    missing = [n for n in names if n not in _nltk_ready]
+    if not missing:
+        return
+    import nltk
+    with _lock:
+        for name in missing:
+            if name in _nltk_ready:
+                continue
+            try:
+                nltk.data.find(NLTK_RESOURCES[name])
+            except LookupError:
+                nltk.download(name, quiet=True)
+            _nltk_ready.add(name)
+
+
+def get_vader():
+    """Shared VADER analyzer (read-only after construction)."""
+    global _vader
+    if _vader is None:
+        ensure_nltk("vader_lexicon")
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        with _lock:
+            if _vader is None:
+                _vader = SentimentIntensityAnalyzer()
+    return _vader
+
+
+def get_stop_words():
+    global _stop_words
+    if _stop_words is None:
+        ensure_nltk("stopwords")
+        from nltk.corpus import stopwords
+        _stop_words = frozenset(stopwords.words('english'))
+    return _stop_words
+
+
+def warm_up(models=None, nltk_data: bool = True) -> dict:
+    """
+    Explicit warm-up hook: fetch NLTK data, build VADER and preload registry models.
+    Returns seconds spent per step.
+    """
+    timings = {}
+    if nltk_data:
+        t0 = time.perf_counter()
+        ensure_nltk(*NLTK_RESOURCES)
+        get_vader()
+        get_stop_words()
+        timings["nltk"] = round(time.perf_counter() - t0, 3)
+
+    from model_loader.model_registry import registry
+    for name in (WARMUP_MODELS if models is None else models):
+        t0 = time.perf_counter()
+        registry.get(name)
+        timings[f"model:{name}"] = round(time.perf_counter() - t0, 3)
+    return timings
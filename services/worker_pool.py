@@ -0,0 +1,323 @@
+import asyncio
+import importlib
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, wait
+
+from services.pos_keywords import available_cores
+
+# Knobs (env-overridable)
+POOL_ENABLED = os.getenv("INFERENCE_POOL", "1") == "1"
+POOL_WORKERS = int(os.getenv("INFERENCE_POOL_WORKERS", "0")) or max(1, min(4, available_cores() // 2))
+POOL_QUEUE = int(os.getenv("INFERENCE_POOL_QUEUE", "4"))          # queued + running jobs per worker
+POOL_TORCH_THREADS = int(os.getenv("INFERENCE_POOL_TORCH_THREADS", "0")) or max(1, available_cores() // POOL_WORKERS)
+POOL_TIMEOUT_S = float(os.getenv("INFERENCE_POOL_TIMEOUT_S", "600"))
+POOL_STATS_WAIT_S = float(os.getenv("INFERENCE_POOL_STATS_WAIT_S", "2"))   # stats endpoints skip busier workers
+MAX_ATTEMPTS = 2       # a job is re-sent once if its worker dies before starting it
+MONITOR_S = 0.5
+
+
+class PoolFull(RuntimeError):
+    """Every worker queue is at capacity."""
+
+
+class WorkerCrashed(RuntimeError):
+    """The worker process died while running the job."""
+
+
+class JobFailed(RuntimeError):
+    """The job raised inside the worker; the message carries the original exception."""
+
+
+def _resolve(target: str):
+    module, _, func = target.partition(":")
+    return getattr(importlib.import_module(module), func)
+
+
+def _worker_main(idx, inbox, outbox, torch_threads):
+    # set before torch/tokenizers are imported (they are imported lazily on first job)
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(torch_threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    while True:
+        msg = inbox.get()
+        if msg is None:
+            return
+        job_id, target, args, kwargs = msg
+        outbox.put(("start", idx, job_id, None))
+        try:
+            outbox.put(("done", idx, job_id, _resolve(target)(*args, **kwargs)))
+        except BaseException as e:
+            outbox.put(("error", idx, job_id, f"{type(e).__name__}: {e}"))
+
+
+class _Job:
+    __slots__ = ("job_id", "target", "args", "kwargs", "future", "timeout", "attempts", "started_at", "control")
+
+    def __init__(self, job_id, target, args, kwargs, timeout, control: bool = False):
+        self.job_id = job_id
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.timeout = timeout
+        self.attempts = 0
+        self.started_at = None
+        self.control = control         # broadcast/initializer job: outside the queue limit
+
+
+class _Worker:
+    def __init__(self, idx):
+        self.idx = idx
+        self.proc = None
+        self.inbox = None
+        self.pending = OrderedDict()   # job_id -> _Job, in send order
+        self.current = None            # job_id running now
+        self.restarts = 0
+        self.completed = 0
+
+    def load(self) -> int:
+        """Queued + running analysis jobs; the count `max_queue` limits."""
+        return sum(1 for job in self.pending.values() if not job.control)
+
+
+class InferencePool:
+    """
+    Fixed pool of worker processes for model inference and CPU-bound analysis.
+    Each worker owns its models (its own registry), runs with its own torch thread count and
+    accepts at most `max_queue` jobs. Jobs past their timeout kill the worker; dead workers are
+    restarted and their not-yet-started jobs re-sent.
+    """
+
+    def __init__(self, workers: int = POOL_WORKERS, max_queue: int = POOL_QUEUE,
+                 torch_threads: int = POOL_TORCH_THREADS, timeout_s: float = POOL_TIMEOUT_S):
+        self.max_queue = max_queue
+        self.torch_threads = torch_threads
+        self.timeout_s = timeout_s
+        self._ctx = multiprocessing.get_context("spawn")
+        self._outbox = self._ctx.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._workers = [_Worker(i) for i in range(workers)]
+        self._closed = False
+        self.timeouts = 0
+        self.crashes = 0
+        self.rejected = 0
+        self._initializers = []        # (target, args, kwargs) run on every worker, again after restarts
+        for w in self._workers:
+            self._spawn(w)
+        threading.Thread(target=self._collect, name="pool-collector", daemon=True).start()
+        threading.Thread(target=self._monitor, name="pool-monitor", daemon=True).start()
+
+    def _spawn(self, w):
+        w.inbox = self._ctx.Queue()
+        # not daemonic: analysis jobs may start their own process pools
+        w.proc = self._ctx.Process(target=_worker_main, name=f"inference-worker-{w.idx}",
+                                   args=(w.idx, w.inbox, self._outbox, self.torch_threads))
+        w.proc.start()
+        w.current = None
+
+    def _send(self, w, job):
+        job.attempts += 1
+        w.pending[job.job_id] = job
+        w.inbox.put((job.job_id, job.target, job.args, job.kwargs))
+
+    def submit(self, target: str, *args, timeout: float = None, **kwargs) -> Future:
+        """Queue `module:function` on the least-loaded worker; raises PoolFull when every queue is full."""
+        job = _Job(next(self._ids), target, args, kwargs, timeout or self.timeout_s)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Inference pool is shut down")
+            w = min(self._workers, key=lambda w: (w.load(), len(w.pending)))
+            if w.load() >= self.max_queue:
+                self.rejected += 1
+                raise PoolFull(f"All {len(self._workers)} workers have {self.max_queue} queued jobs")
+            self._send(w, job)
+        return job.future
+
+    def broadcast(self, target: str, *args, timeout: float = None, **kwargs) -> list:
+        """
+        Queue `module:function` once on every worker; Futures in worker order. These jobs do not
+        count towards `max_queue`, and a worker that still has the same call pending (e.g. a stats
+        poll behind a long analysis) shares it instead of queueing another.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Inference pool is shut down")
+            futures = []
+            for w in self._workers:
+                job = next((j for j in w.pending.values()
+                            if j.control and j.target == target and j.args == args and j.kwargs == kwargs), None)
+                if job is None:
+                    job = _Job(next(self._ids), target, args, kwargs, timeout or self.timeout_s, control=True)
+                    self._send(w, job)
+                futures.append(job.future)
+        return futures
+
+    def add_initializer(self, target: str, *args, **kwargs) -> list:
+        """Run `module:function` on every worker now and on each restarted worker before its jobs."""
+        with self._lock:
+            self._initializers.append((target, args, kwargs))
+        return self.broadcast(target, *args, **kwargs)
+
+    def _collect(self):
+        while True:
+            try:
+                kind, idx, job_id, payload = self._outbox.get()
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                w = self._workers[idx]
+                job = w.pending.get(job_id)
+                if job is None:
+                    continue    # already failed by the monitor
+                if kind == "start":
+                    w.current = job_id
+                    job.started_at = time.monotonic()
+                    continue
+                del w.pending[job_id]
+                w.current = None
+                w.completed += 1
+            if kind == "done":
+                job.future.set_result(payload)
+            else:
+                job.future.set_exception(JobFailed(payload))
+
+    def _restart(self, w, current_exc):
+        """Replace a dead or killed worker; fail its running job and re-send the rest."""
+        w.restarts += 1
+        failed, resend = [], []
+        for job in w.pending.values():
+            if job.job_id == w.current or job.attempts >= MAX_ATTEMPTS:
+                failed.append(job)
+            else:
+                resend.append(job)
+        w.pending.clear()
+        self._spawn(w)
+        for target, args, kwargs in self._initializers:
+            self._send(w, _Job(next(self._ids), target, args, kwargs, self.timeout_s, control=True))
+        for job in resend:
+            self._send(w, job)
+        return failed, current_exc
+
+    def _monitor(self):
+        while not self._closed:
+            time.sleep(MONITOR_S)
+            to_fail = []
+            with self._lock:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                for w in self._workers:
+                    job = w.pending.get(w.current) if w.current is not None else None
+                    if job is not None and now - job.started_at > job.timeout:
+                        self.timeouts += 1
+                        w.proc.kill()
+                        w.proc.join()
+                        to_fail.append(self._restart(w, TimeoutError(
+                            f"Job {job.target} exceeded {job.timeout:g}s on worker {w.idx}")))
+                    elif not w.proc.is_alive():
+                        self.crashes += 1
+                        to_fail.append(self._restart(w, WorkerCrashed(
+                            f"Worker {w.idx} exited with code {w.proc.exitcode}")))
+            for failed, exc in to_fail:
+                for job in failed:
+                    job.future.set_exception(exc)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "max_queue": self.max_queue,
+                "torch_threads": self.torch_threads,
+                "timeout_s": self.timeout_s,
+                "queued": sum(len(w.pending) for w in self._workers),
+                "busy": sum(1 for w in self._workers if w.current is not None),
+                "completed": sum(w.completed for w in self._workers),
+                "restarts": sum(w.restarts for w in self._workers),
+                "timeouts": self.timeouts,
+                "crashes": self.crashes,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            for w in self._workers:
+                w.inbox.put(None)
+        for w in self._workers:
+            w.proc.join(timeout=5)
+            if w.proc.is_alive():
+                w.proc.kill()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> InferencePool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = InferencePool()
+        return _pool
+
+
+def run_job(target: str, *args, timeout: float = None, **kwargs):
+    """Blocking: run `module:function` in the worker pool (or inline when INFERENCE_POOL=0)."""
+    if not POOL_ENABLED:
+        return _resolve(target)(*args, **kwargs)
+    future = get_pool().submit(target, *args, timeout=timeout, **kwargs)
+    return future.result()
+
+
+async def run_job_async(target: str, *args, timeout: float = None, **kwargs):
+    """Await a pool job without tying up an event-loop or threadpool thread."""
+    if not POOL_ENABLED:
+        return await asyncio.to_thread(_resolve(target), *args, **kwargs)
+    return await asyncio.wrap_future(get_pool().submit(target, *args, timeout=timeout, **kwargs))
+
+
+def run_on_workers(target: str, *args, wait_s: float = None, **kwargs) -> list:
+    """
+    Blocking: run `module:function` once in every worker (inline when INFERENCE_POOL=0), for
+    per-process state such as loaded models and caches. Returns one entry per worker, in order:
+    {"worker", "pid", "result"} or {"worker", "pid", "error"}; workers still busy after `wait_s`
+    report {"busy": True} (their job still runs).
+    """
+    if not POOL_ENABLED:
+        return [{"worker": None, "pid": os.getpid(), "result": _resolve(target)(*args, **kwargs)}]
+    pool = get_pool()
+    futures = pool.broadcast(target, *args, **kwargs)
+    wait(futures, timeout=wait_s)
+    out = []
+    for w, future in zip(pool._workers, futures):
+        entry = {"worker": w.idx, "pid": w.proc.pid}
+        if not future.done():
+            entry["busy"] = True
+        elif future.exception() is not None:
+            entry["error"] = str(future.exception())
+        else:
+            entry["result"] = future.result()
+        out.append(entry)
+    return out
+
+
+def pool_stats():
+    if not POOL_ENABLED:
+        return {"enabled": False}
+    if _pool is None:
+        return {"enabled": True, "started": False}
+    return {"enabled": True, "started": True, **_pool.stats()}
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
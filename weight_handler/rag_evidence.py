@@ -0,0 +1,562 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+import numpy as np
+
+from services.coin_matcher import ALIAS_TO_COIN, CoinMatcher, canonical_coin
+from services.inference_cache import content_key
+
+BASE_DIR = os.path.dirname(__file__)
+DATA_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "test data"))
+
+# Evidence store for /rag/explain: preprocessed messages that mention a coin, embedded once.
+#   vectors.i8    count x dim int8, L2-normalized embeddings quantized per row (memory-mapped)
+#   scale.f32     per message: int8 -> float scale of its vector row
+#   stance.f32    per message: cos(v, bullish anchor) - cos(v, bearish anchor)
+#   cluster.i32   per message: IVF list (nearest centroid), -1 until the lists are trained
+#   centroids.f32 IVF list centroids, trained by k-means once the store is large enough
+#   pairs.i32     (tag id, row) per coin tag of each message -> per-coin posting lists
+#   offsets.i64   byte offset of each row in rows.jsonl
+#   rows.jsonl    {key, source, tags, text}
+#   keys.txt      message keys already indexed (incremental indexing)
+#   meta.json     committed counts; written last, so rows past them are ignored and truncated
+# A query embeds the coin and its score drivers (one small pool job, cached by query text) and
+# scores the coin's posting list with vectors[rows] @ q; the stance sign splits the hits into
+# supporting and contradicting. Posting lists longer than IVF_CANDIDATES only score the rows in
+# the IVF lists nearest the query, so cost stays bounded for the largest coins.
+EVIDENCE_DIR = os.getenv("RAG_EVIDENCE_DIR", os.path.join(DATA_DIR, "rag_evidence"))
+EMBED_MODEL = "minilm"
+EMBED_CHUNK = int(os.getenv("RAG_EVIDENCE_CHUNK", "512"))   # messages embedded + committed per step
+MAX_TEXT_CHARS = 1000
+STORE_FORMAT = 2   # bump when the file layout changes; an older store is rebuilt
+LOCK_STALE_S = 3600
+IVF_MIN_MESSAGES = int(os.getenv("RAG_EVIDENCE_IVF_MIN", "50000"))          # train IVF lists from this size
+IVF_CANDIDATES = int(os.getenv("RAG_EVIDENCE_IVF_CANDIDATES", "8192"))     # rows scored per query at most
+IVF_TRAIN_SAMPLE = 65536
+IVF_TRAIN_ITERS = 8
+QUERY_TIMEOUT_S = float(os.getenv("RAG_EVIDENCE_QUERY_TIMEOUT_S", "30"))
+QUERY_CACHE_SIZE = 256
+
+# preprocessed outputs (services/tweet_converter.py), .json or .jsonl
+EVIDENCE_SOURCES = {
+    "news": "preprocessed_data_news",
+    "general": "preprocessed_data_general",
+    "focus": "preprocessed_data_focus",
+    "coin_finder": "preprocessed_data_run_coinfinder_focus",
+}
+
+# stance direction: mean bullish minus mean bearish anchor embedding
+ANCHORS = {
+    "bullish": [
+        "price is going up, bullish breakout",
+        "strong buy, this coin will pump",
+        "great news, adoption is growing and the rally continues",
+    ],
+    "bearish": [
+        "price is crashing, bearish breakdown",
+        "sell now, this coin will dump",
+        "bad news, hack, scam and investors are pulling out",
+    ],
+}
+
+PAIR_DTYPE = np.dtype([("tag", "<i4"), ("row", "<i4")])
+
+# tags are canonical coin names
+resolve_tag = canonical_coin
+
+
+def _path(directory: str, name: str) -> str:
+    return os.path.join(directory, name)
+
+
+def _read_meta(directory: str):
+    try:
+        with open(_path(directory, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _source_path(base: str):
+    for ext in (".jsonl", ".json"):
+        path = os.path.join(DATA_DIR, base + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+# =======================
+# Writer (runs in the inference worker pool)
+# =======================
+
+class _Writer:
+    """Appends embedded messages; single writer per store, guarded by a lock file."""
+
+    def __init__(self, directory: str, revision: str, dim: int, anchors_hash: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        meta = _read_meta(directory)
+        if meta and (meta.get("revision") != revision or meta.get("dim") != dim
+                     or meta.get("format") != STORE_FORMAT):
+            # a different model's vectors (or an older layout) cannot be mixed in: start over
+            for name in ("vectors.f16", "vectors.i8", "scale.f32", "stance.f32", "cluster.i32", "centroids.f32",
+                         "pairs.i32", "offsets.i64", "rows.jsonl", "keys.txt"):
+                try:
+                    os.remove(_path(directory, name))
+                except OSError:
+                    pass
+            meta = None
+        self.meta = meta or {
+            "format": STORE_FORMAT, "revision": revision, "dim": dim, "anchors": anchors_hash,
+            "count": 0, "pairs": 0, "rows_bytes": 0, "keys_bytes": 0, "tags": [], "sources": {},
+            "ivf": None,
+        }
+        self._truncate_uncommitted()
+        self.centroids = None
+        if self.meta["ivf"]:
+            self.centroids = np.fromfile(_path(directory, "centroids.f32"), dtype=np.float32).reshape(-1, dim)
+        self.tag_ids = {t: i for i, t in enumerate(self.meta["tags"])}
+        self.seen = set()
+        if self.meta["count"]:
+            with open(_path(directory, "keys.txt"), "r", encoding="utf-8") as f:
+                self.seen.update(line.rstrip("\n") for line in f)
+
+    def _truncate_uncommitted(self):
+        # drop anything a crashed run appended after the last meta commit
+        m, dim = self.meta, self.meta["dim"]
+        sizes = {
+            "vectors.i8": m["count"] * dim, "scale.f32": m["count"] * 4, "stance.f32": m["count"] * 4,
+            "cluster.i32": m["count"] * 4,
+            "pairs.i32": m["pairs"] * PAIR_DTYPE.itemsize, "offsets.i64": m["count"] * 8,
+            "rows.jsonl": m["rows_bytes"], "keys.txt": m["keys_bytes"],
+        }
+        for name, size in sizes.items():
+            with open(_path(self.directory, name), "ab") as f:
+                f.truncate(size)
+
+    def reanchor(self, direction: np.ndarray, anchors_hash: str, chunk: int = 65536):
+        """Recompute every stored stance against new anchors, from the memory-mapped vectors."""
+        count, dim = self.meta["count"], self.meta["dim"]
+        stance = np.zeros(count, dtype=np.float32)
+        if count:
+            vectors, scale = self._stored()
+            for start in range(0, count, chunk):
+                stance[start:start + chunk] = _dequantize(vectors, scale, slice(start, start + chunk)) @ direction
+        tmp = _path(self.directory, "stance.f32.tmp")
+        stance.tofile(tmp)
+        os.replace(tmp, _path(self.directory, "stance.f32"))
+        self.meta["anchors"] = anchors_hash
+        self.commit()
+
+    def _stored(self):
+        count, dim = self.meta["count"], self.meta["dim"]
+        vectors = np.memmap(_path(self.directory, "vectors.i8"), dtype=np.int8, mode="r", shape=(count, dim))
+        return vectors, np.fromfile(_path(self.directory, "scale.f32"), dtype=np.float32, count=count)
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """IVF list of each vector (-1 while the lists are untrained)."""
+        if self.centroids is None:
+            return np.full(len(vectors), -1, dtype=np.int32)
+        return np.argmax(np.asarray(vectors, dtype=np.float32) @ self.centroids.T, axis=1).astype(np.int32)
+
+    def train_ivf(self, rng=None, chunk: int = 65536):
+        """
+        Spherical k-means on a sample of the stored vectors, then every row is assigned to its
+        nearest centroid. Retrained once the store has doubled since the last training.
+        """
+        count, dim = self.meta["count"], self.meta["dim"]
+        ivf = self.meta["ivf"]
+        if count < IVF_MIN_MESSAGES or (ivf and count < 2 * ivf["trained_count"]):
+            return
+        rng = rng or np.random.default_rng(0)
+        vectors, scale = self._stored()
+        sample = np.sort(rng.choice(count, size=min(count, IVF_TRAIN_SAMPLE), replace=False))
+        x = _dequantize(vectors, scale, sample)
+        lists = min(1024, int(np.sqrt(count)))
+        centroids = x[rng.choice(len(x), size=lists, replace=False)]
+        for _ in range(IVF_TRAIN_ITERS):
+            assign = np.argmax(x @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            used, starts = np.unique(assign[order], return_index=True)
+            sums = np.add.reduceat(x[order], starts, axis=0)
+            # an empty list keeps its previous centroid
+            centroids[used] = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-9)
+
+        self.centroids = centroids
+        cluster = np.empty(count, dtype="<i4")
+        for start in range(0, count, chunk):
+            cluster[start:start + chunk] = self.assign(_dequantize(vectors, scale, slice(start, start + chunk)))
+        for name, data in (("centroids.f32", centroids), ("cluster.i32", cluster)):
+            tmp = _path(self.directory, name + ".tmp")
+            data.tofile(tmp)
+            os.replace(tmp, _path(self.directory, name))
+        self.meta["ivf"] = {"lists": lists, "trained_count": count}
+        self.commit()
+
+    def append(self, keys, sources, texts, tags, vectors: np.ndarray, stance: np.ndarray):
+        m = self.meta
+        first = m["count"]
+        pairs, offsets = [], []
+        row_lines, pos = [], m["rows_bytes"]
+        for i, (key, source, text, row_tags) in enumerate(zip(keys, sources, texts, tags)):
+            for tag in row_tags:
+                tag_id = self.tag_ids.get(tag)
+                if tag_id is None:
+                    tag_id = self.tag_ids[tag] = len(m["tags"])
+                    m["tags"].append(tag)
+                pairs.append((tag_id, first + i))
+            line = (json.dumps({"key": key, "source": source, "tags": row_tags, "text": text},
+                               ensure_ascii=False) + "\n").encode("utf-8")
+            offsets.append(pos)
+            row_lines.append(line)
+            pos += len(line)
+        key_bytes = "".join(k + "\n" for k in keys).encode("utf-8")
+
+        quantized, scale = _quantize(vectors)
+        with open(_path(self.directory, "vectors.i8"), "ab") as f:
+            f.write(quantized.tobytes())
+        with open(_path(self.directory, "scale.f32"), "ab") as f:
+            f.write(scale.tobytes())
+        with open(_path(self.directory, "stance.f32"), "ab") as f:
+            f.write(np.asarray(stance, dtype=np.float32).tobytes())
+        with open(_path(self.directory, "cluster.i32"), "ab") as f:
+            f.write(self.assign(vectors).astype("<i4").tobytes())
+        with open(_path(self.directory, "pairs.i32"), "ab") as f:
+            f.write(np.array(pairs, dtype=PAIR_DTYPE).tobytes())
+        with open(_path(self.directory, "offsets.i64"), "ab") as f:
+            f.write(np.array(offsets, dtype="<i8").tobytes())
+        with open(_path(self.directory, "rows.jsonl"), "ab") as f:
+            f.write(b"".join(row_lines))
+        with open(_path(self.directory, "keys.txt"), "ab") as f:
+            f.write(key_bytes)
+
+        m["count"] += len(keys)
+        m["pairs"] += len(pairs)
+        m["rows_bytes"] = pos
+        m["keys_bytes"] += len(key_bytes)
+        self.seen.update(keys)
+        self.commit()
+
+    def commit(self):
+        self.meta["committed_at"] = time.time()
+        tmp = _path(self.directory, f"meta.json.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(tmp, _path(self.directory, "meta.json"))
+
+
+def _quantize(vectors: np.ndarray):
+    """Symmetric per-row int8: row ~= int8 row * scale."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scale = np.maximum(np.abs(vectors).max(axis=1), 1e-9) / 127.0
+    return np.round(vectors / scale[:, None]).astype(np.int8), scale.astype(np.float32)
+
+
+def _dequantize(vectors: np.ndarray, scale: np.ndarray, rows) -> np.ndarray:
+    return vectors[rows].astype(np.float32) * scale[rows][:, None]
+
+
+def _tag_matcher(extra_names=()) -> CoinMatcher:
+    matcher = CoinMatcher(ALIAS_TO_COIN)
+    # coins the RAG index knows beyond the alias table (skip numbers and 1-2 letter tokens)
+    matcher.add({n: resolve_tag(n) for n in extra_names if n.lstrip("$").isalpha() and len(n.lstrip("$")) >= 3})
+    return matcher
+
+
+def _iter_new_messages(path: str, seen: set, matcher: CoinMatcher):
+    from preprocessing.preprocess import iter_json_items
+    for item in iter_json_items(path):
+        if isinstance(item, dict):
+            text, key = item.get("text") or "", f"m:{item['id']}" if item.get("id") else None
+        else:
+            text, key = item if isinstance(item, str) else "", None
+        text = text.strip()
+        if not text:
+            continue
+        key = key or content_key(text)
+        if key in seen:
+            continue
+        tags = matcher.find_labels(text)
+        if tags:
+            yield key, text[:MAX_TEXT_CHARS], tags
+
+
+def index_evidence(directory: str = EVIDENCE_DIR) -> Dict[str, Any]:
+    """
+    Embed and append preprocessed messages not indexed yet. Sources whose file is unchanged
+    since the last run are skipped without being read. Only messages with coin tags are kept.
+    """
+    from model_loader.model_registry import model_revision, use_model
+    from weight_handler.rag_system import indexed_coins
+
+    os.makedirs(directory, exist_ok=True)
+    lock_path = _path(directory, "index.lock")
+    try:
+        if time.time() - os.path.getmtime(lock_path) > LOCK_STALE_S:
+            os.remove(lock_path)
+    except OSError:
+        pass
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return {"status": "busy", "message": "another evidence indexing run is in progress"}
+    os.close(fd)
+
+    t0 = time.perf_counter()
+    added = 0
+    try:
+        with use_model(EMBED_MODEL) as embed:
+            revision = model_revision(EMBED_MODEL)
+            anchors_hash = hashlib.sha1(json.dumps(ANCHORS, sort_keys=True).encode("utf-8")).hexdigest()
+            anchor_vecs = {k: embed(v).mean(axis=0) for k, v in ANCHORS.items()}
+            direction = (anchor_vecs["bullish"] - anchor_vecs["bearish"]).astype(np.float32)
+
+            writer = _Writer(directory, revision, embed.dim, anchors_hash)
+            if writer.meta["anchors"] != anchors_hash:
+                writer.reanchor(direction, anchors_hash)
+            matcher = _tag_matcher(indexed_coins())
+
+            for source, base in EVIDENCE_SOURCES.items():
+                path = _source_path(base)
+                if path is None:
+                    continue
+                st = os.stat(path)
+                stamp = [st.st_mtime_ns, st.st_size]
+                if writer.meta["sources"].get(path) == stamp:
+                    continue
+                batch = []
+                for key, text, tags in _iter_new_messages(path, writer.seen, matcher):
+                    batch.append((key, text, tags))
+                    if len(batch) >= EMBED_CHUNK:
+                        added += _append_batch(writer, embed, direction, source, batch)
+                        batch = []
+                if batch:
+                    added += _append_batch(writer, embed, direction, source, batch)
+                writer.meta["sources"][path] = stamp
+                writer.commit()
+            writer.train_ivf()
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+    return {"status": "ok", "added": added, "messages": writer.meta["count"],
+            "tags": len(writer.meta["tags"]), "ivf": writer.meta["ivf"],
+            "elapsed_s": round(time.perf_counter() - t0, 3)}
+
+
+def embed_query(text: str) -> Dict[str, Any]:
+    """Pool job: embedding of one /rag/explain query, with the model revision it came from."""
+    from model_loader.model_registry import model_revision, use_model
+    with use_model(EMBED_MODEL) as embed:
+        return {"revision": model_revision(EMBED_MODEL), "vector": embed([text])[0].tolist()}
+
+
+def _append_batch(writer: _Writer, embed, direction: np.ndarray, source: str, batch) -> int:
+    # a message repeated within one batch is embedded once
+    unique = list({key: (key, text, tags) for key, text, tags in batch if key not in writer.seen}.values())
+    if not unique:
+        return 0
+    keys, texts, tags = zip(*unique)
+    vectors = embed(list(texts))
+    writer.append(list(keys), [source] * len(keys), list(texts), list(tags), vectors, vectors @ direction)
+    return len(keys)
+
+
+# =======================
+# Reader (API process)
+# =======================
+
+class EvidenceIndex:
+    """
+    Read side of the store. Follows meta.json: rows committed since the last look are loaded
+    incrementally (only the new tail of each file is read).
+    """
+
+    def __init__(self, directory: str = EVIDENCE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.meta = None
+        self._marker = None
+        self.count = 0
+        self.pairs = 0
+        self.vectors = None
+        self.scale = np.zeros(0, dtype=np.float32)
+        self.stance = np.zeros(0, dtype=np.float32)
+        self.cluster = np.zeros(0, dtype=np.int32)
+        self.centroids = None
+        self.offsets = np.zeros(0, dtype=np.int64)
+        self._postings: Dict[str, List[np.ndarray]] = {}
+
+    def _tail(self, name: str, dtype, start: int, stop: int) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        if stop <= start:
+            return np.zeros(0, dtype=dtype)
+        return np.fromfile(_path(self.directory, name), dtype=dtype, count=stop - start, offset=start * dtype.itemsize)
+
+    def refresh(self):
+        """Pick up newly committed rows; one stat() when nothing changed."""
+        try:
+            st = os.stat(_path(self.directory, "meta.json"))
+            marker = (st.st_mtime_ns, st.st_ino)
+        except OSError:
+            return
+        with self._lock:
+            if marker == self._marker:
+                return
+            meta = _read_meta(self.directory)
+            if not meta or meta.get("format") != STORE_FORMAT:
+                return  # older layout: unreadable until the next indexing run rebuilds it
+            if self.meta and (meta["revision"] != self.meta["revision"] or meta["count"] < self.count):
+                self._reset()  # store was rebuilt
+            count, pairs = meta["count"], meta["pairs"]
+            if self.meta is None or meta["anchors"] != self.meta["anchors"]:
+                self.stance = self._tail("stance.f32", np.float32, 0, count)
+            else:
+                self.stance = np.concatenate([self.stance, self._tail("stance.f32", np.float32, self.count, count)])
+            if self.meta is None or meta.get("ivf") != self.meta.get("ivf"):
+                # lists (re)trained: every row was reassigned
+                self.cluster = self._tail("cluster.i32", "<i4", 0, count)
+                self.centroids = (np.fromfile(_path(self.directory, "centroids.f32"), dtype=np.float32)
+                                  .reshape(-1, meta["dim"]) if meta.get("ivf") else None)
+            else:
+                self.cluster = np.concatenate([self.cluster, self._tail("cluster.i32", "<i4", self.count, count)])
+            self.offsets = np.concatenate([self.offsets, self._tail("offsets.i64", "<i8", self.count, count)])
+            new_pairs = self._tail("pairs.i32", PAIR_DTYPE, self.pairs, pairs)
+            if len(new_pairs):
+                order = np.argsort(new_pairs["tag"], kind="stable")
+                tag_ids, rows = new_pairs["tag"][order], new_pairs["row"][order]
+                bounds = np.flatnonzero(np.diff(tag_ids)) + 1
+                for ids, chunk in zip(np.split(tag_ids, bounds), np.split(rows, bounds)):
+                    tag = meta["tags"][ids[0]]
+                    chunks = self._postings.setdefault(tag, [])
+                    chunks.append(chunk)
+                    if len(chunks) > 1:
+                        self._postings[tag] = [np.concatenate(chunks)]
+            self.scale = np.concatenate([self.scale, self._tail("scale.f32", np.float32, self.count, count)])
+            self.vectors = np.memmap(_path(self.directory, "vectors.i8"), dtype=np.int8, mode="r",
+                                     shape=(count, meta["dim"])) if count else None
+            self.meta, self.count, self.pairs, self._marker = meta, count, pairs, marker
+
+    def _read_rows(self, rows) -> List[Dict[str, Any]]:
+        out = []
+        with open(_path(self.directory, "rows.jsonl"), "rb") as f:
+            for r in rows:
+                f.seek(int(self.offsets[r]))
+                out.append(json.loads(f.readline()))
+        return out
+
+    def _candidates(self, rows: np.ndarray, q: np.ndarray, cluster, centroids) -> np.ndarray:
+        """The coin's rows to score: all of them, or those in the IVF lists nearest `q`."""
+        if len(rows) <= IVF_CANDIDATES or centroids is None:
+            return rows
+        lists = cluster[rows]
+        if (lists < 0).any():
+            return rows
+        order = np.argsort(-(centroids @ q))
+        # probe lists nearest-first until they hold IVF_CANDIDATES of the coin's rows
+        sizes = np.bincount(lists, minlength=len(centroids))[order]
+        probe = np.zeros(len(centroids), dtype=bool)
+        probe[order[:int(np.searchsorted(np.cumsum(sizes), IVF_CANDIDATES)) + 1]] = True
+        return rows[probe[lists]]
+
+    def evidence(self, coin: str, direction: float = 1.0, k: int = 3, query=None) -> Dict[str, Any]:
+        """
+        Top-k messages tagged with `coin` most similar to the `query` embedding, split into those
+        whose stance agrees (supporting) and disagrees (contradicting) with `direction` (the sign of
+        the coin's RAG score). Without a usable query vector they are ranked by stance alone.
+        """
+        self.refresh()
+        tag = resolve_tag(coin)
+        with self._lock:
+            chunks = self._postings.get(tag)
+            rows = chunks[0] if chunks else np.zeros(0, dtype=np.int32)
+            stance, cluster, centroids = self.stance, self.cluster, self.centroids
+            vectors, scale = self.vectors, self.scale
+            dim = (self.meta or {}).get("dim")
+        if query is not None:
+            query = np.asarray(query, dtype=np.float32)
+            if vectors is None or query.shape != (dim,):
+                query = None
+        result = {"tag": tag, "messages": int(len(rows)), "ranking": "stance" if query is None else "similarity",
+                  "supporting": [], "contradicting": []}
+        if not len(rows) or k <= 0:
+            return result
+        sign = 1.0 if direction >= 0 else -1.0
+        if query is None:
+            cand = rows
+            s = stance[rows] * sign
+            ranked = (("supporting", s, s > 0), ("contradicting", -s, s < 0))
+        else:
+            cand = self._candidates(rows, query, cluster, centroids)
+            result["scored"] = int(len(cand))
+            sim = (vectors[cand].astype(np.float32) @ query) * scale[cand]
+            agrees = stance[cand] * sign
+            ranked = (("supporting", sim, agrees > 0), ("contradicting", sim, agrees < 0))
+        for name, scores, keep in ranked:
+            idx = np.flatnonzero(keep)
+            if not len(idx):
+                continue
+            n = min(k, len(idx))
+            top = idx[np.argpartition(-scores[idx], n - 1)[:n]]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            for j, rec in zip(top, self._read_rows(cand[top])):
+                item = {"text": rec["text"], "source": rec["source"], "stance": round(float(stance[cand[j]]), 4)}
+                if query is not None:
+                    item["similarity"] = round(float(scores[j]), 4)
+                result[name].append(item)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        self.refresh()
+        with self._lock:
+            return {"messages": self.count, "tags": len(self._postings),
+                    "revision": (self.meta or {}).get("revision"),
+                    "ivf": (self.meta or {}).get("ivf"),
+                    "committed_at": (self.meta or {}).get("committed_at")}
+
+
+_evidence_index = None
+_evidence_lock = threading.Lock()
+
+
+def get_evidence_index() -> EvidenceIndex:
+    global _evidence_index
+    with _evidence_lock:
+        if _evidence_index is None:
+            _evidence_index = EvidenceIndex()
+        return _evidence_index
+
+
+_query_vectors: "OrderedDict[str, Any]" = OrderedDict()
+
+
+def query_vector(text: str, revision: str):
+    """
+    Embedding of a query text, from the worker pool (the API process never loads the model).
+    Cached by text; None when the model is unavailable or its revision is not the store's.
+    """
+    from services.worker_pool import run_job
+    with _evidence_lock:
+        hit = _query_vectors.get(text)
+        if hit is not None:
+            _query_vectors.move_to_end(text)
+    if hit is None:
+        try:
+            hit = run_job("weight_handler.rag_evidence:embed_query", text, timeout=QUERY_TIMEOUT_S)
+        except Exception as e:
+            print(f"Evidence query embedding failed, ranking by stance: {e}")
+            return None
+        with _evidence_lock:
+            _query_vectors[text] = hit
+            while len(_query_vectors) > QUERY_CACHE_SIZE:
+                _query_vectors.popitem(last=False)
+    return hit["vector"] if hit["revision"] == revision else None
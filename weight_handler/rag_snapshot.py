@@ -0,0 +1,140 @@
+import glob
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(__file__)
+
+# Versioned RAG index snapshots shared by every API worker:
+#   rag-<version>.npy   one structured row per coin: coin id, feature row, score and numeric
+#                       per-source contributions (np.load(..., mmap_mode="r"))
+#   rag-<version>.json  small header: build time, field names, weights, source fingerprints
+#   current.json        pointer to the newest complete version; replaced atomically last
+SNAPSHOT_ENABLED = os.getenv("RAG_SNAPSHOT", "1") == "1"
+SNAPSHOT_DIR = os.getenv(
+    "RAG_SNAPSHOT_DIR",
+    os.path.abspath(os.path.join(BASE_DIR, "..", "test data", "rag_snapshots")),
+)
+SNAPSHOT_KEEP = int(os.getenv("RAG_SNAPSHOT_KEEP", "3"))
+# builds closer together than this publish once, with the latest state, when the interval is up
+SNAPSHOT_MIN_INTERVAL_S = float(os.getenv("RAG_SNAPSHOT_MIN_INTERVAL_S", "30"))
+FORMAT_VERSION = 2
+CURRENT = "current.json"
+POINTER_LOCK = "current.lock"
+POINTER_LOCK_STALE_S = 30.0   # a lock older than this was left by a crashed publisher
+
+
+def _atomic_write(path: str, write):
+    # pid in the temp name: several workers may publish at once
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def _pointer_lock(snapshot_dir: str):
+    """Cross-process lock (O_EXCL lock file) around reading and replacing the pointer."""
+    path = os.path.join(snapshot_dir, POINTER_LOCK)
+    while True:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > POINTER_LOCK_STALE_S:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def snapshot_marker(snapshot_dir: str = SNAPSHOT_DIR):
+    """Cheap change marker for the current pointer (None when there is no snapshot)."""
+    try:
+        st = os.stat(os.path.join(snapshot_dir, CURRENT))
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_ino
+
+
+def read_current(snapshot_dir: str = SNAPSHOT_DIR) -> Optional[Dict[str, Any]]:
+    ptr = _read_json(os.path.join(snapshot_dir, CURRENT))
+    if not isinstance(ptr, dict) or ptr.get("format") != FORMAT_VERSION:
+        return None
+    return ptr
+
+
+def write_snapshot(meta: Dict[str, Any], table: np.ndarray, snapshot_dir: str = SNAPSHOT_DIR) -> str:
+    """
+    Publish a snapshot: the per-coin table, then the header, then the pointer, so a reader
+    following the pointer always finds complete files. Returns the version id.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    built_at = meta["built_at"]
+    # sorts by build time; the pid keeps concurrent builds from colliding
+    version = f"{int(built_at * 1000):013d}-{os.getpid()}"
+    base = os.path.join(snapshot_dir, f"rag-{version}")
+    _atomic_write(base + ".npy", lambda f: np.save(f, np.ascontiguousarray(table)))
+    doc = {**meta, "format": FORMAT_VERSION, "version": version, "coins": len(table)}
+    _atomic_write(base + ".json", lambda f: f.write(json.dumps(doc, ensure_ascii=False).encode("utf-8")))
+
+    # never move the pointer back to an older build; the lock keeps concurrent publishers from
+    # both reading the old pointer and the older build replacing it last
+    with _pointer_lock(snapshot_dir):
+        ptr = read_current(snapshot_dir)
+        if ptr is None or ptr.get("built_at", 0) <= built_at:
+            pointer = {"format": FORMAT_VERSION, "version": version, "built_at": built_at}
+            _atomic_write(os.path.join(snapshot_dir, CURRENT),
+                          lambda f: f.write(json.dumps(pointer).encode("utf-8")))
+    _prune(snapshot_dir)
+    return version
+
+
+def load_snapshot(version: str, snapshot_dir: str = SNAPSHOT_DIR) -> Optional[Tuple[Dict[str, Any], np.ndarray]]:
+    """(header, memory-mapped per-coin table) for one version, or None if it is missing or incomplete."""
+    base = os.path.join(snapshot_dir, f"rag-{version}")
+    meta = _read_json(base + ".json")
+    if not isinstance(meta, dict) or meta.get("format") != FORMAT_VERSION:
+        return None
+    try:
+        table = np.load(base + ".npy", mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if table.shape != (meta.get("coins"),):
+        return None
+    return meta, table
+
+
+def _prune(snapshot_dir: str, keep: int = SNAPSHOT_KEEP):
+    ptr = read_current(snapshot_dir) or {}
+    versions = sorted(os.path.basename(p)[4:-5] for p in glob.glob(os.path.join(snapshot_dir, "rag-*.json")))
+    for version in versions[:-max(1, keep)]:
+        if version == ptr.get("version"):
+            continue
+        for ext in (".json", ".npy"):
+            try:
+                os.remove(os.path.join(snapshot_dir, f"rag-{version}{ext}"))
+            except OSError:
+                # still mapped by a reader (Windows) or already gone
+                pass
@@ -1,8 +1,15 @@
 # models/rag_system.py
-import os, json, math, time
+import os, json, math, time, hashlib, threading
 from typing import Dict, Any, List, Tuple
 from collections import defaultdict
 
+import numpy as np
+
+from services.coin_matcher import TICKER_ALIASES, CoinMatcher
+from weight_handler.rag_evidence import get_evidence_index, query_vector
+from weight_handler.rag_snapshot import (SNAPSHOT_ENABLED, SNAPSHOT_MIN_INTERVAL_S, load_snapshot, read_current,
+                                          snapshot_marker, write_snapshot)
+
 BASE_DIR = os.path.dirname(__file__)
 DATA_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "test data"))
 
@@ -24,8 +31,18 @@ PATHS = {
     "twitter_cache": os.path.join(DATA_DIR, "twitter_sentiment_cache.json"),
 }
 
-# In-memory index
-_RAG_INDEX: Dict[str, Dict[str, Any]] = {}
+# crude coin tags for the general/news outputs: $TICKER patterns and major names
+COIN_TAGS = ["$BTC","$ETH","$XRP","$SOL","$ADA","Bitcoin","Ethereum","XRP","Solana","Cardano"]
+_TAG_MATCHER = CoinMatcher({tag: tag.upper() for tag in COIN_TAGS})
+
+# upper-case name/ticker variants per coin: "BTC", "$BTC", "BITCOIN" -> every spelling of bitcoin
+_COIN_VARIANTS: Dict[str, Tuple[str, ...]] = {}
+for _coin, _aliases in TICKER_ALIASES.items():
+    _names = [_coin.upper()] + [a.upper().lstrip("$") for a in _aliases]
+    _group = tuple(dict.fromkeys(v for n in _names for v in (n, "$" + n)))
+    _COIN_VARIANTS.update((n, _group) for n in _names)
+
+# In-memory index build time
 _RAG_TS: float = 0.0
 
 def _safe_load(path: str):
@@ -55,60 +72,52 @@ def _to_pct(pos: int, neg: int) -> Tuple[float, float]:
     total = max(1, pos + neg)  # ignore neutrals for pct
     return round(100*pos/total, 2), round(100*neg/total, 2)
 
-def build_rag_index(weights: Dict[str, float] = None) -> Dict[str, Any]:
-    """
-    Collect outputs from all pipelines, build per-coin profiles, normalize numeric features,
-    compute composite scores with weights, and cache in memory.
-    """
-    global _RAG_INDEX, _RAG_TS
-    weights = weights or {
-        # Feature weights (tune freely)
-        "news_sent": 0.25,           # avg FinBERT label: POS=+1, NEG=-1, NEU=0 over last N news items about coin (if present)
-        "general_sent": 0.15,        # from general_handler (POS/NEG ratio)
-        "focus_sent": 0.20,          # from focus pipeline avg sentiment per coin
-        "flow": 0.25,                # z-scored aggregated net flow
-        "mentions": 0.10,            # z-scored mentions from coin_finder keywords
-        "twitter_sent": 0.05,        # cached /coin-sentiment if you decide to save it
-    }
+DEFAULT_WEIGHTS = {
+    # Feature weights (tune freely)
+    "news_sent": 0.25,           # avg FinBERT label: POS=+1, NEG=-1, NEU=0 over last N news items about coin (if present)
+    "general_sent": 0.15,        # from general_handler (POS/NEG ratio)
+    "focus_sent": 0.20,          # from focus pipeline avg sentiment per coin
+    "flow": 0.25,                # z-scored aggregated net flow
+    "mentions": 0.10,            # z-scored mentions from coin_finder keywords
+    "twitter_sent": 0.05,        # cached /coin-sentiment if you decide to save it
+}
 
-    profiles: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
-        "news_sent": None,
-        "general_sent": None,
-        "focus_sent": None,
-        "flow": 0.0,
-        "mentions": 0.0,
-        "twitter_pos": 0,
-        "twitter_neg": 0,
-        "sources": [],
-    })
+# columns of the feature matrix; WEIGHT_KEYS[i] is the weight applied to FEATURES[i]
+FEATURES = ("news_sent", "general_sent", "focus_sent", "flow_z", "mentions_z", "twitter_sent")
+WEIGHT_KEYS = ("news_sent", "general_sent", "focus_sent", "flow", "mentions", "twitter_sent")
+
+_LABEL_MAP = {"POSITIVE": 1, "NEGATIVE": -1, "NEUTRAL": 0}
 
-    # ===== 1) Coin Flow (numeric) =====
-    coin_flow = _safe_load(PATHS["coin_flow"])
+# coin-like keywords counted as mentions in the coin_finder output
+_KNOWN_COINS = {
+    "Bitcoin","BTC","Ethereum","ETH","XRP","Solana","SOL","Ondo","Cronos","CRO","Binance","BNB",
+    "Picoin","Cardano","ADA","Litecoin","LTC","XVG"
+}
+
+# ===== Per-source extractors: parsed file -> {coin: {profile fields..., "sources": [...]}} =====
+# Each source owns a disjoint set of profile fields, so a coin's profile is the merge of the
+# contributions of every source that mentions it.
+
+def _from_coin_flow(coin_flow) -> Dict[str, Dict[str, Any]]:
+    out = {}
     if coin_flow and isinstance(coin_flow, dict):
         # aggregated_flows: { "BTC": 12345, ... }
-        agg = coin_flow.get("aggregated_flows", {})
-        for coin, val in agg.items():
-            profiles[coin]["flow"] = profiles[coin].get("flow", 0.0) + float(val)
-            profiles[coin]["sources"].append("coin_flow")
+        for coin, val in coin_flow.get("aggregated_flows", {}).items():
+            out[coin] = {"flow": float(val), "sources": ["coin_flow"]}
+    return out
 
-    # ===== 2) Focus Sentiment per coin (numeric) =====
-    focus_sent = _safe_load(PATHS["focus_sentiment"])
+def _from_focus_sentiment(focus_sent) -> Dict[str, Dict[str, Any]]:
+    out = {}
     if focus_sent and isinstance(focus_sent, dict):
-        avg = focus_sent.get("average_sentiment", {})
-        for coin, s in avg.items():
-            profiles[coin]["focus_sent"] = float(s)
-            profiles[coin]["sources"].append("focus_sentiment")
+        for coin, s in focus_sent.get("average_sentiment", {}).items():
+            out[coin] = {"focus_sent": float(s), "sources": ["focus_sentiment"]}
+    return out
 
-    # ===== 3) Coin Finder Mentions (numeric volume by unique keywords) =====
-    cf = _safe_load(PATHS["coin_finder"])
+def _from_coin_finder(cf) -> Dict[str, Dict[str, Any]]:
+    out = {}
     if cf and isinstance(cf, dict):
         ckf = cf.get("coin_keywords_filtered", {})
         # ckf is a dict keyed by some id-> {keyword:count,...}; we’ll count mentions of known coin-like words
-        known_coins = {
-            "Bitcoin","BTC","Ethereum","ETH","XRP","Solana","SOL","Ondo","Cronos","CRO","Binance","BNB",
-            "Picoin","Cardano","ADA","Litecoin","LTC","XVG"
-        }
-        # accumulate keyword counts for coin-like tokens
         mention_scores: Dict[str, float] = defaultdict(float)
         for _, kw_counts in ckf.items():
             if not isinstance(kw_counts, dict):
@@ -117,126 +126,470 @@ def build_rag_index(weights: Dict[str, float] = None) -> Dict[str, Any]:
                 w = (word or "").strip()
                 if not w:
                     continue
-                if w in known_coins or w.upper() in known_coins:
+                if w in _KNOWN_COINS or w.upper() in _KNOWN_COINS:
                     # Try map to canonical tickers/names
-                    key = w.upper()
-                    mention_scores[key] += float(cnt)
-
-        # Push into profiles
+                    mention_scores[w.upper()] += float(cnt)
         for coin, m in mention_scores.items():
-            profiles[coin]["mentions"] = profiles[coin].get("mentions", 0.0) + m
-            profiles[coin]["sources"].append("coin_finder")
+            out[coin] = {"mentions": m, "sources": ["coin_finder"]}
+    return out
 
-    # ===== 4) General Sentiment (treat POS=+1, NEG=-1 average over last items) =====
-    gen = _safe_load(PATHS["general_sentiment"])
-    # general handler saves list of {text, sentiment}
-    if isinstance(gen, list):
-        # crude coin tag: look for $TICKER patterns and major names
-        COIN_TAGS = ["$BTC","$ETH","$XRP","$SOL","$ADA","Bitcoin","Ethereum","XRP","Solana","Cardano"]
-        label_map = {"POSITIVE":1, "NEGATIVE":-1, "NEUTRAL":0}
+def _label_average(items, label_key: str, field: str, source: str) -> Dict[str, Dict[str, Any]]:
+    """Treat POS=+1, NEG=-1 and average per coin tag found in each item's text."""
+    out = {}
+    if isinstance(items, list):
         per_coin_scores = defaultdict(list)
-        for item in gen:
-            text = (item.get("text") or "").lower()
-            label = (item.get("sentiment") or "NEUTRAL").upper()
-            score = label_map.get(label, 0)
-            for tag in COIN_TAGS:
-                if tag.lower() in text:
-                    per_coin_scores[tag.upper()].append(score)
+        for item in items:
+            label = (item.get(label_key) or "NEUTRAL").upper()
+            score = _LABEL_MAP.get(label, 0)
+            for tag in _TAG_MATCHER.find_labels(item.get("text") or ""):
+                per_coin_scores[tag].append(score)
         for coin, ss in per_coin_scores.items():
             if ss:
-                profiles[coin]["general_sent"] = sum(ss)/len(ss)
-                profiles[coin]["sources"].append("general_sentiment")
-
-    # ===== 5) News Sentiment (FinBERT) -> same mapping =====
-    news = _safe_load(PATHS["news_sentiment"])
-    if isinstance(news, list):
-        label_map = {"POSITIVE":1, "NEGATIVE":-1, "NEUTRAL":0}
-        COIN_TAGS = ["$BTC","$ETH","$XRP","$SOL","$ADA","Bitcoin","Ethereum","XRP","Solana","Cardano"]
-        per_coin_scores = defaultdict(list)
-        for item in news:
-            text = (item.get("text") or "").lower()
-            label = (item.get("dominant_sentiment") or "NEUTRAL").upper()
-            score = label_map.get(label, 0)
-            for tag in COIN_TAGS:
-                if tag.lower() in text:
-                    per_coin_scores[tag.upper()].append(score)
-        for coin, ss in per_coin_scores.items():
-            if ss:
-                profiles[coin]["news_sent"] = sum(ss)/len(ss)
-                profiles[coin]["sources"].append("news_sentiment")
+                out[coin] = {field: sum(ss)/len(ss), "sources": [source]}
+    return out
 
-    # ===== 6) Optional: cached twitter sentiment from /coin-sentiment =====
-    tw = _safe_load(PATHS["twitter_cache"])
+def _from_general_sentiment(gen) -> Dict[str, Dict[str, Any]]:
+    # general handler saves list of {text, sentiment}
+    return _label_average(gen, "sentiment", "general_sent", "general_sentiment")
+
+def _from_news_sentiment(news) -> Dict[str, Dict[str, Any]]:
+    # FinBERT output -> same mapping
+    return _label_average(news, "dominant_sentiment", "news_sent", "news_sentiment")
+
+def _from_twitter_cache(tw) -> Dict[str, Dict[str, Any]]:
+    out = {}
     # format assumed: [{query, positive, negative, ...}, ...]
     if isinstance(tw, list):
         for row in tw:
             q = (row.get("query") or "").upper()
-            pos = int(row.get("positive", 0))
-            neg = int(row.get("negative", 0))
             if q:
-                profiles[q]["twitter_pos"] += pos
-                profiles[q]["twitter_neg"] += neg
-                profiles[q]["sources"].append("twitter_sentiment")
+                c = out.setdefault(q, {"twitter_pos": 0, "twitter_neg": 0, "sources": []})
+                c["twitter_pos"] += int(row.get("positive", 0))
+                c["twitter_neg"] += int(row.get("negative", 0))
+                c["sources"].append("twitter_sentiment")
+    return out
+
+# PATHS key -> extractor, in merge order (a profile's "sources" list follows this order).
+# verified_focus is listed in PATHS but not scored, so it is not tracked.
+EXTRACTORS = {
+    "coin_flow": _from_coin_flow,
+    "focus_sentiment": _from_focus_sentiment,
+    "coin_finder": _from_coin_finder,
+    "general_sentiment": _from_general_sentiment,
+    "news_sentiment": _from_news_sentiment,
+    "twitter_cache": _from_twitter_cache,
+}
+
+# normalized feature -> the source that feeds it
+_NORMALIZED = {"flow": "coin_flow", "mentions": "coin_finder"}
 
-    # ===== Normalize numeric fields for ranking =====
-    flow_map = {c: v["flow"] for c, v in profiles.items()}
-    mentions_map = {c: v["mentions"] for c, v in profiles.items()}
-    flow_z = _norm(flow_map)
-    mentions_z = _norm(mentions_map)
+# Snapshot columns for the contributions: source -> its numeric fields (NaN where the source does
+# not mention the coin). "twitter_rows" is the length of the twitter contribution's sources list.
+_SOURCE_FIELDS = {
+    "coin_flow": ("flow",),
+    "focus_sentiment": ("focus_sent",),
+    "coin_finder": ("mentions",),
+    "general_sentiment": ("general_sent",),
+    "news_sentiment": ("news_sent",),
+    "twitter_cache": ("twitter_pos", "twitter_neg", "twitter_rows"),
+}
+_SOURCE_LABEL = {"twitter_cache": "twitter_sentiment"}   # the "sources" entry, when not the source name
+CONTRIB_FIELDS = tuple(f for fields in _SOURCE_FIELDS.values() for f in fields)
+_INT_FIELDS = {"twitter_pos", "twitter_neg", "twitter_rows"}
+
+# ===== Incremental state =====
+# per source: (mtime_ns, size, sha256) of the last ingested file, or None when missing
+_FINGERPRINTS: Dict[str, Any] = {}
+_CONTRIBUTIONS: Dict[str, Dict[str, Dict[str, Any]]] = {}
+_PROFILES: Dict[str, Dict[str, Any]] = {}
+_ZSCORES: Dict[str, Dict[str, float]] = {"flow": {}, "mentions": {}}
+_WEIGHTS: Dict[str, float] = {}
+# What readers see: (ranked index {coin: profile}, coin ids, coins x FEATURES matrix, weights).
+# Replaced as one tuple under _BUILD_LOCK and read with a single reference, without the lock, so a
+# reader never pairs one build's matrix with another's index. Published profiles are never mutated.
+_RAG: Tuple[Dict[str, Dict[str, Any]], np.ndarray, np.ndarray, Dict[str, float]] = (
+    {}, np.empty(0, dtype=object), np.zeros((0, len(FEATURES))), {})
+_BUILD_LOCK = threading.Lock()
+# snapshot this process last published or adopted, and the pointer marker it last checked
+_SNAPSHOT_VERSION: str = None
+_SNAPSHOT_MARK = None
+# publish debounce: monotonic time of the last publish, build time it covered, pending timer
+_LAST_PUBLISH = float("-inf")
+_PUBLISHED_TS = 0.0
+_PUBLISH_TIMER = None
+
+def _refresh_source(name: str) -> bool:
+    """Re-ingest one source if its file changed; True when its contribution was replaced."""
+    path = PATHS[name]
+    prev = _FINGERPRINTS.get(name, False)  # False: never seen
+    try:
+        st = os.stat(path)
+    except OSError:
+        if prev is None:
+            return False
+        _FINGERPRINTS[name] = None
+        _CONTRIBUTIONS[name] = {}
+        return True
+    # unchanged mtime+size: skip without reading the file
+    if prev and prev[0] == st.st_mtime_ns and prev[1] == st.st_size:
+        return False
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        raw = b""
+    digest = hashlib.sha256(raw).hexdigest()
+    _FINGERPRINTS[name] = (st.st_mtime_ns, st.st_size, digest)
+    if prev and prev[2] == digest:
+        return False  # touched, same content
+    try:
+        data = json.loads(raw)
+    except Exception:
+        data = None
+    _CONTRIBUTIONS[name] = EXTRACTORS[name](data)
+    return True
 
+def _merge_profile(coin: str) -> Dict[str, Any]:
+    v = {
+        "news_sent": None,
+        "general_sent": None,
+        "focus_sent": None,
+        "flow": 0.0,
+        "mentions": 0.0,
+        "twitter_pos": 0,
+        "twitter_neg": 0,
+        "sources": [],
+    }
+    for name in EXTRACTORS:
+        c = _CONTRIBUTIONS.get(name, {}).get(coin)
+        if c:
+            for k, val in c.items():
+                if k == "sources":
+                    v["sources"].extend(val)
+                else:
+                    v[k] = val
     # compute twitter % -> sentiment in [-1,1]
-    for coin, v in profiles.items():
-        pos, neg = v["twitter_pos"], v["twitter_neg"]
-        tw_total = pos + neg
-        if tw_total > 0:
-            tw_sent = (pos - neg) / tw_total
-        else:
-            tw_sent = None
-        v["twitter_sent"] = tw_sent
-
-    # ===== Final score =====
-    for coin, v in profiles.items():
-        score = 0.0
-        detail = {}
-        # Fill missing as 0 for sentiment-like
-        ns = v["news_sent"] if v["news_sent"] is not None else 0.0
-        gs = v["general_sent"] if v["general_sent"] is not None else 0.0
-        fs = v["focus_sent"] if v["focus_sent"] is not None else 0.0
-        tws = v["twitter_sent"] if v["twitter_sent"] is not None else 0.0
-        fl = flow_z.get(coin, 0.0)
-        mn = mentions_z.get(coin, 0.0)
-
-        score += weights["news_sent"]   * ns;   detail["news_sent"] = ns
-        score += weights["general_sent"]* gs;   detail["general_sent"] = gs
-        score += weights["focus_sent"]  * fs;   detail["focus_sent"] = fs
-        score += weights["flow"]        * fl;   detail["flow_z"] = fl
-        score += weights["mentions"]    * mn;   detail["mentions_z"] = mn
-        score += weights["twitter_sent"]* tws;  detail["twitter_sent"] = tws
-
-        v["score"] = round(score, 4)
-        v["score_breakdown"] = detail
-
-    _RAG_INDEX = dict(sorted(profiles.items(), key=lambda kv: kv[1]["score"], reverse=True))
-    _RAG_TS = time.time()
-    return {"coins_indexed": len(_RAG_INDEX), "updated_at": _RAG_TS}
-
-def rag_top(top_k: int = 10) -> List[Dict[str, Any]]:
-    items = list(_RAG_INDEX.items())[:max(1, top_k)]
+    pos, neg = v["twitter_pos"], v["twitter_neg"]
+    tw_total = pos + neg
+    v["twitter_sent"] = (pos - neg) / tw_total if tw_total > 0 else None
+    return v
+
+def _score_breakdown(coin: str, v: Dict[str, Any]):
+    # Fill missing as 0 for sentiment-like
+    v["score_breakdown"] = {
+        "news_sent": v["news_sent"] if v["news_sent"] is not None else 0.0,
+        "general_sent": v["general_sent"] if v["general_sent"] is not None else 0.0,
+        "focus_sent": v["focus_sent"] if v["focus_sent"] is not None else 0.0,
+        "flow_z": _ZSCORES["flow"].get(coin, 0.0),
+        "mentions_z": _ZSCORES["mentions"].get(coin, 0.0),
+        "twitter_sent": v["twitter_sent"] if v["twitter_sent"] is not None else 0.0,
+    }
+
+def _weight_vector(weights: Dict[str, float]) -> np.ndarray:
+    return np.array([float(weights[k]) for k in WEIGHT_KEYS], dtype=np.float64)
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """
+    Weight overrides from a query string: either six numbers in WEIGHT_KEYS order
+    ("0.25,0.15,0.2,0.25,0.1,0.05") or name=value pairs ("flow=0.5,mentions=0").
+    Raises ValueError on anything else.
+    """
+    parts = [p.strip() for p in (spec or "").split(",") if p.strip()]
+    if not parts:
+        return {}
+    try:
+        if all("=" not in p for p in parts):
+            if len(parts) != len(WEIGHT_KEYS):
+                raise ValueError(f"expected {len(WEIGHT_KEYS)} weights ({', '.join(WEIGHT_KEYS)}), got {len(parts)}")
+            return dict(zip(WEIGHT_KEYS, map(float, parts)))
+        out = {}
+        for p in parts:
+            k, _, val = p.partition("=")
+            k = k.strip()
+            if k not in WEIGHT_KEYS:
+                raise ValueError(f"unknown weight '{k}' (expected one of {', '.join(WEIGHT_KEYS)})")
+            out[k] = float(val)
+        return out
+    except ValueError as e:
+        if "could not convert" in str(e):
+            raise ValueError(f"weights must be numbers: {spec!r}") from e
+        raise
+
+def _snapshot_table(coin_ids, matrix) -> np.ndarray:
+    """Per-coin structured rows: coin id, feature row, score and numeric contributions."""
+    width = max([1] + [len(c) for c in coin_ids])
+    table = np.zeros(len(coin_ids), dtype=[("coin", f"U{width}"), ("features", np.float64, (len(FEATURES),)),
+                                           ("score", np.float64), ("contrib", np.float64, (len(CONTRIB_FIELDS),))])
+    table["coin"] = list(coin_ids)
+    table["features"] = matrix
+    table["score"] = [_PROFILES[c]["score"] for c in coin_ids]
+    contrib = np.full((len(coin_ids), len(CONTRIB_FIELDS)), np.nan)
+    rows = {c: i for i, c in enumerate(coin_ids)}
+    for name, fields in _SOURCE_FIELDS.items():
+        for coin, c in _CONTRIBUTIONS.get(name, {}).items():
+            for f in fields:
+                contrib[rows[coin], CONTRIB_FIELDS.index(f)] = len(c["sources"]) if f == "twitter_rows" else c[f]
+    table["contrib"] = contrib
+    return table
+
+def _contributions_from(coins: List[str], contrib: np.ndarray) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    out = {}
+    for name, fields in _SOURCE_FIELDS.items():
+        cols = [CONTRIB_FIELDS.index(f) for f in fields]
+        label = _SOURCE_LABEL.get(name, name)
+        per_coin = out[name] = {}
+        for i in np.flatnonzero(~np.isnan(contrib[:, cols[0]])):
+            c = {f: (int(v) if f in _INT_FIELDS else float(v)) for f, v in zip(fields, contrib[i, cols].tolist())}
+            per_coin[coins[i]] = {**{f: v for f, v in c.items() if f != "twitter_rows"},
+                                  "sources": [label] * c.get("twitter_rows", 1)}
+    return out
+
+def _adopt_snapshot() -> bool:
+    """
+    Swap to the newest published snapshot when it was built after the in-memory index.
+    Costs one stat() when the pointer has not moved. Caller holds _BUILD_LOCK.
+    """
+    global _RAG, _RAG_TS, _WEIGHTS, _SNAPSHOT_VERSION, _SNAPSHOT_MARK, _PUBLISHED_TS
+    mark = snapshot_marker()
+    if mark is None or mark == _SNAPSHOT_MARK:
+        return False
+    _SNAPSHOT_MARK = mark
+    ptr = read_current()
+    if not ptr or ptr["version"] == _SNAPSHOT_VERSION or ptr["built_at"] <= _RAG_TS:
+        return False
+    loaded = load_snapshot(ptr["version"])
+    if loaded is None:
+        return False
+    meta, table = loaded
+    if meta.get("features") != list(FEATURES) or meta.get("contrib_fields") != list(CONTRIB_FIELDS):
+        return False  # written by an incompatible build
+
+    # only the coin ids and contributions are copied out; the feature matrix stays mapped
+    coins = table["coin"].tolist()
+    matrix = table["features"]
+    scores = table["score"].tolist()
+    _FINGERPRINTS.clear()
+    _FINGERPRINTS.update({k: tuple(fp) if fp else None for k, fp in meta["fingerprints"].items()})
+    _CONTRIBUTIONS.clear()
+    _CONTRIBUTIONS.update(_contributions_from(coins, np.asarray(table["contrib"])))
+    _PROFILES.clear()
+    for i, coin in enumerate(coins):
+        v = _merge_profile(coin)
+        v["score_breakdown"] = dict(zip(FEATURES, matrix[i].tolist()))
+        v["score"] = scores[i]
+        _PROFILES[coin] = v
+    for field, feature in (("flow", "flow_z"), ("mentions", "mentions_z")):
+        _ZSCORES[field] = dict(zip(coins, matrix[:, FEATURES.index(feature)].tolist()))
+    _WEIGHTS = meta["weights"]
+    _RAG = (dict(sorted(_PROFILES.items(), key=lambda kv: kv[1]["score"], reverse=True)),
+            np.array(coins, dtype=object), matrix, dict(_WEIGHTS))
+    _RAG_TS = _PUBLISHED_TS = meta["built_at"]
+    _SNAPSHOT_VERSION = meta["version"]
+    return True
+
+def _publish_snapshot():
+    """Write the current index as a new snapshot version. Caller holds _BUILD_LOCK."""
+    global _SNAPSHOT_VERSION, _SNAPSHOT_MARK, _LAST_PUBLISH, _PUBLISHED_TS
+    _, coin_ids, matrix, _ = _RAG
+    meta = {
+        "built_at": _RAG_TS,
+        "features": list(FEATURES),
+        "contrib_fields": list(CONTRIB_FIELDS),
+        "weights": _WEIGHTS,
+        "fingerprints": dict(_FINGERPRINTS),
+    }
+    _LAST_PUBLISH = time.monotonic()
+    _PUBLISHED_TS = _RAG_TS
+    try:
+        _SNAPSHOT_VERSION = write_snapshot(meta, _snapshot_table(coin_ids, matrix))
+        _SNAPSHOT_MARK = snapshot_marker()
+    except OSError as e:
+        print(f"[rag] snapshot write failed: {e}")
+
+def _schedule_publish():
+    """
+    Publish now, or once SNAPSHOT_MIN_INTERVAL_S has passed since the last publish: rebuilds on
+    every request would otherwise write a snapshot each time. Caller holds _BUILD_LOCK.
+    """
+    global _PUBLISH_TIMER
+    wait = _LAST_PUBLISH + SNAPSHOT_MIN_INTERVAL_S - time.monotonic()
+    if wait <= 0:
+        _publish_snapshot()
+    elif _PUBLISH_TIMER is None:
+        _PUBLISH_TIMER = threading.Timer(wait, _deferred_publish)
+        _PUBLISH_TIMER.daemon = True
+        _PUBLISH_TIMER.start()
+
+def _deferred_publish():
+    global _PUBLISH_TIMER
+    with _BUILD_LOCK:
+        _PUBLISH_TIMER = None
+        # skipped when nothing was built since, or a newer snapshot was adopted meanwhile
+        if _RAG_TS > _PUBLISHED_TS:
+            _publish_snapshot()
+
+def load_rag_snapshot() -> bool:
+    """Adopt the newest snapshot on disk (startup); True if one was loaded."""
+    if not SNAPSHOT_ENABLED:
+        return False
+    with _BUILD_LOCK:
+        return _adopt_snapshot()
+
+def build_rag_index(weights: Dict[str, float] = None) -> Dict[str, Any]:
+    """
+    Collect outputs from all pipelines, build per-coin profiles, normalize numeric features,
+    compute composite scores with weights, and cache in memory.
+
+    Incremental: a source is re-read only when its mtime/size changed and its content hash
+    differs, and only the coins that source touches are re-profiled. Normalizations are redone
+    when their source or the coin set changed. With nothing changed this is a few stat() calls.
+    """
+    global _RAG, _RAG_TS, _WEIGHTS
+    weights = weights or DEFAULT_WEIGHTS
+    with _BUILD_LOCK:
+        # another worker may have published a newer build; its source fingerprints then decide
+        # below whether it is stale
+        if SNAPSHOT_ENABLED:
+            _adopt_snapshot()
+        old_contributions = dict(_CONTRIBUTIONS)
+        changed = [name for name in EXTRACTORS if _refresh_source(name)]
+        reweighted = weights != _WEIGHTS
+        if not changed and not reweighted:
+            return {"coins_indexed": len(_RAG[0]), "updated_at": _RAG_TS, "changed_sources": []}
+
+        # ===== Re-profile coins touched by a changed source (before or after the change) =====
+        affected = {}  # ordered, so ties rank in source order like a full build
+        for name in changed:
+            affected.update(dict.fromkeys(old_contributions.get(name, {})))
+            affected.update(dict.fromkeys(_CONTRIBUTIONS[name]))
+        coin_set_changed = False
+        for coin in affected:
+            if any(coin in _CONTRIBUTIONS.get(name, {}) for name in EXTRACTORS):
+                coin_set_changed |= coin not in _PROFILES
+                _PROFILES[coin] = _merge_profile(coin)
+            elif _PROFILES.pop(coin, None) is not None:
+                coin_set_changed = True
+
+        # ===== Normalize numeric fields for ranking =====
+        renormalized = False
+        for field, source in _NORMALIZED.items():
+            if coin_set_changed or source in changed:
+                _ZSCORES[field] = _norm({c: v[field] for c, v in _PROFILES.items()})
+                renormalized = True
+
+        # ===== Feature rows, then scores as one matrix-vector product =====
+        for coin in (_PROFILES if renormalized else affected):
+            if coin in _PROFILES:
+                # copy: the published index still holds the old profile
+                _PROFILES[coin] = dict(_PROFILES[coin])
+                _score_breakdown(coin, _PROFILES[coin])
+        coin_ids = np.array(list(_PROFILES), dtype=object)
+        matrix = np.array([[v["score_breakdown"][f] for f in FEATURES] for v in _PROFILES.values()],
+                          dtype=np.float64).reshape(-1, len(FEATURES))
+        for coin, score in zip(coin_ids, matrix @ _weight_vector(weights)):
+            _PROFILES[coin] = {**_PROFILES[coin], "score": round(float(score), 4)}
+
+        _WEIGHTS = dict(weights)
+        _RAG = (dict(sorted(_PROFILES.items(), key=lambda kv: kv[1]["score"], reverse=True)),
+                coin_ids, matrix, dict(_WEIGHTS))
+        _RAG_TS = time.time()
+        if SNAPSHOT_ENABLED:
+            _schedule_publish()
+        return {"coins_indexed": len(_RAG[0]), "updated_at": _RAG_TS, "changed_sources": changed}
+
+def _stale_sources() -> List[str]:
+    """Sources whose file no longer matches the fingerprint the index was built from (stat only)."""
+    stale = []
+    for name, fp in _FINGERPRINTS.items():
+        try:
+            st = os.stat(PATHS[name])
+            current = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            current = None
+        if current != (tuple(fp[:2]) if fp else None):
+            stale.append(name)
+    return stale
+
+def rag_index_status() -> Dict[str, Any]:
+    return {
+        "coins_indexed": len(_RAG[0]),
+        "updated_at": _RAG_TS,
+        "snapshot_version": _SNAPSHOT_VERSION,
+        "stale_sources": _stale_sources(),
+        "sources": {name: ({"mtime_ns": fp[0], "size": fp[1], "sha256": fp[2]} if fp else None)
+                    for name, fp in _FINGERPRINTS.items()},
+    }
+
+def rag_top(top_k: int = 10, weights: Dict[str, float] = None) -> List[Dict[str, Any]]:
+    """
+    Top coins by score. `weights` overrides some or all of the index weights for this call only:
+    the ranking is re-done from the feature matrix without touching the index.
+    """
+    index, coin_ids, matrix, base_weights = _RAG   # one build's index, ids and matrix together
+    if not weights:
+        items = list(index.items())[:max(1, top_k)]
+        out = []
+        for coin, v in items:
+            out.append({"coin": coin, "score": v["score"], **v})
+        return out
+
+    k = min(max(1, top_k), len(coin_ids))
+    if not k:
+        return []
+    scores = matrix @ _weight_vector({**(base_weights or DEFAULT_WEIGHTS), **weights})
+    kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    top = np.flatnonzero(scores >= kth)  # k-th score and everything tied with it
+    top = top[np.lexsort((top, -scores[top]))][:k]  # score desc, ties in index order
     out = []
-    for coin, v in items:
-        out.append({"coin": coin, "score": v["score"], **v})
+    for i in top:
+        v = index.get(coin_ids[i])
+        if v is not None:
+            out.append({"coin": coin_ids[i], **v, "score": round(float(scores[i]), 4)})
     return out
 
-def rag_explain(coin: str) -> Dict[str, Any]:
-    c = coin.upper()
-    v = _RAG_INDEX.get(c)
-    if not v:
-        # fuzzy fallback: try coin name like "BITCOIN" -> "$BTC" if present
-        for k in _RAG_INDEX.keys():
-            if c in k or k in c:
-                v = _RAG_INDEX[k]
-                c = k
-                break
+def indexed_coins() -> List[str]:
+    """Coin keys of the index, synced with the sources first."""
+    build_rag_index()
+    return list(_RAG[0])
+
+def _resolve_coin(index: Dict[str, Any], coin: str):
+    """Index key for a coin spelling: exact, with/without "$", then the coin's other names."""
+    c = coin.strip().upper()
+    if c in index:
+        return c
+    bare = c.lstrip("$")
+    for k in (bare, "$" + bare) + _COIN_VARIANTS.get(bare, ()):
+        if k in index:
+            return k
+    return None
+
+# evidence query: the coin plus its strongest score drivers, by sign (few distinct texts, so
+# query embeddings cache well)
+_DRIVER_PHRASES = {
+    "news_sent": ("positive news", "negative news"),
+    "general_sent": ("bullish chatter", "bearish chatter"),
+    "focus_sent": ("bullish traders", "bearish traders"),
+    "flow_z": ("whale inflows", "whale outflows"),
+    "mentions_z": ("mentions rising", "mentions falling"),
+    "twitter_sent": ("positive tweets", "negative tweets"),
+}
+EVIDENCE_QUERY_DRIVERS = 3
+
+def _evidence_query(coin: str, breakdown: Dict[str, float]) -> str:
+    drivers = sorted((f for f in _DRIVER_PHRASES if breakdown.get(f)), key=lambda f: -abs(breakdown[f]))
+    phrases = [_DRIVER_PHRASES[f][0 if breakdown[f] > 0 else 1] for f in drivers[:EVIDENCE_QUERY_DRIVERS]]
+    return f"{coin.lstrip('$')}: " + ", ".join(phrases) if phrases else coin.lstrip("$")
+
+def _evidence(coin: str, v: Dict[str, Any], k: int) -> Dict[str, Any]:
+    evidence_index = get_evidence_index()
+    revision = evidence_index.stats()["revision"]
+    query = query_vector(_evidence_query(coin, v["score_breakdown"]), revision) if revision and k > 0 else None
+    return evidence_index.evidence(coin, direction=v["score"], k=k, query=query)
+
+def rag_explain(coin: str, evidence_k: int = 3) -> Dict[str, Any]:
+    index = _RAG[0]
+    c = _resolve_coin(index, coin)
+    v = index.get(c) if c else None
     if not v:
         return {"coin": coin, "found": False}
     # human-readable explanation
@@ -259,5 +612,7 @@ def rag_explain(coin: str) -> Dict[str, Any]:
         "score": v["score"],
         "why": ", ".join(why) or "no strong signals",
         "sources": sorted(set(v.get("sources", []))),
+        # messages mentioning the coin closest to its score drivers, agreeing / disagreeing with its sign
+        "evidence": _evidence(c, v, evidence_k),
         "raw": v
     }